@@ -0,0 +1,76 @@
+"""Wall time for a batch of wav2lip renders: one at a time versus the background queue.
+
+    python bench_lipsync_queue.py --jobs 8 --concurrency 4
+
+Runs against the fake Replicate service. Each prediction waits `--queue-seconds`
+and then runs for `--run-seconds`. "blocking" submits each job and waits for it
+before starting the next, as `replicate.run` used to, so the UI only gets
+control back when the render is done. "queued" submits all of them and waits
+at the end. After that the same batch is submitted again and comes straight
+from the result cache.
+"""
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+from fake_replicate_server import FakeReplicateServer
+from lipsync_queue import LipSyncParams, LipSyncQueue
+
+def make_inputs(directory: str, jobs: int):
+    face = os.path.join(directory, "face.mp4")
+    with open(face, "wb") as f:
+        f.write(os.urandom(2 * 2**20))
+    audios = []
+    for i in range(jobs):
+        audios.append(os.path.join(directory, f"line_{i}.mp3"))
+        with open(audios[-1], "wb") as f:
+            f.write(os.urandom(200 * 1024))
+    return face, audios
+
+def run(queue: LipSyncQueue, face: str, audios, blocking: bool):
+    submit_ms, jobs = [], []
+    started = time.perf_counter()
+    for audio in audios:
+        submitted = time.perf_counter()
+        jobs.append(queue.submit(face, audio, LipSyncParams()))
+        if blocking:
+            queue.wait(jobs[-1])
+        submit_ms.append((time.perf_counter() - submitted) * 1000)
+    for job in jobs:
+        queue.wait(job)
+    return time.perf_counter() - started, submit_ms, jobs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--queue-seconds", type=float, default=0.5)
+    parser.add_argument("--run-seconds", type=float, default=2.0)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{args.jobs} renders, {args.queue_seconds:g}s queued + {args.run_seconds:g}s running each\n")
+    print(f"{'mode':<18} {'wall s':>8} {'return p50 ms':>14} {'polls/job':>10} {'uploads':>8} {'failed':>7}")
+    for name, concurrency, blocking in (("blocking", 1, True), (f"queued (cap {args.concurrency})",
+                                                                args.concurrency, False)):
+        with tempfile.TemporaryDirectory() as directory, \
+                FakeReplicateServer(queue_seconds=args.queue_seconds, run_seconds=args.run_seconds) as server:
+            face, audios = make_inputs(directory, args.jobs)
+            queue = LipSyncQueue(api_token="bench", api_base=server.base_url, max_concurrent=concurrency,
+                                 poll_interval=args.poll_interval, cache_dir=os.path.join(directory, "cache"))
+            wall, submit_ms, jobs = run(queue, face, audios, blocking)
+            failed = sum(job.status != "succeeded" for job in jobs)
+            print(f"{name:<18} {wall:>8.2f} {statistics.median(submit_ms):>14.1f} "
+                  f"{server.counts['poll'] / len(jobs):>10.1f} {server.counts['upload']:>8} {failed:>7}")
+            if blocking:
+                continue
+            wall, submit_ms, jobs = run(queue, face, audios, blocking)
+            cached = sum(job.status == "cached" for job in jobs)
+            print(f"{'cached re-render':<18} {wall:>8.2f} {statistics.median(submit_ms):>14.1f} "
+                  f"{'':>10} {server.counts['upload']:>8} {'':>7}  ({cached}/{len(jobs)} from cache)")
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,21 @@
 import streamlit as st
-import replicate
 import os
-import json
-import requests
-from elevenlabs import VoiceSettings
-from elevenlabs.client import ElevenLabs
 from dotenv import load_dotenv
+import providers
+from lipsync_queue import LipSyncParams, LipSyncQueue
 
 # Load environment variables
 load_dotenv()
 
-replicate.api_token = os.getenv("REPLICATE_API_TOKEN")
-ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
+# One lip-sync queue per server process, so jobs keep running across reruns and sessions
+@st.cache_resource
+def get_lipsync_queue():
+    return LipSyncQueue(max_concurrent=int(os.getenv("LIPSYNC_CONCURRENCY", 2)))
 
 def upload_file(file_path):
     """Upload a file to a temporary file hosting service and return the URL."""
     with open(file_path, 'rb') as file:
-        response = requests.post('https://transfer.sh/', files={'file': file})
+        response = providers.post("upload", 'https://transfer.sh/', files={'file': file})
     if response.status_code == 200:
         return response.text.strip()
     else:
@@ -24,53 +23,43 @@ def upload_file(file_path):
 
 def generate_audio(audio_id, text):
     st.write("Generating audio...")
-    client = ElevenLabs(
-        api_key=ELEVENLABS_API_KEY,
-    )
-    audio_generator = client.text_to_speech.convert(
-        voice_id=audio_id,
+    audio = providers.stream_speech(
+        text,
+        audio_id,
+        {"stability": 0.1, "similarity_boost": 0.3, "style": 0.2},
         optimize_streaming_latency="1",
         output_format="mp3_22050_32",
-        text=text,
-        voice_settings=VoiceSettings(
-            stability=0.1,
-            similarity_boost=0.3,
-            style=0.2,
-        ),
     )
-    
-    audio_data = b''.join(chunk for chunk in audio_generator)
-    
-    # Save the audio in the same directory as the Streamlit app
-    with open('output.mp3', 'wb') as f:
-        f.write(audio_data)
-    
+
+    # Stream the audio to a file in the same directory as the Streamlit app
+    providers.write_stream(audio, 'output.mp3')
+
     st.success("Audio generated and saved as output.mp3")
 
-def generate_video():
-    st.write("Generating video...")
-    output = replicate.run(
-    "skytells-research/wav2lip:22b1ecf6252b8adcaeadde30bb672b199c125b7d3c98607db70b66eea21d75ae",
-    input={
-        "fps": 25,
-        "face": "media/test.mp4",
-        "pads": "0 10 0 0",
-        "audio": "./media/test.mp3",
-        "smooth": True,
-        "out_height": 480
-    }
-    )
-    
-    output_json = json.loads(output)
-    output_url = output_json['output']
-    
-    response = requests.get(output_url)
-    
-    # Save the video in the same directory as the Streamlit app
-    with open('output.mp4', 'wb') as f:
-        f.write(response.content)
-    
-    st.success("Video generated and saved as output.mp4")
+DEFAULT_FACE = os.path.join("media", "test.mp4")
+
+def generate_video(face_path=DEFAULT_FACE, audio_path='output.mp3'):
+    """Queue a wav2lip render of `audio_path` over `face_path`; returns at once with the job."""
+    job = get_lipsync_queue().submit(face_path, audio_path, LipSyncParams())
+    if job.status == "cached":
+        st.success("Same face, audio and settings as an earlier render; reusing it")
+    else:
+        st.info(f"Lip-sync job {job.id} queued")
+    return job
+
+@st.fragment(run_every=2)
+def show_jobs():
+    jobs = get_lipsync_queue().jobs()
+    if not jobs:
+        return
+    st.subheader("Lip-sync jobs")
+    st.dataframe([job.row() for job in jobs])
+    latest = latest_video()
+    if latest:
+        st.video(latest)
+
+def latest_video():
+    return next((job.output_path for job in get_lipsync_queue().jobs() if job.output_path), None)
 
 def main():
     st.title("Argil AI Video Generator")
@@ -81,12 +70,33 @@ def main():
     if st.button("Generate Audio"):
         generate_audio(audio_id, text)
 
+    face_video = st.file_uploader("Face video (defaults to media/test.mp4)", type=["mp4", "mov"])
+
     if st.button("Generate Video"):
-        generate_video()
+        if not os.path.exists('output.mp3'):
+            st.error("Generate the audio first")
+        else:
+            face_path = DEFAULT_FACE
+            if face_video is not None:
+                face_path = os.path.join("media", f"face_{face_video.name}")
+                with open(face_path, "wb") as f:
+                    f.write(face_video.getvalue())
+            generate_video(face_path, 'output.mp3')
+
+    show_jobs()
 
     if st.button("Upload Video"):
-        uploaded_url = upload_file("output.mp4")
-        st.success(f"Video uploaded. URL: {uploaded_url}")
+        video_path = latest_video()
+        if video_path is None:
+            st.error("No finished video yet")
+        else:
+            uploaded_url = upload_file(video_path)
+            st.success(f"Video uploaded. URL: {uploaded_url}")
+
+    provider_stats = providers.stats.summary()
+    if provider_stats:
+        with st.expander("Provider calls"):
+            st.dataframe(provider_stats)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
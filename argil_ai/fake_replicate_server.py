@@ -0,0 +1,140 @@
+import email.parser
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeReplicateServer:
+    """A local stand-in for Replicate's files and predictions API, running a pretend wav2lip.
+
+    Uploaded files are kept in memory. A prediction stays "starting" for
+    `queue_seconds` and then "processing" for `run_seconds`. After that it has
+    "succeeded", or "failed" with probability `fail_rate`. The output is a small
+    fake MP4 derived from the inputs. Status is only ever learned by polling,
+    as a client without a public webhook URL would.
+    """
+
+    def __init__(self, queue_seconds: float = 0.5, run_seconds: float = 2.0, fail_rate: float = 0.0,
+                 seed: int = 0, host: str = "127.0.0.1", port: int = 0):
+        self.queue_seconds = queue_seconds
+        self.run_seconds = run_seconds
+        self.fail_rate = fail_rate
+        self.files = {}
+        self.predictions = {}
+        self.counts = {"upload": 0, "create": 0, "poll": 0, "download": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, kind: str):
+        with self._lock:
+            self.counts[kind] += 1
+
+    def _create(self, body: dict) -> dict:
+        prediction_id = uuid.uuid4().hex[:12]
+        inputs = body.get("input", {})
+        with self._lock:
+            fails = self._random.random() < self.fail_rate
+            self.predictions[prediction_id] = {"created": time.time(), "input": inputs, "fails": fails}
+        return self._view(prediction_id)
+
+    def _view(self, prediction_id: str) -> dict:
+        prediction = self.predictions[prediction_id]
+        elapsed = time.time() - prediction["created"]
+        output, error = None, None
+        if elapsed < self.queue_seconds:
+            status = "starting"
+        elif elapsed < self.queue_seconds + self.run_seconds:
+            status = "processing"
+        elif prediction["fails"]:
+            status, error = "failed", "CUDA out of memory"
+        else:
+            status = "succeeded"
+            output = json.dumps({"output": f"{self.base_url}/outputs/{prediction_id}.mp4"})
+        return {
+            "id": prediction_id, "version": "fake-wav2lip", "status": status, "input": prediction["input"],
+            "output": output, "error": error,
+            "urls": {"get": f"{self.base_url}/predictions/{prediction_id}",
+                     "cancel": f"{self.base_url}/predictions/{prediction_id}/cancel"},
+        }
+
+    def _output(self, prediction_id: str) -> bytes:
+        inputs = json.dumps(self.predictions[prediction_id]["input"], sort_keys=True).encode("utf-8")
+        return b"\x00\x00\x00\x18ftypmp42" + hashlib.sha256(inputs).digest() * 2048
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, status: int, body, content_type: str = "application/json"):
+                data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not self.headers.get("Authorization", "").startswith("Bearer "):
+                    self._reply(401, {"detail": "You did not pass an authentication token"})
+                elif self.path == "/v1/files":
+                    fake._count("upload")
+                    message = email.parser.BytesParser().parsebytes(
+                        f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + body)
+                    content = next(part.get_payload(decode=True) for part in message.get_payload()
+                                   if part.get_param("name", header="content-disposition") == "content")
+                    file_id = hashlib.sha256(content).hexdigest()[:16]
+                    fake.files[file_id] = content
+                    self._reply(201, {"id": file_id, "size": len(content),
+                                      "urls": {"get": f"{fake.base_url}/files/{file_id}"}})
+                elif self.path == "/v1/predictions":
+                    fake._count("create")
+                    self._reply(201, fake._create(json.loads(body)))
+                else:
+                    self._reply(404, {"detail": "Not found"})
+
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                if parts[:2] == ["v1", "predictions"] and len(parts) == 3 and parts[2] in fake.predictions:
+                    fake._count("poll")
+                    self._reply(200, fake._view(parts[2]))
+                elif parts[:2] == ["v1", "outputs"] and parts[2].removesuffix(".mp4") in fake.predictions:
+                    fake._count("download")
+                    self._reply(200, fake._output(parts[2].removesuffix(".mp4")), "video/mp4")
+                elif parts[:2] == ["v1", "files"] and len(parts) == 3 and parts[2] in fake.files:
+                    self._reply(200, fake.files[parts[2]], "application/octet-stream")
+                else:
+                    self._reply(404, {"detail": "Not found"})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
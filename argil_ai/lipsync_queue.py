@@ -0,0 +1,189 @@
+"""Background queue for wav2lip predictions on Replicate, with an on-disk result cache.
+
+`LipSyncQueue.submit` returns at once with a `LipSyncJob`. Up to
+`max_concurrent` worker threads each take a job and do the whole round trip:
+upload the face video and audio through the files API, create the
+prediction, poll it with growing intervals, and download the output. Results
+are stored under a hash of (face video, audio, fps, pads, smooth,
+out_height), so the same inputs come straight back from disk. The queue talks
+to the HTTP API through `providers`, so `api_base` can point at a local fake
+service (see fake_replicate_server.py).
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+import providers
+
+WAV2LIP_VERSION = "22b1ecf6252b8adcaeadde30bb672b199c125b7d3c98607db70b66eea21d75ae"
+API_BASE = os.getenv("REPLICATE_API_BASE", "https://api.replicate.com/v1")
+CACHE_DIR = os.path.join("media", "lipsync")
+TERMINAL = ("succeeded", "failed", "canceled")
+
+@dataclass(frozen=True)
+class LipSyncParams:
+    fps: int = 25
+    pads: str = "0 10 0 0"
+    smooth: bool = True
+    out_height: int = 480
+
+@dataclass
+class LipSyncJob:
+    face_path: str
+    audio_path: str
+    params: LipSyncParams
+    key: str
+    audio_name: str = ""
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    status: str = "queued"  # queued, uploading, starting, processing, succeeded, failed, cached
+    prediction_id: Optional[str] = None
+    output_path: Optional[str] = None
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    polls: int = 0
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def seconds(self) -> Optional[float]:
+        return self.finished_at - self.submitted_at if self.finished_at else None
+
+    def row(self) -> dict:
+        return {
+            "id": self.id, "status": self.status, "audio": self.audio_name,
+            **asdict(self.params), "polls": self.polls,
+            "seconds": round(self.seconds, 2) if self.seconds is not None else None,
+            "output": self.output_path, "error": self.error,
+        }
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def output_url(output) -> str:
+    """wav2lip answers with a JSON string holding {"output": url}; plain URLs and lists are accepted too."""
+    if isinstance(output, list):
+        output = output[0]
+    if isinstance(output, str) and output.lstrip().startswith("{"):
+        output = json.loads(output)
+    if isinstance(output, dict):
+        output = output["output"]
+    return output
+
+class LipSyncQueue:
+    def __init__(self, api_token: Optional[str] = None, api_base: str = API_BASE, version: str = WAV2LIP_VERSION,
+                 max_concurrent: int = 2, poll_interval: float = 1.0, max_poll_interval: float = 5.0,
+                 cache_dir: str = CACHE_DIR, timeout: float = 600.0):
+        self.api_base = api_base.rstrip("/")
+        self.version = version
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.headers = {"Authorization": f"Bearer {api_token or os.getenv('REPLICATE_API_TOKEN', '')}"}
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="lipsync")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, LipSyncJob] = {}
+        self._in_flight: Dict[str, LipSyncJob] = {}  # cache key -> job, so duplicate submits share one prediction
+        self._uploads: Dict[str, str] = {}  # file hash -> uploaded URL
+        self._upload_locks: Dict[str, threading.Lock] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def result_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mp4")
+
+    def submit(self, face_path: str, audio_path: str, params: LipSyncParams = LipSyncParams()) -> LipSyncJob:
+        face_hash, audio_hash = file_hash(face_path), file_hash(audio_path)
+        key = hashlib.sha256(json.dumps([face_hash, audio_hash, asdict(params)], sort_keys=True)
+                             .encode("utf-8")).hexdigest()
+        # Work from copies named by content, so regenerating output.mp3 cannot change a job already queued.
+        job = LipSyncJob(self._snapshot(face_path, face_hash), self._snapshot(audio_path, audio_hash), params, key,
+                         audio_name=os.path.basename(audio_path))
+        with self._lock:
+            if os.path.exists(self.result_path(key)):
+                job.status, job.output_path, job.finished_at = "cached", self.result_path(key), time.time()
+                job.done.set()
+            elif key in self._in_flight:
+                return self._in_flight[key]
+            else:
+                self._in_flight[key] = job
+                self._executor.submit(self._run, job, face_hash, audio_hash)
+            self._jobs[job.id] = job
+        return job
+
+    def _snapshot(self, path: str, digest: str) -> str:
+        snapshot = os.path.join(self.cache_dir, "inputs", digest + os.path.splitext(path)[1])
+        if not os.path.exists(snapshot):
+            os.makedirs(os.path.dirname(snapshot), exist_ok=True)
+            tmp_path = f"{snapshot}.{threading.get_ident()}.tmp"
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, snapshot)
+        return snapshot
+
+    def jobs(self) -> List[LipSyncJob]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.submitted_at, reverse=True)
+
+    def wait(self, job: LipSyncJob, timeout: Optional[float] = None) -> LipSyncJob:
+        job.done.wait(timeout)
+        return job
+
+    def _upload(self, path: str, digest: str) -> str:
+        """Upload a file once per content hash; jobs sharing a face video wait for the first upload."""
+        with self._lock:
+            digest_lock = self._upload_locks.setdefault(digest, threading.Lock())
+        with digest_lock:
+            if digest not in self._uploads:
+                with open(path, "rb") as f:
+                    response = providers.post("replicate.upload", f"{self.api_base}/files", headers=self.headers,
+                                              files={"content": (os.path.basename(path), f)}, timeout=120)
+                response.raise_for_status()
+                self._uploads[digest] = response.json()["urls"]["get"]
+            return self._uploads[digest]
+
+    def _run(self, job: LipSyncJob, face_hash: str, audio_hash: str):
+        try:
+            job.status = "uploading"
+            inputs = {"face": self._upload(job.face_path, face_hash),
+                      "audio": self._upload(job.audio_path, audio_hash), **asdict(job.params)}
+            response = providers.post("replicate.create", f"{self.api_base}/predictions", headers=self.headers,
+                                      json={"version": self.version, "input": inputs}, timeout=30)
+            response.raise_for_status()
+            prediction = response.json()
+            job.prediction_id = prediction["id"]
+            interval = self.poll_interval
+            deadline = time.time() + self.timeout
+            while prediction["status"] not in TERMINAL:
+                job.status = prediction["status"]
+                if time.time() > deadline:
+                    raise TimeoutError(f"prediction {job.prediction_id} still {job.status} after {self.timeout:.0f}s")
+                time.sleep(interval)
+                interval = min(interval * 1.5, self.max_poll_interval)
+                response = providers.get("replicate.poll", prediction["urls"]["get"], headers=self.headers,
+                                         timeout=30)
+                response.raise_for_status()
+                prediction = response.json()
+                job.polls += 1
+            if prediction["status"] != "succeeded":
+                raise RuntimeError(prediction.get("error") or f"prediction {prediction['status']}")
+            path = self.result_path(job.key)
+            providers.download(output_url(prediction["output"]), path, provider="replicate.output")
+            job.output_path, job.status = path, "succeeded"
+        except Exception as e:
+            logging.error(f"Lip-sync job {job.id} failed: {str(e)}")
+            job.status, job.error = "failed", str(e)
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._in_flight.pop(job.key, None)
+            job.done.set()
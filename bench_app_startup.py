@@ -0,0 +1,69 @@
+"""Measure cold start and rerun latency of the Streamlit apps.
+
+    python bench_app_startup.py                        # all four apps
+    python bench_app_startup.py overlap/app.py --reruns 20
+
+Each app runs in a fresh Python process through `streamlit.testing.v1.AppTest`:
+the first run includes imports and resource setup, later runs are what happens
+on every widget interaction. Overlap uses its local backend (VECTOR_BACKEND=local)
+unless the variable is already set, so no Qdrant server is needed.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+APPS = ["overlap/app.py", "merse.co/main.py", "lilac_labs/main.py", "argil_ai/defs.py"]
+
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+streamlit_import = time.perf_counter() - started
+app = AppTest.from_file(sys.argv[1], default_timeout=120)
+started = time.perf_counter()
+app.run()
+first = time.perf_counter() - started
+errors = [str(e.value) for e in app.exception]
+reruns = []
+for _ in range(int(sys.argv[2])):
+    started = time.perf_counter()
+    app.run()
+    reruns.append(time.perf_counter() - started)
+print(json.dumps({"streamlit_import": streamlit_import, "first": first, "reruns": reruns,
+                  "modules": len(sys.modules), "errors": errors}))
+"""
+
+def measure(app_path: str, reruns: int) -> dict:
+    env = dict(os.environ)
+    env.setdefault("VECTOR_BACKEND", "local")
+    env.setdefault("OPENAI_API_KEY", "bench")
+    app_dir = os.path.dirname(os.path.abspath(app_path))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [app_dir, env.get("PYTHONPATH")]))
+    with tempfile.TemporaryDirectory() as workdir:
+        output = subprocess.run([sys.executable, "-c", CHILD, os.path.abspath(app_path), str(reruns)],
+                                cwd=workdir, env=env, capture_output=True, text=True)
+    if output.returncode != 0:
+        raise RuntimeError(f"{app_path} failed:\n{output.stderr[-2000:]}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("apps", nargs="*", default=APPS)
+    parser.add_argument("--reruns", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'app':<22} {'first run ms':>13} {'rerun p50 ms':>13} {'rerun max ms':>13} {'modules':>8}")
+    for app_path in args.apps:
+        result = measure(app_path, args.reruns)
+        reruns = [seconds * 1000 for seconds in result["reruns"]] or [0.0]
+        print(f"{app_path:<22} {result['first'] * 1000:>13.1f} {statistics.median(reruns):>13.1f} "
+              f"{max(reruns):>13.1f} {result['modules']:>8}")
+        for error in result["errors"]:
+            print(f"  error: {error}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Shrink recordings before they are uploaded for transcription.
+
+Whisper works on 16 kHz mono internally, so kiosk recordings (44.1 kHz
+stereo WAV) carry several times more bytes than it can use. `preencode`
+decodes to 16 kHz mono, trims the silence before the first and after the
+last word, and re-encodes as Opus when ffmpeg is available, or as 16-bit
+WAV otherwise. Results are cached on disk under a hash of the input bytes.
+"""
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from typing import Tuple
+import numpy as np
+from chunked_transcription import SAMPLE_RATE, decode_audio, encode_wav
+
+CACHE_DIR = os.getenv("PREENCODE_CACHE_DIR", os.path.join("media", "preencoded"))
+OPUS_BITRATE = "24k"
+SILENCE_DB = -40.0  # relative to the loudest frame
+FRAME_SECONDS = 0.02
+PAD_SECONDS = 0.25
+
+@dataclass
+class Preencoded:
+    data: bytes
+    filename: str
+    mime_type: str
+    offset: float  # seconds trimmed from the start; add to every timestamp
+    input_bytes: int
+    cached: bool = False
+
+    def as_file(self) -> Tuple[str, bytes, str]:
+        return self.filename, self.data, self.mime_type
+
+def speech_bounds(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> Tuple[int, int]:
+    """First and last sample worth keeping: frames within SILENCE_DB of the peak, padded by PAD_SECONDS."""
+    frame = int(sample_rate * FRAME_SECONDS)
+    frames = len(samples) // frame
+    if frames == 0:
+        return 0, len(samples)
+    blocks = samples[:frames * frame].astype(np.float32).reshape(frames, frame)
+    level = 20 * np.log10(np.sqrt((blocks ** 2).mean(axis=1)) + 1e-9)
+    loud = np.flatnonzero(level > level.max() + SILENCE_DB)
+    if len(loud) == 0:
+        return 0, len(samples)
+    pad = int(PAD_SECONDS * sample_rate)
+    return max(0, loud[0] * frame - pad), min(len(samples), (loud[-1] + 1) * frame + pad)
+
+def encode_opus(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-f", "s16le", "-ar", str(sample_rate), "-ac", "1",
+         "-i", "pipe:0", "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip", "-f", "ogg", "pipe:1"],
+        input=samples.astype("<i2").tobytes(), capture_output=True, check=True,
+    )
+    return result.stdout
+
+def preencode(data: bytes, filename: str = "", cache_dir: str = CACHE_DIR) -> Preencoded:
+    use_opus = shutil.which("ffmpeg") is not None
+    params = {"rate": SAMPLE_RATE, "silence_db": SILENCE_DB, "pad": PAD_SECONDS,
+              "codec": f"opus-{OPUS_BITRATE}" if use_opus else "pcm16"}
+    digest = hashlib.sha256(data + json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+    stem = os.path.splitext(os.path.basename(filename))[0] or "audio"
+    ext, mime_type = ("ogg", "audio/ogg") if use_opus else ("wav", "audio/wav")
+    audio_path = os.path.join(cache_dir, f"{digest}.{ext}")
+    meta_path = os.path.join(cache_dir, f"{digest}.json")
+    if os.path.exists(audio_path) and os.path.exists(meta_path):
+        with open(audio_path, "rb") as f, open(meta_path) as m:
+            return Preencoded(f.read(), f"{stem}.{ext}", mime_type, json.load(m)["offset"], len(data), cached=True)
+
+    samples, sample_rate = decode_audio(data, filename)
+    start, end = speech_bounds(samples, sample_rate)
+    samples = samples[start:end]
+    encoded = encode_opus(samples, sample_rate) if use_opus else encode_wav(samples, sample_rate)
+    result = Preencoded(encoded, f"{stem}.{ext}", mime_type, round(start / sample_rate, 3), len(data))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    for path, payload, mode in ((audio_path, encoded, "wb"),
+                                (meta_path, json.dumps({"offset": result.offset, "source": filename}), "w")):
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".tmp-")
+        with os.fdopen(fd, mode) as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    return result
@@ -0,0 +1,178 @@
+"""Process recorded orders without the UI: transcribe, parse, and append one JSON line per file.
+
+    python batch.py recordings/ --out results.jsonl --workers 8
+    python batch.py manifest.txt --out results.jsonl --chunked
+
+The input is a directory (searched recursively for audio) or a manifest: a
+.txt file with one path per line, or a .jsonl file of {"path": ...} objects.
+The output file doubles as the checkpoint. A rerun skips every file that
+already has an "ok" line for the same path, size and modification time, so an
+interrupted run picks up where it stopped. Failed files are retried. Each line
+also has the file's "audio_hash", the content hash the UI puts in its
+transcription file names, so recordings that share a name stay distinguishable.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional
+from main import audio_digest, parse_order, transcribe_audio
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a")
+PROGRESS_SECONDS = 10.0
+STAGES = ("read_s", "transcribe_s", "summarize_s", "total_s")
+
+def list_inputs(source: str) -> List[str]:
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(directory, filename)
+            for directory, _, filenames in os.walk(source)
+            for filename in filenames
+            if filename.lower().endswith(AUDIO_EXTENSIONS)
+        )
+    base = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = json.loads(line)["path"] if source.endswith(".jsonl") else line
+            paths.append(path if os.path.isabs(path) else os.path.join(base, path))
+    return paths
+
+def fingerprint(path: str) -> Dict[str, object]:
+    stat = os.stat(path)
+    return {"path": os.path.normpath(path), "bytes": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def checkpoint_key(record: dict) -> tuple:
+    return record["path"], record["bytes"], record["mtime_ns"]
+
+def load_checkpoint(out_path: str) -> set:
+    """Fingerprints of files already processed successfully. A torn last line from a crash is ignored."""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok":
+                done.add(checkpoint_key(record))
+    return done
+
+def process_file(path: str, chunked: bool, preencode: bool) -> dict:
+    record = {"path": os.path.normpath(path)}
+    timings = {}
+    started = time.perf_counter()
+    try:
+        record.update(fingerprint(path))
+        with open(path, "rb") as f:
+            audio_file = io.BytesIO(f.read())
+        audio_file.name = os.path.basename(path)
+        record["audio_hash"] = audio_digest(audio_file.getvalue())
+        timings["read_s"] = time.perf_counter() - started
+
+        stage = time.perf_counter()
+        segments = transcribe_audio(audio_file, chunked=chunked, preencode=preencode)
+        timings["transcribe_s"] = time.perf_counter() - stage
+        transcript = " ".join(segment["text"] for segment in segments.values())
+
+        stage = time.perf_counter()
+        order, parser = parse_order(transcript)
+        timings["summarize_s"] = time.perf_counter() - stage
+        record.update(status="ok", transcript=transcript, segments=segments, order=order, parser=parser)
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    timings["total_s"] = time.perf_counter() - started
+    record["timings"] = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+    return record
+
+def run_batch(paths: List[str], out_path: str, workers: int = 4, chunked: bool = False, preencode: bool = False,
+              progress: Optional[float] = PROGRESS_SECONDS) -> dict:
+    """Process `paths` with at most `workers` files in flight and append each result to `out_path`."""
+    done = load_checkpoint(out_path)
+    todo = [path for path in paths if not os.path.exists(path) or checkpoint_key(fingerprint(path)) not in done]
+    report = {"files": len(paths), "skipped": len(paths) - len(todo), "ok": 0, "failed": 0, "timings": {},
+              "parsers": {}}
+    started = last_progress = time.perf_counter()
+    pending = iter(todo)
+    with open(out_path, "a+") as out, ThreadPoolExecutor(max_workers=workers) as executor:
+        if out.tell() > 0:
+            out.seek(out.tell() - 1)
+            if out.read(1) != "\n":
+                out.write("\n")  # finish a line torn by a crash so the next record starts cleanly
+        in_flight = set()
+        try:
+            while True:
+                # Keep a small window of submitted work so a huge batch never queues every file at once.
+                while len(in_flight) < workers * 2:
+                    path = next(pending, None)
+                    if path is None:
+                        break
+                    in_flight.add(executor.submit(process_file, path, chunked, preencode))
+                if not in_flight:
+                    break
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    out.write(json.dumps(record) + "\n")
+                    out.flush()
+                    report["ok" if record["status"] == "ok" else "failed"] += 1
+                    if record.get("parser"):
+                        report["parsers"][record["parser"]] = report["parsers"].get(record["parser"], 0) + 1
+                    for stage, seconds in record["timings"].items():
+                        report["timings"].setdefault(stage, []).append(seconds)
+                now = time.perf_counter()
+                if progress and now - last_progress >= progress:
+                    last_progress = now
+                    processed = report["ok"] + report["failed"]
+                    print(f"{processed}/{len(todo)} files, {processed / (now - started):.2f} files/s",
+                          file=sys.stderr)
+        except KeyboardInterrupt:
+            for future in in_flight:
+                future.cancel()
+            report["interrupted"] = True
+            logging.warning("Interrupted; rerun the same command to resume")
+    report["seconds"] = time.perf_counter() - started
+    processed = report["ok"] + report["failed"]
+    report["files_per_second"] = processed / report["seconds"] if report["seconds"] else 0.0
+    report["timings"] = {stage: percentiles(report["timings"][stage]) for stage in STAGES if stage in report["timings"]}
+    return report
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {"p50": round(pick(0.5), 4), "p95": round(pick(0.95), 4), "p99": round(pick(0.99), 4)}
+
+def format_report(report: dict) -> Iterator[str]:
+    yield (f"{report['ok']} ok, {report['failed']} failed, {report['skipped']} already done, "
+           f"{report['seconds']:.1f}s, {report['files_per_second']:.2f} files/s")
+    if report["parsers"]:
+        yield "parser: " + ", ".join(f"{parser} {count}" for parser, count in sorted(report["parsers"].items()))
+    for stage, stats in report["timings"].items():
+        yield f"{stage:<13} p50 {stats['p50']:.3f}s  p95 {stats['p95']:.3f}s  p99 {stats['p99']:.3f}s"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="directory of audio files, or a .txt/.jsonl manifest")
+    parser.add_argument("--out", default="results.jsonl")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunked", action="store_true", help="split long recordings and transcribe in parallel")
+    parser.add_argument("--preencode", action="store_true", help="downmix, resample and trim audio before upload")
+    args = parser.parse_args()
+
+    paths = list_inputs(args.source)
+    report = run_batch(paths, args.out, workers=args.workers, chunked=args.chunked,
+                       preencode=args.preencode)
+    for line in format_report(report):
+        print(line)
+
+if __name__ == "__main__":
+    main()
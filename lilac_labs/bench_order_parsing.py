@@ -0,0 +1,196 @@
+"""Hit rate, accuracy and latency of the local menu parser on generated drive-thru orders.
+
+    python bench_order_parsing.py --orders 2000
+    python bench_order_parsing.py --orders 50 --llm   # also time the gpt-4o fallback (needs OPENAI_API_KEY)
+
+Orders are built from menu.json: plain ones ("two cheeseburgers and a large
+coke", "a toasted chicken wrap, no mayo"), some with a misheard item name, and a
+share of hard ones. Those have corrections, meals, off-menu requests, the same
+request said twice, a piece count ("a 10 piece chicken mcnuggets") or a
+modifier that belongs to an earlier item ("a coke and a cheeseburger with no
+ice"). A local answer only counts as correct if it matches the intended items,
+quantities and modifiers exactly. A short list of hand-written orders, phrased
+outside the generator's grammar, is checked as well.
+"""
+import argparse
+import json
+import random
+import time
+from menu_catalog import MENU_PATH, MenuExtractor, ParseStats
+
+NUMBERS = ["a", "one", "two", "three", "four", "2", "3"]
+VALUES = {"a": 1, "one": 1, "two": 2, "three": 3, "four": 4, "2": 2, "3": 3}
+OPENERS = ["", "Hi, ", "Can I get ", "I'd like ", "I need ", "Hey, can I have ", "Um, I want "]
+CLOSERS = ["", ".", " please.", ", that's all.", ", thanks!", ". That's all, thank you."]
+HARD = [
+    "{a}, actually make that {b}",
+    "{a} and {b}, no wait, cancel the last one",
+    "Can I get the {a} meal with a {b}?",
+    "{a}, or maybe {b}, whatever is faster",
+    "I'll have {a} and something vegan, what do you have?",
+    "{a} but not too salty and {b} half and half",
+    "{a}. {a}",
+    "I want {a}, I want {a}",
+]
+SIZES = ["large", "medium", "small"]
+
+PIECE_COUNTS = ["4", "6", "10", "20", "four", "six", "ten"]
+# Written by hand, not by `make_order`, so the parser is not only graded on its own grammar.
+HAND_WRITTEN = [
+    ("a 10 piece chicken mcnuggets", None),
+    ("a six piece nuggets and a coke", None),
+    ("Can I get one 4 piece mcnuggets please", None),
+    ("two ten piece nuggets", None),
+    ("20 piece chicken nuggets and a big mac", None),
+    ("a two big macs", None),
+    ("a couple of big macs", {("Big Mac", ""): 2}),
+    ("two dozen nuggets", {("Chicken McNuggets", ""): 24}),
+    ("a dozen nuggets and a big mac", {("Chicken McNuggets", ""): 12, ("Big Mac", ""): 1}),
+]
+
+def misheard(alias: str, rng: random.Random) -> str:
+    word = max(alias.split(), key=len)
+    if len(word) < 6:
+        return alias
+    i = rng.randrange(1, len(word) - 1)
+    return alias.replace(word, word[:i] + word[i + 1:], 1)
+
+def applicable(menu: dict, item: dict, prefix: bool) -> list:
+    return [modifier for modifier in menu["modifiers"] if bool(modifier.get("prefix")) == prefix
+            and item["category"] in modifier.get("categories", [item["category"]])]
+
+def names_another_item(menu: dict, phrase: str, item: dict) -> bool:
+    """ "spicy chicken burger" is an alias of McSpicy, not a spicy Chicken Burger."""
+    return any(phrase.startswith(alias) for other in menu["items"] if other is not item
+               for alias in other["aliases"])
+
+def misplaced_modifier(menu: dict, rng: random.Random):
+    """A modifier said after an item it does not apply to, e.g. "a coke and a cheeseburger with no ice"."""
+    while True:
+        first, second = rng.sample(menu["items"], 2)
+        choices = [m for m in applicable(menu, first, False) if m not in applicable(menu, second, False)]
+        if choices:
+            modifier = rng.choice(choices)
+            return (f"a {first['aliases'][0]} and a {second['aliases'][0]} "
+                    f"{rng.choice(['', 'with '])}{rng.choice(modifier['aliases'])}")
+
+def piece_count(menu: dict, rng: random.Random, parts: list) -> str:
+    """A box size said as a number, e.g. "a six piece nuggets": the number is not how many boxes."""
+    nuggets = next(item for item in menu["items"] if item["name"] == "Chicken McNuggets")
+    phrase = f"{rng.choice(['a', 'one', 'two', ''])} {rng.choice(PIECE_COUNTS)} {rng.choice(['piece', 'pieces'])} "
+    phrase = (phrase + rng.choice(nuggets["aliases"])).strip()
+    return phrase if rng.random() < 0.5 else f"{phrase} and {parts[0]}"
+
+def make_order(menu: dict, rng: random.Random, hard_rate: float, typo_rate: float):
+    """Return (transcript, expected items or None when a human would need to read it)."""
+    parts, expected = [], {}
+    for item in rng.sample(menu["items"], rng.randint(1, 4)):
+        number = rng.choice(NUMBERS)
+        quantity = VALUES[number]
+        alias = rng.choice([item["name"]] + item["aliases"]).lower()
+        if quantity > 1 and not alias.endswith("s"):
+            alias += "s"
+        if rng.random() < typo_rate:
+            alias = misheard(alias, rng)
+        modifiers = []
+        phrase = alias
+        extras = applicable(menu, item, False)
+        if extras and rng.random() < 0.15:
+            # a modifier in front of the item: "a toasted chicken wrap"
+            modifier = rng.choice(extras)
+            before = rng.choice([a for a in modifier["aliases"] if not a.startswith("with ")])
+            if not names_another_item(menu, f"{before} {alias}", item):
+                phrase = f"{before} {alias}"
+                modifiers.append(modifier["text"])
+                extras = [m for m in extras if m is not modifier]
+        if applicable(menu, item, True) and rng.random() < 0.3:
+            size = rng.choice(SIZES)
+            phrase = f"{size} {phrase}"
+            modifiers.insert(0, size.capitalize())
+        if extras and rng.random() < 0.3:
+            modifier = rng.choice(extras)
+            phrase += rng.choice([" ", ", ", " with "]) + rng.choice(modifier["aliases"])
+            modifiers.append(modifier["text"])
+        parts.append(f"{number} {phrase}")
+        key = (item["name"], ", ".join(modifiers))
+        expected[key] = expected.get(key, 0) + quantity
+    if rng.random() < hard_rate:
+        roll = rng.random()
+        if roll < 0.2:
+            return misplaced_modifier(menu, rng), None
+        if roll < 0.4:
+            return piece_count(menu, rng, parts), None
+        a, b = parts[0], rng.choice(parts)
+        return rng.choice(HARD).format(a=a, b=b), None
+    body = parts[0] if len(parts) == 1 else ", ".join(parts[:-1]) + " and " + parts[-1]
+    return rng.choice(OPENERS) + body + rng.choice(CLOSERS), expected
+
+def as_expected(items) -> dict:
+    return {(item["order_item"], item["special_instructions"]): item["item_quantity"] for item in items}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--hard-rate", type=float, default=0.15)
+    parser.add_argument("--typo-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm", action="store_true", help="send the orders the parser declines to gpt-4o")
+    args = parser.parse_args()
+
+    with open(MENU_PATH) as f:
+        menu = json.load(f)
+    started = time.perf_counter()
+    extractor = MenuExtractor(menu)
+    print(f"menu index built in {(time.perf_counter() - started) * 1000:.1f} ms "
+          f"({len(extractor.phrases)} aliases)")
+
+    rng = random.Random(args.seed)
+    orders = [make_order(menu, rng, args.hard_rate, args.typo_rate) for _ in range(args.orders)]
+    stats = ParseStats()
+    correct = wrong = declined_plain = accepted_hard = 0
+    fallback = []
+    for transcript, expected in orders:
+        started = time.perf_counter()
+        items = extractor.extract(transcript)
+        if items is None:
+            fallback.append(transcript)
+            declined_plain += expected is not None
+            continue
+        stats.record("local", time.perf_counter() - started)
+        if expected is None:
+            accepted_hard += 1
+        elif as_expected(items) == expected:
+            correct += 1
+        else:
+            wrong += 1
+            print(f"  mismatch: {transcript!r} -> {items}")
+
+    hand_wrong = 0
+    for transcript, expected in HAND_WRITTEN:
+        items = extractor.extract(transcript)
+        if (items is None) != (expected is None) or (items is not None and as_expected(items) != expected):
+            hand_wrong += 1
+            print(f"  hand-written: {transcript!r} -> {items}, expected {expected}")
+
+    if args.llm:
+        from main import summarize_order_llm
+        for transcript in fallback:
+            started = time.perf_counter()
+            summarize_order_llm(transcript)
+            stats.record("llm", time.perf_counter() - started)
+
+    local = stats.seconds.get("local", [])
+    print(f"\norders {len(orders)}, plain {sum(1 for _, e in orders if e is not None)}, "
+          f"hard {sum(1 for _, e in orders if e is None)}")
+    print(f"parsed locally {len(local)} ({len(local) / len(orders):.1%}), sent to the LLM {len(fallback)}")
+    print(f"local answers: {correct} correct, {wrong} wrong, {accepted_hard} hard orders accepted")
+    print(f"plain orders declined: {declined_plain}")
+    print(f"hand-written orders: {len(HAND_WRITTEN) - hand_wrong}/{len(HAND_WRITTEN)} as expected")
+    print()
+    for row in stats.summary():
+        print(row)
+    if not args.llm:
+        print("(run with --llm to time the fallback path against the API)")
+
+if __name__ == "__main__":
+    main()
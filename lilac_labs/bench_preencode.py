@@ -0,0 +1,94 @@
+"""Upload bytes and end-to-end transcription latency with and without audio pre-encoding.
+
+    python bench_preencode.py --files 20 --uplink-mbps 8
+
+Builds kiosk-style recordings: 44.1 kHz stereo WAV with a few seconds of room
+noise before and after the order. It then transcribes them through
+transcribe_audio against the fake transcription server, whose uplink is
+throttled. It compares sending the files as recorded, pre-encoding them
+(cold cache) and pre-encoding them again (warm cache). Transcripts and
+timestamps must match between modes.
+"""
+import argparse
+import io
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+import wave
+import numpy as np
+from chunked_transcription import resample
+from fake_transcription_server import SAMPLE_RATE, FakeTranscriptionServer, speak, synthesize_speech
+
+KIOSK_RATE = 44100
+
+def kiosk_recording(seed: int) -> bytes:
+    rng = random.Random(seed)
+    if rng.random() < 0.7:
+        speech = speak("i need two paneer burgers and a large coke please", seed=seed)
+    else:
+        speech, _ = synthesize_speech(rng.uniform(15, 45), seed=seed)
+    lead, tail = rng.uniform(1.5, 4.0), rng.uniform(2.0, 6.0)
+    noise = np.random.default_rng(seed).normal(0, 40, int((lead + tail) * SAMPLE_RATE))
+    split = int(lead * SAMPLE_RATE)
+    mono = np.concatenate([noise[:split], speech.astype(np.float32), noise[split:]])
+    mono = resample(mono, SAMPLE_RATE, KIOSK_RATE)
+    stereo = np.stack([mono, mono * 0.9], axis=1)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(KIOSK_RATE)
+        wav.writeframes(np.clip(stereo, -32768, 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+def run(recordings, preencode: bool, server, transcribe_audio):
+    sent_before = server.bytes_received
+    latencies, results = [], []
+    for i, data in enumerate(recordings):
+        audio_file = io.BytesIO(data)
+        audio_file.name = f"kiosk_{i}.wav"
+        started = time.perf_counter()
+        results.append(transcribe_audio(audio_file, preencode=preencode))
+        latencies.append(time.perf_counter() - started)
+    return server.bytes_received - sent_before, latencies, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--uplink-mbps", type=float, default=8.0)
+    parser.add_argument("--base-latency", type=float, default=0.3)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    recordings = [kiosk_recording(seed) for seed in range(args.files)]
+    with tempfile.TemporaryDirectory() as cache_dir, \
+            FakeTranscriptionServer(base_latency=args.base_latency,
+                                    upload_bytes_per_second=args.uplink_mbps * 1e6 / 8) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "bench")
+        os.environ["PREENCODE_CACHE_DIR"] = cache_dir
+        from main import transcribe_audio
+
+        print(f"{args.files} kiosk recordings, {args.uplink_mbps:g} Mbit/s uplink\n")
+        print(f"{'mode':<22} {'uploaded MB':>12} {'per file KB':>12} {'p50 s':>7} {'p95 s':>7} {'total s':>8}")
+        baseline = None
+        for name, preencode in (("as recorded", False), ("pre-encoded (cold)", True), ("pre-encoded (cached)", True)):
+            sent, latencies, results = run(recordings, preencode, server, transcribe_audio)
+            ordered = sorted(latencies)
+            print(f"{name:<22} {sent / 2**20:>12.2f} {sent / 1024 / len(recordings):>12.0f} "
+                  f"{statistics.median(latencies):>7.2f} {ordered[int(0.95 * (len(ordered) - 1))]:>7.2f} "
+                  f"{sum(latencies):>8.2f}")
+            if baseline is None:
+                baseline = results
+                continue
+            texts_match = all([s["text"] for s in a.values()] == [s["text"] for s in b.values()]
+                              for a, b in zip(baseline, results))
+            drift = max((abs(x["start"] - y["start"]) for a, b in zip(baseline, results)
+                         for x, y in zip(a.values(), b.values())), default=0.0)
+            print(f"{'':<22} transcripts match: {texts_match}, max timestamp drift {drift:.2f}s")
+
+if __name__ == "__main__":
+    main()
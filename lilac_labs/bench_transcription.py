@@ -0,0 +1,87 @@
+"""Transcription latency against audio length: one Whisper call versus chunks in parallel.
+
+    python bench_transcription.py --minutes 0.5 2 5 10 15
+
+Runs against a local fake transcription server (see fake_transcription_server.py)
+through the real OpenAI client. The server takes longer the more audio it gets,
+and it rejects uploads over 25 MB like the real API. The merged chunked
+transcript is checked word for word, and its timestamps are compared, against
+what the recording actually contains. The client is warmed up first, and each
+time is the median of `--repeats` runs.
+"""
+import argparse
+import difflib
+import logging
+import os
+import statistics
+import time
+from chunked_transcription import MAX_WORKERS, encode_wav, transcribe_chunked
+from fake_transcription_server import FakeTranscriptionServer, synthesize_speech
+
+def transcript_words(segments) -> list:
+    return " ".join(segment["text"] for segment in segments).replace(".", "").split()
+
+def word_errors(expected: list, actual: list) -> int:
+    matcher = difflib.SequenceMatcher(a=expected, b=actual, autojunk=False)
+    return sum(max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal")
+
+def median_seconds(fn, repeats: int):
+    """Median wall time of `fn()` over `repeats` runs, and its last result."""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, nargs="+", default=[0.5, 2, 5, 10, 15])
+    parser.add_argument("--chunk-seconds", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--base-latency", type=float, default=0.5)
+    parser.add_argument("--seconds-per-audio-second", type=float, default=0.02)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with FakeTranscriptionServer(base_latency=args.base_latency,
+                                 seconds_per_audio_second=args.seconds_per_audio_second) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "bench")
+        from main import whisper_segments
+
+        # Import the SDK and open the connection before anything is timed
+        warmup, _ = synthesize_speech(2.0, seed=0)
+        whisper_segments(("warmup.wav", encode_wav(warmup), "audio/wav"))
+
+        print(f"{'audio':>7} {'MB':>6} {'single s':>9} {'chunked s':>10} {'chunks':>7} {'speedup':>8} "
+              f"{'word errors':>12} {'max start drift s':>18}")
+        for minutes in args.minutes:
+            samples, words = synthesize_speech(minutes * 60, seed=int(minutes * 10))
+            data = encode_wav(samples)
+
+            try:
+                single_seconds, reference = median_seconds(
+                    lambda: whisper_segments(("order.wav", data, "audio/wav")), args.repeats)
+                single = f"{single_seconds:.2f}"
+            except Exception as e:
+                reference, single_seconds = None, None
+                single = f"{getattr(e, 'status_code', 'error')}"
+
+            requests_before = server.requests
+            chunked, merged = median_seconds(
+                lambda: transcribe_chunked(data, "order.wav", whisper_segments, max_workers=args.workers,
+                                           chunk_seconds=args.chunk_seconds), args.repeats)
+            chunks = (server.requests - requests_before) // args.repeats
+
+            errors = word_errors(words, transcript_words(merged.values()))
+            drift = "-"
+            if reference is not None and len(reference) == len(merged):
+                drift = f"{max(abs(a['start'] - b['start']) for a, b in zip(reference, merged.values())):.2f}"
+            speedup = f"{single_seconds / chunked:.1f}x" if single_seconds else "-"
+            print(f"{minutes:>5.1f}m {len(data) / 2**20:>6.1f} {single:>9} {chunked:>10.2f} {chunks:>7} "
+                  f"{speedup:>8} {errors:>12} {drift:>18}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Split long recordings on silence and transcribe the chunks concurrently.
+
+Audio is decoded to 16 kHz mono PCM, cut at the quietest point near every
+`CHUNK_SECONDS`, and each chunk is padded with `OVERLAP_SECONDS` of its
+neighbours so a word that straddles a cut is heard whole at least once.
+Chunk timestamps are shifted back onto the recording's timeline. A chunk only
+keeps the segments whose midpoint falls inside its own span, and any words
+repeated across a cut are dropped.
+"""
+import io
+import logging
+import re
+import shutil
+import subprocess
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple, Union
+import numpy as np
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 60.0
+SEARCH_SECONDS = 10.0
+OVERLAP_SECONDS = 1.0
+FRAME_SECONDS = 0.03
+PAUSE_SECONDS = 0.3
+MAX_WORKERS = 4
+
+Segment = Dict[str, Union[str, float]]
+
+@dataclass
+class Chunk:
+    index: int
+    start: float  # audio sent to the API, including overlap
+    end: float
+    own_start: float  # the part of the timeline this chunk is responsible for
+    own_end: float
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Windowed-sinc low-pass below the new Nyquist frequency, then linear interpolation onto the new grid."""
+    samples = samples.astype(np.float32)
+    if source_rate == target_rate:
+        return samples
+    if target_rate < source_rate:
+        cutoff = 0.45 * target_rate / source_rate
+        taps = np.arange(-32, 33)
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps))
+        samples = np.convolve(samples, (kernel / kernel.sum()).astype(np.float32), mode="same")
+    positions = np.arange(int(len(samples) * target_rate / source_rate)) * (source_rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+def decode_audio(data: bytes, filename: str = "") -> Tuple[np.ndarray, int]:
+    """Return int16 mono samples at SAMPLE_RATE. 16-bit WAV is read with numpy; anything else goes through ffmpeg."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        with wave.open(io.BytesIO(data)) as wav:
+            if wav.getsampwidth() == 2:
+                samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2")
+                samples = samples.reshape(-1, wav.getnchannels()).mean(axis=1)
+                samples = resample(samples, wav.getframerate())
+                return np.clip(np.round(samples), -32768, 32767).astype(np.int16), SAMPLE_RATE
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError(f"ffmpeg is required to decode {filename or 'this audio'}")
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+         "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"],
+        input=data, capture_output=True, check=True,
+    )
+    return np.frombuffer(result.stdout, dtype="<i2"), SAMPLE_RATE
+
+def encode_wav(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.astype("<i2").tobytes())
+    return buffer.getvalue()
+
+def frame_energy(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Loudness per FRAME_SECONDS frame, smoothed over PAUSE_SECONDS so the minimum lands inside a real pause."""
+    frame = int(sample_rate * FRAME_SECONDS)
+    frames = len(samples) // frame
+    if frames == 0:
+        return np.zeros(0)
+    blocks = samples[:frames * frame].astype(np.float32).reshape(frames, frame)
+    rms = np.sqrt((blocks ** 2).mean(axis=1))
+    width = max(1, int(PAUSE_SECONDS / FRAME_SECONDS))
+    return np.convolve(rms, np.ones(width) / width, mode="same")
+
+def plan_chunks(samples: np.ndarray, sample_rate: int, chunk_seconds: float = CHUNK_SECONDS,
+                search_seconds: float = SEARCH_SECONDS, overlap_seconds: float = OVERLAP_SECONDS) -> List[Chunk]:
+    if chunk_seconds <= 0:
+        raise ValueError(f"chunk_seconds must be positive, got {chunk_seconds}")
+    duration = len(samples) / sample_rate
+    energy = frame_energy(samples, sample_rate)
+    cuts = [0.0]
+    while duration - cuts[-1] > chunk_seconds + search_seconds:
+        target = cuts[-1] + chunk_seconds
+        # search strictly after the previous cut, or a window wider than the chunk could cut in the same place again
+        lo = max(int((target - search_seconds) / FRAME_SECONDS), int(cuts[-1] / FRAME_SECONDS) + 1)
+        hi = int((target + search_seconds) / FRAME_SECONDS)
+        cuts.append((lo + int(np.argmin(energy[lo:hi]))) * FRAME_SECONDS + FRAME_SECONDS / 2)
+    cuts.append(duration)
+    return [
+        Chunk(index=i, start=max(0.0, own_start - overlap_seconds), end=min(duration, own_end + overlap_seconds),
+              own_start=own_start, own_end=own_end)
+        for i, (own_start, own_end) in enumerate(zip(cuts, cuts[1:]))
+    ]
+
+def _words(text: str) -> List[str]:
+    return [re.sub(r"[^\w']", "", word).lower() for word in text.split()]
+
+def _trim_repeated_words(previous: str, text: str, max_words: int = 8) -> str:
+    """Drop the leading words of `text` that repeat the trailing words of `previous` (at least two)."""
+    before, after = _words(previous), _words(text)
+    for n in range(min(max_words, len(before), len(after)), 1, -1):
+        if before[-n:] == after[:n]:
+            return " " + " ".join(text.split()[n:])
+    return text
+
+def merge_segments(chunks: List[Chunk], results: List[List[Segment]]) -> Dict[str, Segment]:
+    """Shift each chunk's segments onto the full timeline, keep the ones it owns and number them segment_N."""
+    merged: List[Segment] = []
+    for chunk, segments in zip(chunks, results):
+        first = True
+        for segment in segments:
+            start = chunk.start + segment.get("start", 0)
+            end = chunk.start + segment.get("end", 0)
+            if not chunk.own_start <= (start + end) / 2 < chunk.own_end:
+                continue
+            text = segment.get("text", "")
+            if first and merged:
+                text = _trim_repeated_words(merged[-1]["text"], text)
+            first = False
+            if text.strip():
+                merged.append({"text": text, "start": round(start, 2), "end": round(end, 2)})
+    return {f"segment_{idx}": segment for idx, segment in enumerate(merged, 1)}
+
+def transcribe_chunked(data: bytes, filename: str, transcribe: Callable[[Tuple[str, bytes, str]], List[Segment]],
+                       max_workers: int = MAX_WORKERS, chunk_seconds: float = CHUNK_SECONDS) -> Dict[str, Segment]:
+    """Transcribe `data` chunk by chunk with up to `max_workers` requests in flight.
+
+    `transcribe` receives an OpenAI-style file tuple and returns that chunk's
+    segments, with times relative to the start of the chunk.
+    """
+    started = time.perf_counter()
+    samples, sample_rate = decode_audio(data, filename)
+    chunks = plan_chunks(samples, sample_rate, chunk_seconds=chunk_seconds)
+    files = [
+        (f"chunk_{chunk.index + 1}.wav",
+         encode_wav(samples[int(chunk.start * sample_rate):int(chunk.end * sample_rate)], sample_rate),
+         "audio/wav")
+        for chunk in chunks
+    ]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(transcribe, files))
+    merged = merge_segments(chunks, results)
+    logging.info(f"Transcribed {len(samples) / sample_rate:.0f}s of audio in {len(chunks)} chunks "
+                 f"and {time.perf_counter() - started:.2f}s")
+    return merged
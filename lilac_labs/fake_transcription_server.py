@@ -0,0 +1,193 @@
+import email.parser
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+import numpy as np
+from chunked_transcription import decode_audio
+
+SAMPLE_RATE = 16000
+VOCABULARY = (
+    "i need two three one paneer burgers burger and a packet of chicken mcnuggets also want chocolate "
+    "vanilla milkshake large small medium fries coke diet no ice extra cheese with without onions please "
+    "make it almond milk because lactose intolerant that's all thanks"
+).split()
+WORD_SECONDS = 0.3
+WORD_GAP_SECONDS = 0.1
+BASE_HZ = 300.0
+STEP_HZ = 25.0
+
+def _tone(word: str) -> np.ndarray:
+    hz = BASE_HZ + STEP_HZ * VOCABULARY.index(word)
+    n = int(WORD_SECONDS * SAMPLE_RATE)
+    ramp = np.minimum(1.0, np.minimum(np.arange(n), np.arange(n)[::-1]) / 160)
+    return 0.5 * ramp * np.sin(2 * np.pi * hz * np.arange(n) / SAMPLE_RATE)
+
+def speak(text: str, seed: int = 0) -> np.ndarray:
+    """Tone speech for `text`, whose words must all be in VOCABULARY, with half a second of silence around it."""
+    silence = np.zeros(int(0.5 * SAMPLE_RATE))
+    audio = [silence]
+    for word in text.lower().split():
+        audio += [_tone(word), np.zeros(int(WORD_GAP_SECONDS * SAMPLE_RATE))]
+    samples = np.concatenate(audio + [silence])
+    samples += np.random.default_rng(seed).normal(0, 0.002, len(samples))
+    return (samples * 32767).astype(np.int16)
+
+def synthesize_speech(duration: float, seed: int = 0) -> Tuple[np.ndarray, List[str]]:
+    """Tone "speech": every word is a short tone at its own pitch, and sentences are split by pauses.
+
+    Returns int16 samples at SAMPLE_RATE and the words in order, which is what a perfect transcript contains.
+    """
+    rng = random.Random(seed)
+    audio, words = [], []
+    t = 0.0
+    while True:
+        sentence = [rng.choice(VOCABULARY) for _ in range(rng.randint(4, 12))]
+        length = len(sentence) * (WORD_SECONDS + WORD_GAP_SECONDS)
+        pause = rng.uniform(0.7, 1.6)
+        if t + length + pause > duration:
+            break
+        for word in sentence:
+            audio.append(_tone(word))
+            audio.append(np.zeros(int(WORD_GAP_SECONDS * SAMPLE_RATE)))
+        audio.append(np.zeros(int(pause * SAMPLE_RATE)))
+        words.extend(sentence)
+        t += length + pause
+    audio.append(np.zeros(int((duration - t) * SAMPLE_RATE)))
+    samples = np.concatenate(audio)
+    samples += np.random.default_rng(seed).normal(0, 0.002, len(samples))
+    return (samples * 32767).astype(np.int16), words
+
+def recognize(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> List[dict]:
+    """Turn tone bursts back into words and group them into segments at pauses of half a second or more."""
+    frame = sample_rate // 100
+    frames = len(samples) // frame
+    blocks = samples[:frames * frame].astype(np.float32).reshape(frames, frame) / 32768
+    loud = np.sqrt((blocks ** 2).mean(axis=1)) > 0.05
+    bursts, start = [], None
+    for i, on in enumerate(np.append(loud, False)):
+        if on and start is None:
+            start = i
+        elif not on and start is not None:
+            if i - start >= 8:  # fragments under 80 ms are not words
+                burst = samples[start * frame:i * frame]
+                hz = np.argmax(np.abs(np.fft.rfft(burst))) * sample_rate / len(burst)
+                index = int(round((hz - BASE_HZ) / STEP_HZ))
+                bursts.append((start / 100, i / 100, VOCABULARY[max(0, min(len(VOCABULARY) - 1, index))]))
+            start = None
+    segments = []
+    for begin, end, word in bursts:
+        if segments and begin - segments[-1]["end"] < 0.5:
+            segments[-1]["end"] = end
+            segments[-1]["words"].append(word)
+        else:
+            segments.append({"start": begin, "end": end, "words": [word]})
+    return [
+        {"id": i, "seek": 0, "start": round(s["start"], 2), "end": round(s["end"], 2),
+         "text": " " + " ".join(s["words"]) + ".", "tokens": [], "temperature": 0.0, "avg_logprob": -0.1,
+         "compression_ratio": 1.0, "no_speech_prob": 0.0}
+        for i, s in enumerate(segments)
+    ]
+
+class FakeTranscriptionServer:
+    """A local stand-in for the Whisper `audio/transcriptions` endpoint.
+
+    It accepts uploads of tone speech (see `synthesize_speech`) in any format
+    `decode_audio` reads, and answers in `verbose_json` form. A request takes
+    `base_latency` plus `seconds_per_audio_second` for every second of audio,
+    plus the upload time at `upload_bytes_per_second` if set. Uploads over
+    `max_upload_bytes` are rejected with 413, as the real API does above 25 MB.
+    """
+
+    def __init__(self, base_latency: float = 0.5, seconds_per_audio_second: float = 0.02,
+                 max_upload_bytes: int = 25 * 1024 * 1024, upload_bytes_per_second: Optional[float] = None, host: str = "127.0.0.1", port: int = 0):
+        self.base_latency = base_latency
+        self.seconds_per_audio_second = seconds_per_audio_second
+        self.max_upload_bytes = max_upload_bytes
+        self.upload_bytes_per_second = upload_bytes_per_second
+        self.bytes_received = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _transcribe(self, upload: bytes) -> dict:
+        samples, sample_rate = decode_audio(upload)
+        duration = len(samples) / sample_rate
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += len(upload)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            upload_seconds = len(upload) / self.upload_bytes_per_second if self.upload_bytes_per_second else 0.0
+            time.sleep(upload_seconds + self.base_latency + self.seconds_per_audio_second * duration)
+            segments = recognize(samples, sample_rate)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        return {
+            "task": "transcribe", "language": "english", "duration": duration,
+            "text": "".join(segment["text"] for segment in segments).strip(), "segments": segments,
+        }
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, status: int, body: dict):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not self.path.endswith("/audio/transcriptions"):
+                    self._reply(404, {"error": {"message": f"{self.path} is not served here", "type": "not_found"}})
+                    return
+                message = email.parser.BytesParser().parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + body)
+                upload = next((part.get_payload(decode=True) for part in message.get_payload()
+                               if part.get_param("name", header="content-disposition") == "file"), None)
+                if upload is None:
+                    self._reply(400, {"error": {"message": "file is required", "type": "invalid_request_error"}})
+                elif len(upload) > fake.max_upload_bytes:
+                    self._reply(413, {"error": {"message": "Maximum content size limit exceeded",
+                                                "type": "invalid_request_error"}})
+                else:
+                    self._reply(200, fake._transcribe(upload))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -1,13 +1,14 @@
 import streamlit as st
 import logging
+import hashlib
 import json
-from openai import OpenAI
 from pydantic import BaseModel
-from typing import List, Dict, Union
+from typing import List, Dict, Tuple, Union
 from dotenv import load_dotenv
-import openai
-from openai import OpenAI
 import os
+import subprocess
+import time
+import menu_catalog
 
 # Load environment variables from .env file
 load_dotenv()
@@ -15,8 +16,16 @@ load_dotenv()
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# OpenAI client, created on first use and shared across reruns
+@st.cache_resource
+def get_openai_client():
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+# Menu index for the local order parser, built once per process
+@st.cache_resource
+def get_menu_extractor():
+    return menu_catalog.MenuExtractor.from_file(os.getenv("MENU_CATALOG", menu_catalog.MENU_PATH))
 
 class OrderItem(BaseModel):
     order_item: str
@@ -26,38 +35,80 @@ class OrderItem(BaseModel):
 class OrderStructure(BaseModel):
     items: List[OrderItem]
 
-def transcribe_audio(audio_file) -> Dict[str, Dict[str, Union[str, float]]]:
+def whisper_segments(audio_file) -> List[Dict[str, Union[str, float]]]:
+    response = get_openai_client().audio.transcriptions.create(
+        model="whisper-1",
+        file=audio_file,
+        response_format="verbose_json",
+    )
+    return [
+        {"text": segment.get("text", ""), "start": segment.get("start", 0), "end": segment.get("end", 0)}
+        for segment in response.to_dict().get("segments", [])
+    ]
+
+def transcribe_audio(audio_file, chunked: bool = False,
+                     preencode: bool = False) -> Dict[str, Dict[str, Union[str, float]]]:
     try:
-        response = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file,
-            response_format="verbose_json",
-        )
-        
-        response_dict = response.to_dict()
-        
-        transcription_data = {}
-        for idx, segment in enumerate(response_dict.get("segments", []), 1):
-            segment_key = f"segment_{idx}"
-            transcription_data[segment_key] = {
-                "text": segment.get("text", ""),
-                "start": segment.get("start", 0),
-                "end": segment.get("end", 0)
+        transcription_data = None
+        if chunked:
+            from chunked_transcription import transcribe_chunked
+            try:
+                transcription_data = transcribe_chunked(audio_file.getvalue(), audio_file.name, whisper_segments)
+            except (RuntimeError, subprocess.CalledProcessError) as e:
+                logging.warning(f"Could not split the audio, sending it whole: {str(e)}")
+        if transcription_data is None:
+            upload, offset = audio_file, 0.0
+            if preencode:
+                from audio_preprocess import preencode as preencode_audio
+                try:
+                    prepared = preencode_audio(audio_file.getvalue(), audio_file.name)
+                    upload, offset = prepared.as_file(), prepared.offset
+                    logging.info(f"Pre-encoded {prepared.input_bytes} bytes to {len(prepared.data)} "
+                                 f"({'cached' if prepared.cached else 'fresh'})")
+                except (RuntimeError, subprocess.CalledProcessError) as e:
+                    logging.warning(f"Could not pre-encode the audio, sending it as uploaded: {str(e)}")
+            transcription_data = {
+                f"segment_{idx}": {**segment, "start": round(segment["start"] + offset, 2),
+                                    "end": round(segment["end"] + offset, 2)}
+                for idx, segment in enumerate(whisper_segments(upload), 1)
             }
-        
-        # Save transcription to media folder
-        os.makedirs("media", exist_ok=True)
-        with open("media/transcription.json", "w") as f:
-            json.dump(transcription_data, f, indent=2)
-        
         return transcription_data
     except Exception as e:
         logging.error(f"Error during transcription: {str(e)}")
         raise
 
+def audio_digest(data: bytes) -> str:
+    """Short content hash that tells apart recordings uploaded under the same file name."""
+    return hashlib.sha256(data).hexdigest()[:12]
+
+def save_transcription(transcription_data: Dict[str, Dict[str, Union[str, float]]], audio_name: str,
+                       audio_bytes: bytes) -> str:
+    """Save one upload's transcription as media/transcriptions/<audio name>-<content hash>.json."""
+    os.makedirs(os.path.join("media", "transcriptions"), exist_ok=True)
+    stem = os.path.splitext(os.path.basename(audio_name))[0]
+    path = os.path.join("media", "transcriptions", f"{stem}-{audio_digest(audio_bytes)}.json")
+    with open(path, "w") as f:
+        json.dump(transcription_data, f, indent=2)
+    return path
+
+def parse_order(transcript: str) -> Tuple[List[Dict[str, Union[str, int]]], str]:
+    """Parse plain orders against the menu locally and only send the rest to the LLM; also says which path ran."""
+    started = time.perf_counter()
+    items = get_menu_extractor().extract(transcript)
+    path = "local"
+    if items is None:
+        items = summarize_order_llm(transcript)
+        path = "llm"
+    menu_catalog.stats.record(path, time.perf_counter() - started)
+    return items, path
+
 def summarize_order(transcript: str) -> List[Dict[str, Union[str, int]]]:
+    return parse_order(transcript)[0]
+
+def summarize_order_llm(transcript: str) -> List[Dict[str, Union[str, int]]]:
+    import openai
     try:
-        completion = client.chat.completions.create(
+        completion = get_openai_client().chat.completions.create(
             model="gpt-4o-2024-08-06",
             messages=[
                 {
@@ -87,6 +138,9 @@ def main():
     # Audio recording
     audio_file = st.file_uploader("Upload an audio file of your order", type=["wav", "mp3", "m4a"])
     
+    chunked = st.checkbox("Split long recordings on silence and transcribe the parts in parallel")
+    preencode = st.checkbox("Downmix, resample and trim the audio before uploading it", value=True)
+
     if audio_file:
         st.audio(audio_file)
 
@@ -94,7 +148,8 @@ def main():
             try:
                 with st.spinner("Transcribing and summarizing your order..."):
                     # Transcribe audio
-                    transcription_data = transcribe_audio(audio_file)
+                    transcription_data = transcribe_audio(audio_file, chunked=chunked, preencode=preencode)
+                    save_transcription(transcription_data, audio_file.name, audio_file.getvalue())
                     transcript = " ".join([segment['text'] for segment in transcription_data.values()])
                     
                     st.subheader("Transcript:")
@@ -109,6 +164,10 @@ def main():
                         st.write(f"- {item['order_item']}: {item['item_quantity']}")
                         if item['special_instructions']:
                             st.write(f"  Special Instructions: {item['special_instructions']}")
+
+                    with st.expander("Order parsing"):
+                        st.caption(f"{menu_catalog.stats.hit_rate():.0%} of orders parsed locally from the menu")
+                        st.dataframe(menu_catalog.stats.summary())
             except Exception as e:
                 st.error(f"An error occurred: {str(e)}")
                 logging.error(f"Error in main process: {str(e)}")
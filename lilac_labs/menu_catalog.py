@@ -0,0 +1,222 @@
+"""Parse plain orders against the menu without calling the LLM.
+
+`MenuExtractor.extract` walks the transcript once. It matches the longest
+item or modifier alias at each position, with a fuzzy fallback for
+misheard words, and picks up quantity words and filler. A modifier right in
+front of an item belongs to that item; otherwise it belongs to the item before
+it, and only if that item's menu category allows it. The parser only answers
+when every word is accounted for and nothing suggests the order was changed or
+repeated. Otherwise it returns None and the caller asks the LLM.
+"""
+import difflib
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Union
+
+MENU_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "menu.json")
+MAX_PHRASE_WORDS = 4
+FUZZY_CUTOFF = 0.88
+
+QUANTITIES = {
+    "a": 1, "an": 1, "one": 1, "single": 1, "another": 1, "two": 2, "couple": 2, "three": 3, "four": 4,
+    "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "dozen": 12,
+}
+PUNCTUATION = {",", ".", ";", "!", "?"}
+SEPARATORS = {"and", "also", "plus", "then"} | PUNCTUATION
+FILLER = set("""
+    i i'd i'll i'm we we'd we'll me us my our you can could would will like want need get have take give
+    please thanks thank that's all just so um uh hi hello hey yes yeah okay ok let's let gonna be is am
+    are it them those these the some of for to with make order packet packets box boxes cup cups glass
+    glasses bottle bottles side sides though too as well each
+""".split())
+# Words that mean the customer is changing or cancelling something; the LLM handles those.
+AMBIGUOUS = set("""
+    actually instead cancel remove change changed wait scratch replace minus not don't dont no without
+    never mind forget but or maybe half meal meals combo
+""".split())
+Item = Dict[str, Union[str, int]]
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9']+|[,.;!?]", text.lower().replace("-", " "))
+
+def normalize(word: str) -> str:
+    """Fold simple plurals so "burgers" and "burger" share an index entry."""
+    if len(word) > 2 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+class MenuExtractor:
+    def __init__(self, catalog: dict):
+        self.phrases = {}  # normalized alias -> ("item" | "modifier", canonical text)
+        self.allowed = {}  # item name -> modifier texts its category accepts
+        modifiers = catalog.get("modifiers", [])
+        for modifier in modifiers:
+            for alias in modifier["aliases"]:
+                self.phrases[self._key(tokenize(alias))] = ("modifier", modifier["text"])
+        for item in catalog["items"]:
+            for alias in [item["name"]] + item.get("aliases", []):
+                self.phrases[self._key(tokenize(alias))] = ("item", item["name"])
+            self.allowed[item["name"]] = {modifier["text"] for modifier in modifiers
+                                          if "categories" not in modifier
+                                          or item.get("category") in modifier["categories"]}
+        self._fuzzy_keys = [key for key, (kind, _) in self.phrases.items() if kind == "item"]
+
+    @classmethod
+    def from_file(cls, path: str = MENU_PATH) -> "MenuExtractor":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _key(words: List[str]) -> str:
+        return " ".join(normalize(word) for word in words)
+
+    def _match(self, tokens: List[str], i: int):
+        for n in range(min(MAX_PHRASE_WORDS, len(tokens) - i), 0, -1):
+            entry = self.phrases.get(self._key(tokens[i:i + n]))
+            if entry:
+                return n, entry
+        return 0, None
+
+    def _fuzzy_match(self, tokens: List[str], i: int):
+        for n in range(min(MAX_PHRASE_WORDS - 1, len(tokens) - i), 0, -1):
+            words = tokens[i:i + n]
+            if any(word in SEPARATORS or word in QUANTITIES or word.isdigit() for word in words):
+                continue
+            close = difflib.get_close_matches(self._key(words), self._fuzzy_keys, n=1, cutoff=FUZZY_CUTOFF)
+            if close:
+                return n, self.phrases[close[0]]
+        return 0, None
+
+    def _unknown(self, tokens: List[str], i: int) -> bool:
+        token = tokens[i]
+        return token not in FILLER and token not in QUANTITIES and token not in SEPARATORS \
+            and not token.isdigit() and self._match(tokens, i)[1] is None
+
+    def _lookup(self, tokens: List[str], i: int):
+        n, entry = self._match(tokens, i)
+        if (entry is None and self._unknown(tokens, i) and tokens[i] not in AMBIGUOUS) or \
+                (entry is not None and entry[0] == "modifier" and i + n < len(tokens) and self._unknown(tokens, i + n)):
+            # a misheard item can start with a modifier word ("spicy chickn burger" is McSpicy)
+            fuzzy_n, fuzzy_entry = self._fuzzy_match(tokens, i)
+            if fuzzy_n > n:
+                n, entry = fuzzy_n, fuzzy_entry
+        return n, entry
+
+    def _precedes_item(self, tokens: List[str], i: int) -> bool:
+        """Whether an item follows at `i`, directly or after more modifiers ("a large toasted wrap")."""
+        while i < len(tokens):
+            n, entry = self._lookup(tokens, i)
+            if entry is None:
+                return False
+            if entry[0] == "item":
+                return True
+            i += n
+        return False
+
+    def extract(self, transcript: str) -> Optional[List[Item]]:
+        """Return order items in the LLM's `OrderItem` shape, or None when the transcript is not plain enough."""
+        tokens = tokenize(transcript)
+        items: List[dict] = []
+        quantity = None
+        pending = []  # modifiers waiting for the next item, e.g. "large" in "a large coke"
+        last = None  # what the previous meaningful word was: "item", "modifier", "quantity" or "break"
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token in PUNCTUATION:
+                i += 1
+                continue
+            if token == "because":
+                # A reason ("because I'm lactose intolerant") carries no order information.
+                while i + 1 < len(tokens) and tokens[i + 1] not in PUNCTUATION:
+                    i += 1
+                i += 1
+                continue
+            if token in AMBIGUOUS and self._match(tokens, i)[1] is None:
+                return None
+            n, entry = self._lookup(tokens, i)
+            if entry is not None:
+                kind, text = entry
+                if kind == "item":
+                    if any(modifier not in self.allowed[text] for modifier in pending):
+                        return None
+                    items.append({"order_item": text, "item_quantity": quantity or 1, "modifiers": pending})
+                    quantity, pending = None, []
+                elif pending or self._precedes_item(tokens, i + n):
+                    pending.append(text)
+                elif last in ("item", "modifier") and text in self.allowed[items[-1]["order_item"]]:
+                    items[-1]["modifiers"].append(text)
+                else:
+                    # after "and" or a quantity with no item following, or not valid for the previous item
+                    return None
+                last = kind
+                i += n
+                continue
+            if token in QUANTITIES or token.isdigit():
+                if token == "dozen" and quantity:
+                    quantity *= 12  # "two dozen", "a dozen"
+                elif last == "quantity" and not (token == "couple" and quantity == 1):
+                    # "a 10 piece ..." or "a six piece ...": the number is a size, not how many
+                    return None
+                else:
+                    quantity = int(token) if token.isdigit() else QUANTITIES[token]
+                last = "quantity"
+            elif token in SEPARATORS:
+                if last == "item":
+                    last = "break"
+            elif token not in FILLER:
+                return None  # a word we cannot account for
+            i += 1
+        if not items or quantity not in (None, 1) or pending:
+            return None
+        return self._combine(items)
+
+    @staticmethod
+    def _combine(items: List[dict]) -> Optional[List[Item]]:
+        """Shape items like the LLM's `OrderItem`s; None if one is named twice, which may just be a repeat."""
+        combined: Dict[tuple, Item] = {}
+        for item in items:
+            key = (item["order_item"], tuple(item["modifiers"]))
+            if key in combined:
+                return None
+            combined[key] = {
+                "order_item": item["order_item"],
+                "item_quantity": item["item_quantity"],
+                "special_instructions": ", ".join(item["modifiers"]),
+            }
+        return list(combined.values())
+
+class ParseStats:
+    """How many orders each path (local menu match or LLM) handled, and how long they took."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds: Dict[str, List[float]] = {}
+
+    def record(self, path: str, seconds: float):
+        with self._lock:
+            self.seconds.setdefault(path, []).append(seconds)
+
+    def hit_rate(self) -> float:
+        with self._lock:
+            total = sum(len(values) for values in self.seconds.values())
+            return len(self.seconds.get("local", [])) / total if total else 0.0
+
+    def summary(self) -> List[dict]:
+        with self._lock:
+            seconds = {path: sorted(values) for path, values in self.seconds.items()}
+        total = sum(len(values) for values in seconds.values())
+        return [
+            {
+                "path": path,
+                "orders": len(values),
+                "share": round(len(values) / total, 3),
+                "p50_ms": round(values[len(values) // 2] * 1000, 2),
+                "p99_ms": round(values[min(len(values) - 1, int(len(values) * 0.99))] * 1000, 2),
+            }
+            for path, values in sorted(seconds.items())
+        ]
+
+stats = ParseStats()
@@ -0,0 +1,75 @@
+"""Tail latency of image requests against a fake Flux server with slow and failing responses.
+
+    python bench_image_requests.py --requests 200 --slow-rate 0.05 --fail-rate 0.05
+
+Compares a single attempt, retries with backoff, and retries plus hedging
+(a duplicate after the observed p95), all through the shared provider session.
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+import providers
+from fake_flux_server import FakeFluxServer
+from resilience import HedgePolicy, ResilientCaller, RetryPolicy, TransientError
+
+def run(server, caller, requests_count: int, concurrency: int, timeout):
+    def one(i):
+        started = time.perf_counter()
+        try:
+            if caller is None:
+                response = providers.post("bench", server.url, json={"prompt": str(i)}, timeout=timeout)
+            else:
+                response = caller.call(lambda: providers.post("bench", server.url, json={"prompt": str(i)},
+                                                              timeout=timeout))
+            ok = response.status_code == 200
+        except (TransientError, Exception):
+            ok = False
+        return time.perf_counter() - started, ok
+
+    sent_before = server.requests
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(requests_count)))
+    latencies = sorted(seconds for seconds, _ in results)
+    quantile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    return {
+        "p50": statistics.median(latencies),
+        "p95": quantile(0.95),
+        "p99": quantile(0.99),
+        "max": latencies[-1],
+        "failed": sum(1 for _, ok in results if not ok),
+        "sent": server.requests - sent_before,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=5.0)
+    parser.add_argument("--fail-rate", type=float, default=0.05)
+    parser.add_argument("--read-timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    timeout = (2.0, args.read_timeout)
+    print(f"{'mode':<18} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'max s':>7} {'failed':>7} {'sent':>6}")
+    modes = [
+        ("single attempt", lambda: None),
+        ("retries", lambda: ResilientCaller("bench", RetryPolicy(attempts=3, base_delay=0.1))),
+        ("retries + hedging", lambda: ResilientCaller("bench", RetryPolicy(attempts=3, base_delay=0.1),
+                                                      HedgePolicy(min_samples=20, max_concurrent_hedges=args.concurrency),
+                                                      executor=providers.get_executor())),
+    ]
+    for name, make_caller in modes:
+        with FakeFluxServer(latency=args.latency, slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+                            fail_rate=args.fail_rate) as server:
+            caller = make_caller()
+            result = run(server, caller, args.requests, args.concurrency, timeout)
+            print(f"{name:<18} {result['p50']:>7.2f} {result['p95']:>7.2f} {result['p99']:>7.2f} "
+                  f"{result['max']:>7.2f} {result['failed']:>7} {result['sent']:>6}")
+            if caller is not None:
+                print(f"{'':<18} {caller.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Bytes and encode time of the compressed image variants and the comic strip.
+
+    python bench_image_variants.py --images 7 --size 1024
+
+Generates noisy PNGs of the size Flux returns, then compares the bytes of the
+originals against each variant, the time to decode them, and the time to build
+every variant sequentially versus in the process pool.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from image_variants import VARIANTS, build_comic_strip, get_process_pool, make_variants, variant_path
+
+def synthetic_png(path: str, size: int, seed: int):
+    """A gradient with coloured blobs and grain, which compresses roughly like a generated illustration."""
+    from PIL import Image, ImageDraw, ImageFilter
+    rng = random.Random(seed)
+    image = Image.linear_gradient("L").resize((size, size)).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(size), rng.randrange(size)
+        radius = rng.randrange(size // 20, size // 5)
+        draw.ellipse([x - radius, y - radius, x + radius, y + radius],
+                     fill=tuple(rng.randrange(256) for _ in range(3)))
+    image = image.filter(ImageFilter.GaussianBlur(3))
+    grain = Image.effect_noise((size, size), 24).convert("RGB")
+    Image.blend(image, grain, 0.15).save(path, format="PNG")
+
+def decode_seconds(path: str, repeats: int = 5) -> float:
+    from PIL import Image
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        with Image.open(path) as image:
+            image.load()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def clear_variants(paths):
+    for path in paths:
+        for name in VARIANTS:
+            if os.path.exists(variant_path(path, name)):
+                os.remove(variant_path(path, name))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=7)
+    parser.add_argument("--size", type=int, default=1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        sources = [os.path.join(root, f"image_{i}.png") for i in range(1, args.images + 1)]
+        for seed, path in enumerate(sources):
+            synthetic_png(path, args.size, seed)
+
+        started = time.perf_counter()
+        for path in sources:
+            make_variants(path)
+        sequential = time.perf_counter() - started
+        clear_variants(sources)
+
+        pool = get_process_pool()
+        pool.submit(int).result()  # start the workers outside the timed section
+        started = time.perf_counter()
+        list(pool.map(make_variants, sources))
+        pooled = time.perf_counter() - started
+
+        strip_path = os.path.join(root, "comic_strip.webp")
+        started = time.perf_counter()
+        build_comic_strip(sources, strip_path)
+        strip_seconds = time.perf_counter() - started
+
+        print(f"{args.images} images of {args.size}x{args.size}, {os.cpu_count()} CPUs\n")
+        print(f"{'variant':<14} {'total KB':>9} {'per image KB':>13} {'vs original':>12} {'decode ms':>10}")
+        original_bytes = sum(os.path.getsize(path) for path in sources)
+        rows = [("original", sources)] + [(name, [variant_path(path, name) for path in sources]) for name in VARIANTS]
+        for name, paths in rows:
+            total = sum(os.path.getsize(path) for path in paths)
+            decode = statistics.median(decode_seconds(path) for path in paths)
+            print(f"{name:<14} {total / 1024:>9.0f} {total / 1024 / len(paths):>13.0f} "
+                  f"{total / original_bytes:>11.1%} {decode * 1000:>10.1f}")
+        print(f"\nvariants sequential   {sequential:.2f}s")
+        print(f"variants process pool {pooled:.2f}s ({pool._max_workers} workers)")
+        print(f"comic strip           {strip_seconds:.2f}s, {os.path.getsize(strip_path) / 1024:.0f} KB")
+        pool.shutdown()
+
+if __name__ == "__main__":
+    main()
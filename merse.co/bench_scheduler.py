@@ -0,0 +1,73 @@
+"""Compare the old two-phase media generation with MediaScheduler, using simulated provider latencies.
+
+    python bench_scheduler.py --scenes 7 --image-seconds 3 --narration-seconds 2
+
+The old flow ran all images on a 2-worker pool, then narrations two at a time
+with a 1 second sleep between pairs. The scheduler runs both providers at once,
+limited only by PROVIDER_LIMITS.
+"""
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from media_scheduler import MediaScheduler, ProviderLimits
+
+def fake_call(mean_seconds: float, rng: random.Random):
+    seconds = mean_seconds * rng.uniform(0.7, 1.3)
+    def call(*_):
+        time.sleep(seconds)
+        return seconds
+    return call
+
+async def two_phase(images, narrations):
+    loop = asyncio.get_event_loop()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        await asyncio.gather(*(loop.run_in_executor(executor, call) for call in images))
+        for start in range(0, len(narrations), 2):
+            await asyncio.gather(*(loop.run_in_executor(executor, call) for call in narrations[start:start + 2]))
+            await asyncio.sleep(1)
+
+async def scheduled(images, narrations, limits):
+    scheduler = MediaScheduler(limits)
+    for i, (image, narration) in enumerate(zip(images, narrations), 1):
+        scheduler.add(f"image_{i}", "flux", image)
+        scheduler.add(f"narration_{i}", "elevenlabs", narration)
+    await scheduler.run()
+    return scheduler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenes", type=int, default=7)
+    parser.add_argument("--image-seconds", type=float, default=3.0)
+    parser.add_argument("--narration-seconds", type=float, default=2.0)
+    parser.add_argument("--flux-concurrency", type=int, default=4)
+    parser.add_argument("--elevenlabs-concurrency", type=int, default=2)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    images = [fake_call(args.image_seconds, rng) for _ in range(args.scenes)]
+    narrations = [fake_call(args.narration_seconds, rng) for _ in range(args.scenes)]
+    limits = {
+        "flux": ProviderLimits(concurrency=args.flux_concurrency, rate=2.0, burst=args.flux_concurrency),
+        "elevenlabs": ProviderLimits(concurrency=args.elevenlabs_concurrency, rate=2.0, burst=args.elevenlabs_concurrency),
+    }
+
+    started = time.perf_counter()
+    asyncio.run(two_phase(images, narrations))
+    print(f"two-phase (old):   {time.perf_counter() - started:6.2f}s")
+
+    started = time.perf_counter()
+    scheduler = asyncio.run(scheduled(images, narrations, limits))
+    print(f"scheduler:         {time.perf_counter() - started:6.2f}s")
+
+    per_provider = {}
+    for row in scheduler.timing_report():
+        per_provider[row["provider"]] = max(per_provider.get(row["provider"], 0), row["start_s"] + row["duration_s"])
+    for provider, finished in per_provider.items():
+        print(f"  {provider:<11} last job finished at {finished:6.2f}s")
+    for row in scheduler.timing_report():
+        print(f"  {row['job']:<12} start {row['start_s']:6.2f}s wait {row['wait_s']:5.2f}s took {row['duration_s']:5.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Time-to-first-scene and end-to-end time, with and without streaming the story, against local fake servers.
+
+    python bench_story_stream.py --scenes 7 --chars-per-second 400 --image-seconds 2 --narration-seconds 1
+
+Drives the app's own code paths: `generate_story` followed by
+`generate_media_parallel` for blocking, and `generate_story_streaming` for
+streaming. The story comes from FakeChatServer and the images from
+FakeFluxServer, through the real OpenAI client and provider session, and the
+image variants and comic strip are built as in the app. Narration is replaced
+by a sleep because the ElevenLabs SDK cannot be pointed at a local server.
+Each mode runs in a fresh working directory, so the media cache starts empty.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from fake_chat_server import FakeChatServer
+from fake_flux_server import FakeFluxServer
+
+PLOT = "a space dog"
+
+def fake_narration(seconds):
+    def generate_narration(text, scene_number, *_):
+        time.sleep(seconds)
+        return f"narration_{scene_number}.mp3"
+    return generate_narration
+
+async def run(main, streaming: bool):
+    started = time.perf_counter()
+    if streaming:
+        story_data, timings, first_scene = await main.generate_story_streaming(PLOT)
+    else:
+        story_data = main.generate_story(PLOT)
+        first_scene = time.perf_counter() - started
+        timings = await main.generate_media_parallel(story_data)
+    return first_scene, time.perf_counter() - started, len(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenes", type=int, default=7)
+    parser.add_argument("--chars-per-second", type=float, default=400.0,
+                        help="simulated generation speed (~100 tokens/s is ~400 chars/s)")
+    parser.add_argument("--image-seconds", type=float, default=2.0)
+    parser.add_argument("--narration-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with FakeChatServer(scenes=args.scenes, chars_per_second=args.chars_per_second) as chat, \
+            FakeFluxServer(latency=args.image_seconds, slow_rate=0.0, fail_rate=0.0) as flux:
+        os.environ["OPENAI_BASE_URL"] = chat.base_url
+        os.environ["OPENAI_API_KEY"] = "fake"
+        os.environ["FLUX_URL"] = flux.url
+        import main as app
+        logging.disable(logging.WARNING)
+        app.generate_narration = fake_narration(args.narration_seconds)
+
+        print(f"{'mode':<12} {'first scene s':>14} {'total s':>9} {'media jobs':>11} {'flux requests':>14}")
+        cwd = os.getcwd()
+        for streaming in (False, True):
+            requests_before = flux.requests
+            with tempfile.TemporaryDirectory() as workdir:
+                os.chdir(workdir)
+                os.makedirs("media")
+                app.get_media_cache.clear()
+                try:
+                    first_scene, total, jobs = asyncio.run(run(app, streaming))
+                finally:
+                    os.chdir(cwd)
+            print(f"{'streaming' if streaming else 'blocking':<12} {first_scene:>14.2f} {total:>9.2f} {jobs:>11} "
+                  f"{flux.requests - requests_before:>14}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeChatServer:
+    """A local stand-in for the OpenAI chat-completions endpoint, used by the benchmarks.
+
+    Every request answers with a `StoryStructure` tool call of `scenes` segments.
+    The arguments are "generated" at `chars_per_second`: a non-streaming request
+    sleeps for the whole text, and a streaming one sends `chunk_chars` characters
+    per server-sent event.
+    """
+
+    def __init__(self, scenes: int = 7, chars_per_second: float = 2000.0, chunk_chars: int = 12,
+                 first_token_latency: float = 0.3, host: str = "127.0.0.1", port: int = 0):
+        self.scenes = scenes
+        self.chars_per_second = chars_per_second
+        self.chunk_chars = chunk_chars
+        self.first_token_latency = first_token_latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def arguments(self, plot: str) -> str:
+        return json.dumps({"segments": [{
+            "scene": f"Scene {i} of a story about {plot}: the hero \"faces\" a new challenge and learns something.",
+            "image": f"{plot}, scene {i}, the hero facing a challenge, american comic style 1950s colorful",
+        } for i in range(1, self.scenes + 1)]})
+
+    def _plot(self, body: dict) -> str:
+        return next((message["content"] for message in reversed(body.get("messages", []))
+                     if message.get("role") == "user"), "")
+
+    def completion(self, body: dict) -> dict:
+        arguments = self.arguments(self._plot(body))
+        time.sleep(self.first_token_latency + len(arguments) / self.chars_per_second)
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "tool_calls",
+                "message": {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [{"id": "call_fake", "type": "function",
+                                    "function": {"name": "StoryStructure", "arguments": arguments}}],
+                },
+            }],
+        }
+
+    def stream_chunks(self, body: dict):
+        arguments = self.arguments(self._plot(body))
+
+        def chunk(delta, finish_reason=None):
+            return {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+        time.sleep(self.first_token_latency)
+        yield chunk({"role": "assistant", "content": None, "tool_calls": [{
+            "index": 0, "id": "call_fake", "type": "function",
+            "function": {"name": "StoryStructure", "arguments": ""}}]})
+        for start in range(0, len(arguments), self.chunk_chars):
+            piece = arguments[start:start + self.chunk_chars]
+            time.sleep(len(piece) / self.chars_per_second)
+            yield chunk({"tool_calls": [{"index": 0, "function": {"arguments": piece}}]})
+        yield chunk({}, finish_reason="tool_calls")
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._reply(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+                with fake._lock:
+                    fake.requests += 1
+                if body.get("stream"):
+                    self._stream(fake.stream_chunks(body))
+                else:
+                    self._reply(200, fake.completion(body))
+
+            def _stream(self, chunks):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for payload in chunks:
+                    self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
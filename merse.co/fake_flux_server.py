@@ -0,0 +1,102 @@
+import json
+import random
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def tiny_png(width: int = 8, height: int = 8, color=(200, 80, 40)) -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    rows = b"".join(b"\x00" + bytes(color) * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+class FakeFluxServer:
+    """A local stand-in for the Flux image endpoint that injects slow and failing responses.
+
+    Each request takes about `latency` seconds. With probability `slow_rate` it
+    takes `slow_latency` instead (a stuck generation), and with probability
+    `fail_rate` it answers 503 with a Retry-After header.
+    """
+
+    def __init__(self, latency: float = 0.2, slow_rate: float = 0.05, slow_latency: float = 5.0,
+                 fail_rate: float = 0.05, seed: int = 0, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.failures = 0
+        self.slow = 0
+        self.image = tiny_png()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/flux-schnell"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _draw(self):
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            jitter = self._random.uniform(0.8, 1.2)
+            if roll < self.fail_rate:
+                self.failures += 1
+                return "fail", self.latency * jitter * 0.2
+            if roll < self.fail_rate + self.slow_rate:
+                self.slow += 1
+                return "slow", self.slow_latency * jitter
+            return "ok", self.latency * jitter
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                outcome, seconds = fake._draw()
+                time.sleep(seconds)
+                try:
+                    if outcome == "fail":
+                        data = json.dumps({"error": "overloaded"}).encode("utf-8")
+                        self.send_response(503)
+                        self.send_header("Content-Type", "application/json")
+                        self.send_header("Retry-After", "0")
+                    else:
+                        data = fake.image
+                        self.send_response(200)
+                        self.send_header("Content-Type", "image/png")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,84 @@
+"""Compressed display variants, thumbnails and a comic strip for generated images.
+
+Encoding is CPU-bound, so the work runs in a process pool (`get_process_pool`).
+Outputs sit next to the source image and are named after it. Sources are
+content-addressed cache files, so variants are only ever built once.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+# name: (format, longest side in pixels, encoder options)
+VARIANTS = {
+    "display": ("WEBP", 768, {"quality": 80, "method": 4}),
+    "thumbnail": ("WEBP", 256, {"quality": 70, "method": 4}),
+}
+EXTENSIONS = {"WEBP": "webp"}
+STRIP_PANEL = 512
+STRIP_GUTTER = 12
+
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=int(os.getenv("IMAGE_WORKERS", os.cpu_count() or 2)))
+        return _pool
+
+def variant_path(src_path: str, name: str) -> str:
+    stem, _ = os.path.splitext(src_path)
+    return f"{stem}.{name}.{EXTENSIONS[VARIANTS[name][0]]}"
+
+def _save_atomic(image, path: str, fmt: str, options: dict):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    image.save(tmp_path, format=fmt, **options)
+    os.replace(tmp_path, path)
+
+def make_variants(src_path: str) -> Dict[str, str]:
+    """Write every entry of VARIANTS for `src_path` (skipping ones that exist) and return {name: path}."""
+    from PIL import Image
+    if not src_path or not os.path.exists(src_path):
+        return {}
+    paths = {name: variant_path(src_path, name) for name in VARIANTS}
+    missing = [name for name, path in paths.items() if not os.path.exists(path)]
+    if missing:
+        with Image.open(src_path) as source:
+            source = source.convert("RGB")
+            for name in missing:
+                fmt, size, options = VARIANTS[name]
+                image = source.copy()
+                image.thumbnail((size, size), Image.LANCZOS)
+                _save_atomic(image, paths[name], fmt, options)
+    return paths
+
+def build_comic_strip(image_paths: List[str], out_path: str, columns: int = 4) -> str:
+    """Lay the panels out in a grid with gutters and save it as one WebP image."""
+    from PIL import Image, ImageDraw
+    panels = [path for path in image_paths if path and os.path.exists(path)]
+    if not panels:
+        raise ValueError("No images to assemble into a comic strip")
+    columns = min(columns, len(panels))
+    rows = (len(panels) + columns - 1) // columns
+    width = columns * STRIP_PANEL + (columns + 1) * STRIP_GUTTER
+    height = rows * STRIP_PANEL + (rows + 1) * STRIP_GUTTER
+    strip = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(strip)
+    for index, path in enumerate(panels):
+        with Image.open(path) as panel:
+            panel = panel.convert("RGB")
+            panel.thumbnail((STRIP_PANEL, STRIP_PANEL), Image.LANCZOS)
+        x = STRIP_GUTTER + (index % columns) * (STRIP_PANEL + STRIP_GUTTER)
+        y = STRIP_GUTTER + (index // columns) * (STRIP_PANEL + STRIP_GUTTER)
+        strip.paste(panel, (x + (STRIP_PANEL - panel.width) // 2, y + (STRIP_PANEL - panel.height) // 2))
+        draw.rectangle([x - 2, y - 2, x + STRIP_PANEL + 1, y + STRIP_PANEL + 1], outline="black", width=3)
+        draw.rectangle([x, y, x + 28, y + 22], fill="black")
+        draw.text((x + 8, y + 5), str(index + 1), fill="white")
+    _save_atomic(strip, out_path, "WEBP", {"quality": 80, "method": 4})
+    return out_path
+
+def run_in_pool(fn, *args):
+    """Run `fn(*args)` in the process pool and wait for it; meant to be called from a scheduler worker thread."""
+    return get_process_pool().submit(fn, *args).result()
@@ -1,24 +1,51 @@
 import streamlit as st
 import logging
 import json
-from typing import List, Dict
+import time
+from typing import List, Dict, Iterator, Optional, Tuple
 from pydantic import BaseModel
-from openai import OpenAI
 import os 
 from dotenv import load_dotenv
-import openai
 import requests
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from elevenlabs import VoiceSettings
-from elevenlabs.client import ElevenLabs
+from media_scheduler import MediaScheduler, ProviderLimits
+from story_stream import iter_story_segments
+from media_cache import MediaCache
+from image_variants import build_comic_strip, make_variants, run_in_pool
+from resilience import HedgePolicy, ResilientCaller, RetryPolicy, TransientError
+import providers
 
 load_dotenv()
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 flux = os.getenv("FLUX")
-ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
+FLUX_URL = os.getenv("FLUX_URL", "https://api.segmind.com/v1/flux-schnell")
+# (connect, read) seconds for a single Flux attempt
+FLUX_TIMEOUT = (float(os.getenv("FLUX_CONNECT_TIMEOUT", 5)), float(os.getenv("FLUX_READ_TIMEOUT", 60)))
+
+# Concurrent calls and sustained request rate allowed per provider
+PROVIDER_LIMITS = {
+    "flux": ProviderLimits(concurrency=int(os.getenv("FLUX_CONCURRENCY", 4)), rate=2.0, burst=4),
+    "elevenlabs": ProviderLimits(concurrency=int(os.getenv("ELEVENLABS_CONCURRENCY", 2)), rate=2.0, burst=2),
+    "pillow": ProviderLimits(concurrency=os.cpu_count() or 2),
+}
+
+# Provider SDKs are imported and their clients built on first use, once per process:
+# Streamlit re-runs this script on every interaction.
+@st.cache_resource
+def get_openai_client():
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+@st.cache_resource
+def get_flux_caller():
+    """Retries transient Flux failures and, once enough latencies are known, hedges requests slower than p95."""
+    hedge = HedgePolicy() if os.getenv("FLUX_HEDGE", "1") == "1" else None
+    return ResilientCaller("flux", RetryPolicy(attempts=int(os.getenv("FLUX_ATTEMPTS", 3))), hedge,
+                           executor=providers.get_executor())
+
+@st.cache_resource
+def get_media_cache():
+    return MediaCache(os.path.join('media', 'cache'), max_bytes=int(os.getenv("MEDIA_CACHE_BYTES", 1024 ** 3)))
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -30,24 +57,30 @@ class StorySegment(BaseModel):
 class StoryStructure(BaseModel):
     segments: List[StorySegment]
 
+STORY_MODEL = "gpt-4o-2024-08-06"
+
+def story_messages(plot: str) -> List[dict]:
+    return [
+        {
+            "role": "system",
+            "content": """Create a short story (6-7 scenes) based on the given plot. For each scene, provide a description and an image prompt in comic format. Example:
+            plot: a space dog 
+            story : "scene: the super smart space dog is on a mission to conquer mars for humans
+            image: a corgi in a space suit looking serious in a rocket with mars in its eyes american comic style 1950s colorful
+            scene: the space dog finally reaches his destination and with great excitement steps out of his spaceship
+            image: the space dog in a desert with a thirst for conquering mars american comic style 1950s colorful"
+            Only reply in structured format.
+            if you have any characters describe them in a good manner such that when given to image generator it looks similar also if the user gives any famous character names keep the names consistent so the comic can look bit more consistent"""
+        },
+        {"role": "user", "content": plot}
+    ]
+
 def generate_story(plot: str) -> Dict[str, str]:
+    import openai
     try:
-        completion = client.chat.completions.create(
-            model="gpt-4o-2024-08-06",
-            messages=[
-                {
-                    "role": "system",
-                    "content": """Create a short story (6-7 scenes) based on the given plot. For each scene, provide a description and an image prompt in comic format. Example:
-                    plot: a space dog 
-                    story : "scene: the super smart space dog is on a mission to conquer mars for humans
-                    image: a corgi in a space suit looking serious in a rocket with mars in its eyes american comic style 1950s colorful
-                    scene: the space dog finally reaches his destination and with great excitement steps out of his spaceship
-                    image: the space dog in a desert with a thirst for conquering mars american comic style 1950s colorful"
-                    Only reply in structured format.
-                    if you have any characters describe them in a good manner such that when given to image generator it looks similar also if the user gives any famous character names keep the names consistent so the comic can look bit more consistent"""
-                },
-                {"role": "user", "content": plot}
-            ],
+        completion = get_openai_client().chat.completions.create(
+            model=STORY_MODEL,
+            messages=story_messages(plot),
             tools=[openai.pydantic_function_tool(StoryStructure)],
         )
         response = completion.choices[0].message
@@ -72,8 +105,19 @@ def generate_story(plot: str) -> Dict[str, str]:
         st.error(f"Error during story generation: {str(e)}")
         return {}
 
+def stream_story(plot: str) -> Iterator[Dict[str, str]]:
+    """Yield each scene's {"scene", "image"} as soon as the model has finished writing it."""
+    import openai
+    stream = get_openai_client().chat.completions.create(
+        model=STORY_MODEL,
+        messages=story_messages(plot),
+        tools=[openai.pydantic_function_tool(StoryStructure)],
+        stream=True,
+    )
+    yield from iter_story_segments(stream)
+
 def generate_image(prompt: str, scene_number: int) -> str:
-    url = "https://api.segmind.com/v1/flux-schnell"
+    url = FLUX_URL
     data = {
         "prompt": prompt,
         "steps": 4,
@@ -85,136 +129,281 @@ def generate_image(prompt: str, scene_number: int) -> str:
         "height": 1024,
         "denoise": 1
     }
+    cache = get_media_cache()
+    key = cache.key("image", {"url": url, **data})
+    cached_path = cache.get(key, "png")
+    if cached_path:
+        return cached_path
 
     try:
-        response = requests.post(url, json=data, headers={'x-api-key': flux})
+        response = get_flux_caller().call(
+            lambda: providers.post("flux", url, json=data, headers={'x-api-key': flux}, timeout=FLUX_TIMEOUT))
         if response.status_code == 200 and 'image' in response.headers.get('Content-Type', ''):
-            img_path = os.path.join('media', f"image_{scene_number}.png")
-            with open(img_path, 'wb') as img_file:
-                img_file.write(response.content)
-            return img_path
+            return cache.put(key, "png", response.content)
         else:
             st.error(f"Error generating image: {response.status_code}")
             return ""
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, TransientError) as e:
         st.error(f"Error in generate_image: {str(e)}")
         return ""
 
+NARRATION_OPTIONS = {
+    "optimize_streaming_latency": "1",
+    "output_format": "mp3_22050_32",
+}
+NARRATION_VOICE_SETTINGS = {
+    "stability": 0.1,
+    "similarity_boost": 0.3,
+    "style": 0.2,
+}
+
 def generate_narration(text: str, scene_number: int, audio_id: str = "lxF2pkpZKoiYamIvyhZ3") -> str:
     try:
-        st.write(f"Generating audio for scene {scene_number}...")
-        client = ElevenLabs(
-            api_key=ELEVENLABS_API_KEY,
-        )
-        audio_generator = client.text_to_speech.convert(
-            voice_id=audio_id,
-            optimize_streaming_latency="1",
-            output_format="mp3_22050_32",
-            text=text,
-            voice_settings=VoiceSettings(
-                stability=0.1,
-                similarity_boost=0.3,
-                style=0.2,
-            ),
-        )
-        
-        audio_data = b''.join(chunk for chunk in audio_generator)
-        
-        audio_path = os.path.join('media', f"narration_scene_{scene_number}.mp3")
-        with open(audio_path, 'wb') as f:
-            f.write(audio_data)
-        
-        return audio_path
+        cache = get_media_cache()
+        key = cache.key("narration", {"voice_id": audio_id, "text": text,
+                                      "voice_settings": NARRATION_VOICE_SETTINGS, **NARRATION_OPTIONS})
+        cached_path = cache.get(key, "mp3")
+        if cached_path:
+            return cached_path
+
+        logging.info(f"Generating audio for scene {scene_number}...")
+        audio = providers.stream_speech(text, audio_id, NARRATION_VOICE_SETTINGS, **NARRATION_OPTIONS)
+        return cache.put_stream(key, "mp3", audio)
     except Exception as e:
         st.error(f"Error in generate_narration: {str(e)}")
         return ""
 
-async def generate_media_parallel(story_data: Dict[str, str]):
+def postprocess_image(image_path: str) -> Dict[str, str]:
+    """Build compressed display variants and a thumbnail for a generated image."""
+    if not image_path:
+        return {}
+    variants = run_in_pool(make_variants, image_path)
+    for path in variants.values():
+        get_media_cache().track(path)
+    return variants
+
+def assemble_comic_strip(*image_paths: str) -> str:
+    """Lay every generated image out as one strip, cached under the list of its panels."""
+    image_paths = [path for path in image_paths if path]
+    if not image_paths:
+        return ""
+    cache = get_media_cache()
+    key = cache.key("comic_strip", {"images": image_paths})
+    cached_path = cache.get(key, "webp")
+    if cached_path:
+        return cached_path
+    path = cache.path_for(key, "webp")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return cache.track(run_in_pool(build_comic_strip, image_paths, path))
+
+def add_scene_jobs(scheduler: MediaScheduler, story_data: Dict[str, str], i: int):
+    image_prompt = story_data.get(f"image_{i}")
+    if image_prompt:
+        scheduler.add(f"image_{i}", "flux", generate_image, image_prompt, i)
+        scheduler.add(f"variants_{i}", "pillow", postprocess_image, depends_on=[f"image_{i}"])
+    narration_text = story_data.get(f"scene_{i}")
+    if narration_text:
+        scheduler.add(f"narration_{i}", "elevenlabs", generate_narration, narration_text, i)
+
+def add_comic_strip_job(scheduler: MediaScheduler):
+    images = [job.name for job in scheduler.jobs if job.name.startswith("image_")]
+    if images:
+        scheduler.add("comic_strip", "pillow", assemble_comic_strip, depends_on=images)
+
+def collect_media(scheduler: MediaScheduler, story_data: Dict[str, str]):
+    scene_count = len([key for key in story_data.keys() if key.startswith('scene_')])
+    for name, error in scheduler.errors.items():
+        st.error(f"Error generating {name.replace('_', ' for scene ')}: {str(error)}")
+    for i in range(1, scene_count + 1):
+        if scheduler.results.get(f"image_{i}"):
+            story_data[f"image_path_{i}"] = scheduler.results[f"image_{i}"]
+        variants = scheduler.results.get(f"variants_{i}") or {}
+        for name in ("display", "thumbnail"):
+            if variants.get(name):
+                story_data[f"{name}_path_{i}"] = variants[name]
+        if scheduler.results.get(f"narration_{i}"):
+            story_data[f"narration_path_{i}"] = scheduler.results[f"narration_{i}"]
+    if scheduler.results.get("comic_strip"):
+        story_data["comic_strip_path"] = scheduler.results["comic_strip"]
+    with open('media/output.json', 'w') as json_file:
+        json.dump(story_data, json_file, indent=4)
+    scheduler.log_timings()
+    logging.info(f"Media cache: {get_media_cache().stats()}")
+    logging.info(f"Provider calls: {providers.stats.summary()}")
+    logging.info(f"Flux retries and hedges: {get_flux_caller().stats()}")
+
+async def generate_media_parallel(story_data: Dict[str, str], on_complete=None) -> List[dict]:
+    """Generate every scene's image and narration concurrently; returns per-job timings.
+
+    `on_complete(job_name, result, error)` is called on the calling thread as each job finishes.
+    """
     try:
         os.makedirs('media', exist_ok=True)
-        
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            loop = asyncio.get_event_loop()
-            tasks = []
-            
-            scene_count = len([key for key in story_data.keys() if key.startswith('scene_')])
-            
-            for i in range(1, scene_count + 1):
-                image_prompt = story_data.get(f"image_{i}")
-                if image_prompt:
-                    tasks.append(loop.run_in_executor(executor, generate_image, image_prompt, i))
-            
-            image_results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for i, result in enumerate(image_results, 1):
-                if isinstance(result, Exception):
-                    st.error(f"Error generating image for scene {i}: {str(result)}")
-                elif result:
-                    story_data[f"image_path_{i}"] = result
-            
-            tasks = []
-            for i in range(1, scene_count + 1):
-                narration_text = story_data.get(f"scene_{i}")
-                if narration_text:
-                    tasks.append(loop.run_in_executor(executor, generate_narration, narration_text, i))
-                
-                if len(tasks) == 2 or i == scene_count:
-                    narration_results = await asyncio.gather(*tasks, return_exceptions=True)
-                    
-                    for j, result in enumerate(narration_results):
-                        scene_num = i - len(narration_results) + j + 1
-                        if isinstance(result, Exception):
-                            st.error(f"Error generating narration for scene {scene_num}: {str(result)}")
-                        elif result:
-                            story_data[f"narration_path_{scene_num}"] = result
-                    
-                    tasks = []
-                    await asyncio.sleep(1)
-        
-        with open('media/output.json', 'w') as json_file:
-            json.dump(story_data, json_file, indent=4)
-        
+        scheduler = MediaScheduler(PROVIDER_LIMITS)
+        scene_count = len([key for key in story_data.keys() if key.startswith('scene_')])
+        for i in range(1, scene_count + 1):
+            add_scene_jobs(scheduler, story_data, i)
+        add_comic_strip_job(scheduler)
+        await scheduler.run(on_complete=on_complete)
+        collect_media(scheduler, story_data)
+        return scheduler.timing_report()
     except Exception as e:
         st.error(f"Error in generate_media_parallel: {str(e)}")
+        return []
+
+async def generate_story_streaming(plot: str, on_scene=None, on_complete=None) -> Tuple[Dict[str, str], List[dict], Optional[float]]:
+    """Stream the story and queue each scene's media jobs as soon as that scene is written.
+
+    `on_scene(i, scene_text)` is called as each scene arrives and `on_complete` as
+    each media job finishes, both on the calling thread. Returns the story data,
+    per-job timings and the seconds until the first scene arrived.
+    """
+    os.makedirs('media', exist_ok=True)
+    loop = asyncio.get_running_loop()
+    scheduler = MediaScheduler(PROVIDER_LIMITS)
+    segments: asyncio.Queue = asyncio.Queue()
+    story_data: Dict[str, str] = {}
+    first_scene_seconds = None
+    started = time.perf_counter()
+
+    def pump():
+        try:
+            for segment in stream_story(plot):
+                loop.call_soon_threadsafe(segments.put_nowait, segment)
+        finally:
+            loop.call_soon_threadsafe(segments.put_nowait, None)
+
+    media = asyncio.ensure_future(scheduler.run(on_complete=on_complete, keep_open=True))
+    story = loop.run_in_executor(None, pump)
+    try:
+        i = 0
+        while (segment := await segments.get()) is not None:
+            i += 1
+            if first_scene_seconds is None:
+                first_scene_seconds = time.perf_counter() - started
+                logging.info(f"First scene arrived after {first_scene_seconds:.2f}s")
+            story_data[f"scene_{i}"] = segment['scene']
+            story_data[f"image_{i}"] = segment['image']
+            if on_scene is not None:
+                on_scene(i, segment['scene'])
+            add_scene_jobs(scheduler, story_data, i)
+        await story
+        add_comic_strip_job(scheduler)
+    except Exception as e:
+        st.error(f"Error during story generation: {str(e)}")
+    finally:
+        scheduler.close()
+        await media
+    if not story_data:
+        logging.warning("No story data was extracted from the plot")
+    collect_media(scheduler, story_data)
+    return story_data, scheduler.timing_report(), first_scene_seconds
+
+class StoryView:
+    """Renders scenes two per row as they arrive and fills in each image and narration as soon as its job completes.
+
+    Must be used from the Streamlit script thread; the scheduler calls `on_media` on its event loop, which runs there.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.status = st.empty()
+        self.grid = st.container()
+        self.comic = st.empty()
+        self.row = None
+        self.slots = {}
+        self.originals = {}
+        self.pending = {}
+        self.first_complete_seconds = None
+
+    def add_scene(self, i: int, scene_text: str):
+        if i % 2 == 1 or self.row is None:
+            with self.grid:
+                self.row = st.columns(2)
+        with self.row[(i - 1) % 2]:
+            st.subheader(f"Scene {i}")
+            image = st.empty()
+            image.caption("Drawing...")
+            st.write(scene_text or "Scene text not available")
+            narration = st.empty()
+            narration.caption("Recording narration...")
+        self.slots[f"variants_{i}"] = image
+        self.slots[f"narration_{i}"] = narration
+        self.pending[i] = {f"variants_{i}", f"narration_{i}"}
+        self._update_status()
+
+    def on_media(self, name: str, result, error):
+        if name == "comic_strip":
+            if result:
+                self.comic.image(result, caption="Comic strip")
+            return
+        kind, i = name.rsplit("_", 1)
+        if kind == "image":
+            # Wait for the compressed variant; the original is only the fallback.
+            self.originals[int(i)] = result
+            return
+        slot = self.slots.get(name)
+        if slot is None:
+            return
+        if kind == "variants":
+            path = (result or {}).get("display") or self.originals.get(int(i))
+            if path:
+                slot.image(path)
+            else:
+                slot.caption("Image not available")
+        elif result:
+            slot.audio(result)
+        else:
+            slot.caption("Narration not available")
+        self.pending[int(i)].discard(name)
+        if not self.pending[int(i)] and self.first_complete_seconds is None:
+            self.first_complete_seconds = time.perf_counter() - self.started
+        self._update_status()
+
+    def _update_status(self, total_seconds: Optional[float] = None):
+        done = sum(1 for jobs in self.pending.values() if not jobs)
+        parts = [f"{done}/{len(self.pending)} scenes ready"]
+        if self.first_complete_seconds is not None:
+            parts.append(f"first scene after {self.first_complete_seconds:.1f}s")
+        if total_seconds is not None:
+            parts.append(f"total {total_seconds:.1f}s")
+        self.status.caption(" · ".join(parts))
+
+    def finish(self):
+        for name, slot in self.slots.items():
+            kind, i = name.rsplit("_", 1)
+            if name in self.pending[int(i)]:
+                slot.caption("Image not available" if kind == "variants" else "Narration not available")
+        self._update_status(total_seconds=time.perf_counter() - self.started)
 
 def main():
     st.title("Interactive Story Generator")
 
     plot = st.text_input("Enter a plot for your story:")
+    streaming = st.checkbox("Start images and narrations while the story is still being written", value=True)
 
     if st.button("Generate Story"):
-        with st.spinner("Generating story..."):
-            story_data = generate_story(plot)
+        view = StoryView()
+        if streaming:
+            with st.spinner("Writing the story and creating images and narrations..."):
+                story_data, timings, _ = asyncio.run(
+                    generate_story_streaming(plot, on_scene=view.add_scene, on_complete=view.on_media))
+        else:
+            with st.spinner("Generating story..."):
+                story_data = generate_story(plot)
+            scene_count = len([key for key in story_data.keys() if key.startswith('scene_')])
+            for i in range(1, scene_count + 1):
+                view.add_scene(i, story_data.get(f"scene_{i}"))
 
-        with st.spinner("Creating images and narrations..."):
-            asyncio.run(generate_media_parallel(story_data))
+            with st.spinner("Creating images and narrations..."):
+                timings = asyncio.run(generate_media_parallel(story_data, on_complete=view.on_media))
+        view.finish()
 
         st.success("Story, images, and narrations generated successfully!")
-
-        scene_count = len([key for key in story_data.keys() if key.startswith('scene_')])
-        for i in range(1, scene_count + 1, 2):
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.subheader(f"Scene {i}")
-                image_path = story_data.get(f"image_path_{i}")
-                if image_path:
-                    st.image(image_path)
-                st.write(story_data.get(f"scene_{i}", "Scene text not available"))
-                narration_path = story_data.get(f"narration_path_{i}")
-                if narration_path:
-                    st.audio(narration_path)
-            
-            if i+1 <= scene_count:
-                with col2:
-                    st.subheader(f"Scene {i+1}")
-                    image_path = story_data.get(f"image_path_{i+1}")
-                    if image_path:
-                        st.image(image_path)
-                    st.write(story_data.get(f"scene_{i+1}", "Scene text not available"))
-                    narration_path = story_data.get(f"narration_path_{i+1}")
-                    if narration_path:
-                        st.audio(narration_path)
+        if timings:
+            with st.expander("Generation timings"):
+                st.dataframe(timings)
+                st.dataframe(providers.stats.summary())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Iterable, Optional
+
+class MediaCache:
+    """Content-addressed store for generated media, keyed by a hash of the request parameters.
+
+    Files live at `<root>/<key[:2]>/<key>.<ext>` and are written through a
+    temporary file and `os.replace`, so readers never see a partial file and
+    concurrent sessions asking for the same media share one copy. Every hit
+    refreshes the file's mtime; once the total size passes `max_bytes`, the
+    least recently used files are deleted down to 90% of the cap.
+    """
+
+    def __init__(self, root: str = os.path.join("media", "cache"), max_bytes: int = 1024 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        os.makedirs(root, exist_ok=True)
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue
+                path = os.path.join(directory, filename)
+                stat = os.stat(path)
+                self._entries[path] = (stat.st_mtime, stat.st_size)
+        self.total_bytes = sum(size for _, size in self._entries.values())
+
+    @staticmethod
+    def key(kind: str, params: dict) -> str:
+        canonical = json.dumps({"kind": kind, "params": params}, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.{ext}")
+
+    def get(self, key: str, ext: str) -> Optional[str]:
+        path = self.path_for(key, ext)
+        with self._lock:
+            if path not in self._entries or not os.path.exists(path):
+                self._entries.pop(path, None)
+                self.misses += 1
+                return None
+            now = time.time()
+            os.utime(path, (now, now))
+            self._entries[path] = (now, self._entries[path][1])
+            self.hits += 1
+        return path
+
+    def put(self, key: str, ext: str, data: bytes) -> str:
+        return self.put_stream(key, ext, [data])
+
+    def put_stream(self, key: str, ext: str, chunks: Iterable[bytes]) -> str:
+        """Write chunks to the cache as they arrive; the file only appears once complete."""
+        path = self.path_for(key, ext)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return self.track(path)
+
+    def track(self, path: str) -> str:
+        """Account for a file written into the cache directory by someone else, e.g. a derived variant."""
+        size = os.path.getsize(path)
+        with self._lock:
+            previous = self._entries.get(path)
+            self.total_bytes += size - (previous[1] if previous else 0)
+            self._entries[path] = (time.time(), size)
+            self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: str):
+        if self.total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        for path, (_, size) in sorted(self._entries.items(), key=lambda item: item[1][0]):
+            if self.total_bytes <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            del self._entries[path]
+            self.total_bytes -= size
+        logging.info(f"Media cache evicted down to {self.total_bytes / 2**20:.1f} MB")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+            }
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+@dataclass(frozen=True)
+class ProviderLimits:
+    """How hard one provider may be hit: concurrent calls, and a token bucket of `rate` calls/s with `burst` capacity."""
+    concurrency: int = 2
+    rate: Optional[float] = None
+    burst: int = 1
+
+class TokenBucket:
+    def __init__(self, rate: Optional[float], burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.rate:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+@dataclass
+class Job:
+    name: str
+    provider: str
+    fn: Callable
+    args: tuple = ()
+    depends_on: Tuple[str, ...] = ()
+
+@dataclass
+class JobTiming:
+    name: str
+    provider: str
+    queued_at: float
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def wait(self) -> float:
+        """Seconds spent waiting for dependencies, a concurrency slot or a rate-limit token."""
+        return self.started_at - self.queued_at
+
+    @property
+    def duration(self) -> float:
+        return self.finished_at - self.started_at
+
+class MediaScheduler:
+    """Runs blocking provider calls concurrently, respecting dependencies and per-provider limits.
+
+    Every job starts as soon as its dependencies have finished and its provider
+    has a free slot and a rate-limit token, so jobs for different providers
+    overlap. A job receives its dependencies' results as extra positional
+    arguments after `args`; if a dependency failed, the job is skipped.
+    """
+
+    def __init__(self, providers: Dict[str, ProviderLimits]):
+        self.providers = providers
+        self.jobs: List[Job] = []
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, BaseException] = {}
+        self.timings: Dict[str, JobTiming] = {}
+        self._loop = None
+        self._open = False
+
+    def add(self, name: str, provider: str, fn: Callable, *args, depends_on=()) -> str:
+        """Queue a job. While `run(keep_open=True)` is active, call this from the event loop thread only."""
+        if provider not in self.providers:
+            raise ValueError(f"Unknown provider '{provider}', expected one of {sorted(self.providers)}")
+        if any(job.name == name for job in self.jobs):
+            raise ValueError(f"Duplicate job name '{name}'")
+        job = Job(name, provider, fn, args, tuple(depends_on))
+        if self._loop is not None:
+            self._check_dependencies(job)
+            self.jobs.append(job)
+            self._spawn(job)
+        else:
+            self.jobs.append(job)
+        return name
+
+    def close(self):
+        """No more jobs will be added; `run(keep_open=True)` returns once the queued ones finish."""
+        self._open = False
+        if self._loop is not None:
+            self._check_idle()
+
+    async def run(self, on_complete: Optional[Callable[[str, Any, Optional[BaseException]], None]] = None,
+                  keep_open: bool = False):
+        """Run every added job; `on_complete(name, result, error)` is called on the event loop as each one finishes.
+
+        With `keep_open`, jobs may still be added while running, and this returns
+        only after `close()` has been called and every job has finished.
+        """
+        for job in self.jobs:
+            self._check_dependencies(job)
+        self._loop = asyncio.get_running_loop()
+        self._on_complete = on_complete
+        self._open = keep_open
+        self._semaphores = {name: asyncio.Semaphore(limits.concurrency) for name, limits in self.providers.items()}
+        self._buckets = {name: TokenBucket(limits.rate, limits.burst) for name, limits in self.providers.items()}
+        self._finished = {job.name: asyncio.Event() for job in self.jobs}
+        self._idle = asyncio.Event()
+        self._running = 0
+        self._tasks = []
+        workers = sum(limits.concurrency for limits in self.providers.values())
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as self._executor:
+                for job in self.jobs:
+                    self._spawn(job)
+                self._check_idle()
+                await self._idle.wait()
+        finally:
+            self._loop = None
+        return self.results
+
+    def _check_dependencies(self, job: Job):
+        names = {other.name for other in self.jobs}
+        missing = [dep for dep in job.depends_on if dep not in names]
+        if missing:
+            raise ValueError(f"Job '{job.name}' depends on unknown jobs {missing}")
+
+    def _spawn(self, job: Job):
+        self._finished.setdefault(job.name, asyncio.Event())
+        self._running += 1
+        self._tasks.append(self._loop.create_task(self._run_job(job)))
+
+    def _check_idle(self):
+        if self._running == 0 and not self._open:
+            self._idle.set()
+
+    async def _run_job(self, job: Job):
+        timing = self.timings[job.name] = JobTiming(job.name, job.provider, queued_at=time.perf_counter())
+        result, error = None, None
+        try:
+            for dep in job.depends_on:
+                await self._finished[dep].wait()
+            failed = [dep for dep in job.depends_on if dep in self.errors]
+            if failed:
+                raise RuntimeError(f"skipped because {failed} failed")
+            async with self._semaphores[job.provider]:
+                await self._buckets[job.provider].acquire()
+                timing.started_at = time.perf_counter()
+                dep_results = [self.results[dep] for dep in job.depends_on]
+                result = await self._loop.run_in_executor(self._executor, job.fn, *job.args, *dep_results)
+            self.results[job.name] = result
+        except Exception as e:
+            error = self.errors[job.name] = e
+            timing.error = str(e)
+        finally:
+            timing.started_at = timing.started_at or time.perf_counter()
+            timing.finished_at = time.perf_counter()
+            self._finished[job.name].set()
+            self._running -= 1
+        try:
+            if self._on_complete is not None:
+                self._on_complete(job.name, result, error)
+        except Exception:
+            logging.exception(f"on_complete failed for job '{job.name}'")
+        finally:
+            self._check_idle()
+
+    def timing_report(self) -> List[dict]:
+        """Per-job timings, relative to the earliest queued job, in start order."""
+        if not self.timings:
+            return []
+        origin = min(timing.queued_at for timing in self.timings.values())
+        return [{
+            "job": timing.name,
+            "provider": timing.provider,
+            "start_s": round(timing.started_at - origin, 3),
+            "wait_s": round(timing.wait, 3),
+            "duration_s": round(timing.duration, 3),
+            "error": timing.error,
+        } for timing in sorted(self.timings.values(), key=lambda timing: timing.started_at)]
+
+    def log_timings(self):
+        for row in self.timing_report():
+            logging.info(f"{row['job']:<14} {row['provider']:<11} start {row['start_s']:>7.2f}s "
+                         f"wait {row['wait_s']:>6.2f}s took {row['duration_s']:>6.2f}s"
+                         + (f" error: {row['error']}" if row['error'] else ""))
@@ -0,0 +1,160 @@
+"""Process-wide provider clients with connection pooling, plus per-call latency and bytes metrics.
+
+One keep-alive `requests.Session` serves the HTTP providers and one ElevenLabs
+client with a pooled httpx transport serves narration, so calls reuse warm
+connections instead of paying TCP and TLS setup every time. Responses can be
+streamed to disk in chunks instead of being buffered whole.
+
+merse.co and argil_ai are deployed as separate apps, each run from its own
+folder, so each carries this module. The two copies are kept identical on
+purpose: change both together.
+"""
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_SIZE = int(os.getenv("PROVIDER_POOL_SIZE", 16))
+CHUNK_BYTES = 64 * 1024
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_elevenlabs = None
+_executor: Optional[ThreadPoolExecutor] = None
+
+class CallStats:
+    """Latency, time to first byte and bytes received for every provider call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: Dict[str, List[dict]] = {}
+
+    def record(self, provider: str, seconds: float, nbytes: int, first_byte_seconds: Optional[float] = None,
+               ok: bool = True):
+        with self._lock:
+            self.calls.setdefault(provider, []).append({
+                "seconds": seconds, "bytes": nbytes, "first_byte_seconds": first_byte_seconds, "ok": ok,
+            })
+
+    def summary(self) -> List[dict]:
+        """One row per provider: count, errors, p50/p95 latency, p50 time to first byte, total bytes."""
+        with self._lock:
+            calls = {provider: list(entries) for provider, entries in self.calls.items()}
+        rows = []
+        for provider, entries in sorted(calls.items()):
+            latencies = sorted(entry["seconds"] for entry in entries)
+            first_bytes = sorted(entry["first_byte_seconds"] for entry in entries
+                                 if entry["first_byte_seconds"] is not None)
+            rows.append({
+                "provider": provider,
+                "calls": len(entries),
+                "errors": sum(1 for entry in entries if not entry["ok"]),
+                "p50_s": round(latencies[len(latencies) // 2], 3),
+                "p95_s": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+                "first_byte_p50_s": round(first_bytes[len(first_bytes) // 2], 3) if first_bytes else None,
+                "bytes": sum(entry["bytes"] for entry in entries),
+            })
+        return rows
+
+stats = CallStats()
+
+def get_session() -> requests.Session:
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+def get_elevenlabs_client():
+    global _elevenlabs
+    with _lock:
+        if _elevenlabs is None:
+            import httpx
+            from elevenlabs.client import ElevenLabs
+            limits = httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+            _elevenlabs = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"),
+                                     httpx_client=httpx.Client(limits=limits, timeout=120))
+        return _elevenlabs
+
+def get_executor() -> ThreadPoolExecutor:
+    """Threads for hedged duplicate requests, which must not wait behind the scheduler's own workers."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="provider")
+        return _executor
+
+def request(method: str, provider: str, url: str, **kwargs) -> requests.Response:
+    """Send through the shared session, recording latency and response size under `provider`."""
+    started = time.perf_counter()
+    try:
+        response = get_session().request(method, url, **kwargs)
+    except requests.exceptions.RequestException:
+        stats.record(provider, time.perf_counter() - started, 0, ok=False)
+        raise
+    stats.record(provider, time.perf_counter() - started, len(response.content), ok=response.ok)
+    return response
+
+def post(provider: str, url: str, **kwargs) -> requests.Response:
+    return request("POST", provider, url, **kwargs)
+
+def get(provider: str, url: str, **kwargs) -> requests.Response:
+    return request("GET", provider, url, **kwargs)
+
+def metered(provider: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Pass chunks through unchanged, recording time to first chunk, total time and bytes once exhausted."""
+    started = time.perf_counter()
+    first_byte_seconds = None
+    nbytes = 0
+    ok = False
+    try:
+        for chunk in chunks:
+            if first_byte_seconds is None:
+                first_byte_seconds = time.perf_counter() - started
+            nbytes += len(chunk)
+            yield chunk
+        ok = True
+    finally:
+        stats.record(provider, time.perf_counter() - started, nbytes, first_byte_seconds, ok=ok)
+
+def write_stream(chunks: Iterable[bytes], path: str) -> int:
+    """Write chunks to `path` as they arrive, via a temporary file so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    nbytes = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                nbytes += len(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return nbytes
+
+def download(url: str, path: str, provider: str = "download") -> int:
+    """Stream `url` to `path` through the shared session; returns the number of bytes written."""
+    with get_session().get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        return write_stream(metered(provider, response.iter_content(CHUNK_BYTES)), path)
+
+def stream_speech(text: str, voice_id: str, voice_settings: dict, **options) -> Iterator[bytes]:
+    """Yield ElevenLabs audio chunks as they arrive, so callers can write them straight to disk."""
+    from elevenlabs import VoiceSettings
+    audio = get_elevenlabs_client().text_to_speech.convert(
+        voice_id=voice_id,
+        text=text,
+        voice_settings=VoiceSettings(**voice_settings),
+        **options,
+    )
+    return metered("elevenlabs", audio)
@@ -0,0 +1,160 @@
+"""Timeouts, retries with exponential backoff, and hedged requests for slow providers.
+
+A hedged request sends a duplicate when the first attempt is slower than the
+provider's recent p95 latency, and keeps whichever response arrives first.
+The p95 comes from a `LatencyHistogram` fed by every successful call, so the
+threshold adapts as the provider speeds up or slows down.
+"""
+import bisect
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+import requests
+
+class LatencyHistogram:
+    """Log-spaced latency buckets from 10 ms to ~10 minutes; quantiles are bucket upper bounds."""
+
+    def __init__(self, smallest: float = 0.01, growth: float = 1.25, buckets: int = 50):
+        self.bounds = [smallest * growth ** i for i in range(buckets)]
+        self.counts = [0] * (buckets + 1)
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+            self.total += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self.total:
+                return None
+            rank = q * self.total
+            seen = 0
+            for i, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    return self.bounds[min(i, len(self.bounds) - 1)]
+        return self.bounds[-1]
+
+class TransientError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    retry_statuses: Tuple[int, ...] = (408, 425, 429, 500, 502, 503, 504)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff; a server-provided Retry-After takes precedence."""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    quantile: float = 0.95
+    min_samples: int = 20
+    min_delay: float = 0.05
+    max_concurrent_hedges: int = 2
+
+class ResilientCaller:
+    """Wraps one provider's blocking call with retries and optional hedging.
+
+    `send()` performs one attempt and returns a `requests.Response`. Responses
+    with a retryable status and connection errors/timeouts are retried;
+    other responses are returned as they are.
+    """
+
+    def __init__(self, name: str, retry: RetryPolicy = RetryPolicy(), hedge: Optional[HedgePolicy] = None,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        self.name = name
+        self.retry = retry
+        self.hedge = hedge
+        self.histogram = LatencyHistogram()
+        self.attempts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._executor = executor
+        self._hedge_slots = threading.BoundedSemaphore(hedge.max_concurrent_hedges) if hedge else None
+        self._lock = threading.Lock()
+
+    def hedge_delay(self) -> Optional[float]:
+        if self.hedge is None or self.histogram.total < self.hedge.min_samples:
+            return None
+        return max(self.hedge.min_delay, self.histogram.quantile(self.hedge.quantile))
+
+    def call(self, send: Callable[[], requests.Response]) -> requests.Response:
+        for attempt in range(self.retry.attempts):
+            try:
+                return self._attempt(send)
+            except TransientError as e:
+                if attempt + 1 >= self.retry.attempts:
+                    raise
+                delay = self.retry.backoff(attempt, e.retry_after)
+                with self._lock:
+                    self.retries += 1
+                logging.info(f"{self.name}: {e}; retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+    def _timed(self, send) -> requests.Response:
+        with self._lock:
+            self.attempts += 1
+        started = time.perf_counter()
+        try:
+            response = send()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            raise TransientError(f"{type(e).__name__}: {e}")
+        if response.status_code in self.retry.retry_statuses:
+            retry_after = response.headers.get("Retry-After")
+            raise TransientError(f"HTTP {response.status_code}",
+                                 float(retry_after) if retry_after and retry_after.isdigit() else None)
+        self.histogram.record(time.perf_counter() - started)
+        return response
+
+    def _attempt(self, send) -> requests.Response:
+        delay = self.hedge_delay()
+        if delay is None or self._executor is None:
+            return self._timed(send)
+        primary = self._executor.submit(self._timed, send)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._hedge_slots.acquire(blocking=False):
+            return primary.result()
+        try:
+            with self._lock:
+                self.hedges += 1
+            hedge = self._executor.submit(self._timed, send)
+            pending = {primary, hedge}
+            error = None
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is hedge:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            self._hedge_slots.release()
+
+    def stats(self) -> dict:
+        p95 = self.histogram.quantile(0.95)
+        return {
+            "name": self.name,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p95_s": round(p95, 3) if p95 is not None else None,
+        }
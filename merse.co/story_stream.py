@@ -0,0 +1,84 @@
+import json
+import logging
+from typing import Dict, Iterable, Iterator, List
+
+class SegmentStreamParser:
+    """Incrementally parses streamed `StoryStructure` tool-call arguments.
+
+    `feed` takes the next fragment of the JSON text and returns the segments
+    whose objects closed in it. Each character is scanned once, tracking string
+    and escape state and the stack of open containers. An object opened directly
+    inside an array one level below the top (`{"segments": [{...}, ...]}`) is a
+    segment.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._segment_start = None
+
+    def feed(self, fragment: str) -> List[Dict[str, str]]:
+        self._text += fragment
+        segments = []
+        text = self._text
+        for pos in range(self._pos, len(text)):
+            char = text[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if char == "{" and self._stack == ["{", "["]:
+                    self._segment_start = pos
+                self._stack.append(char)
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if char == "}" and self._stack == ["{", "["] and self._segment_start is not None:
+                    segment = self._parse(text[self._segment_start:pos + 1])
+                    if segment is not None:
+                        segments.append(segment)
+                    self._segment_start = None
+        self._pos = len(text)
+        if self._segment_start is None:
+            # nothing pending: drop the consumed text so the buffer stays small
+            self._text = ""
+            self._pos = 0
+        return segments
+
+    @staticmethod
+    def _parse(raw: str):
+        try:
+            segment = json.loads(raw)
+        except json.JSONDecodeError as e:
+            logging.warning(f"Skipping malformed story segment: {e}")
+            return None
+        if not isinstance(segment, dict) or "scene" not in segment or "image" not in segment:
+            logging.warning(f"Skipping story segment without scene and image: {raw[:80]}")
+            return None
+        return {"scene": segment["scene"], "image": segment["image"]}
+
+def iter_story_segments(stream: Iterable, tool_name: str = "StoryStructure") -> Iterator[Dict[str, str]]:
+    """Yield each segment from a streamed chat completion as soon as its tool-call arguments contain it."""
+    parser = SegmentStreamParser()
+    name = None
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        for tool_call in chunk.choices[0].delta.tool_calls or []:
+            if tool_call.index != 0 or tool_call.function is None:
+                continue
+            if tool_call.function.name:
+                name = tool_call.function.name
+                if name != tool_name:
+                    logging.warning(f"Unexpected function call: {name}")
+            if name == tool_name and tool_call.function.arguments:
+                yield from parser.feed(tool_call.function.arguments)
@@ -1,58 +1,63 @@
 import streamlit as st
 import os
-import json
-from qdrant_vector_store import QdrantVectorStore
-from youtube_fetcher import fetch_youtube_videos
 import datetime
+import metrics
 
-vector_db = QdrantVectorStore()
+CHUNK_MAX_TOKENS = 256
+CHUNK_OVERLAP_TOKENS = 32
+
+metrics.configure_from_env()
+
+@st.cache_resource
+def get_vector_db():
+    """Open the vector store once per process; Streamlit re-runs this script on every interaction."""
+    if os.getenv("VECTOR_BACKEND", "qdrant") == "local":
+        from local_vector_store import LocalVectorStore
+        return LocalVectorStore(approximate=os.getenv("LOCAL_INDEX_APPROXIMATE") == "1",
+                                profile=os.getenv("COLLECTION_PROFILE", "full"))
+    from qdrant_vector_store import QdrantVectorStore
+    return QdrantVectorStore(profile=os.getenv("COLLECTION_PROFILE", "full"))
 
 st.title("Overlap")
 
 st.write("""
 This app allows you to fetch transcripts from a YouTube channel and upsert them into a Qdrant Vector Store for searching. 
 1. Enter the YouTube channel name and the number of videos to fetch.
-2. Click 'Fetch Transcripts' to fetch the transcripts.
-3. Click 'Upsert into Vector DB' to upsert the fetched transcripts into the vector database.
-4. Use the search functionality to search podcast clips through the upserted transcripts.
+2. Click 'Fetch and Upsert Transcripts' to fetch the transcripts and upsert them into the vector database as they arrive.
+3. Use the search functionality to search podcast clips through the upserted transcripts.
 """)
 
 channel_name = st.text_input("Enter YouTube Channel Name")
 
 num_videos = st.number_input("Enter number of videos to fetch", min_value=1, max_value=50, value=10)
 
-if st.button("Fetch Transcripts"):
-    if channel_name:
-        with st.spinner('Fetching videos and transcripts...'):
-            folder_path, result = fetch_youtube_videos(channel_name, num_videos, st)
-            st.write("Fetched videos and transcripts.")
-            st.session_state['folder_path'] = folder_path
-            st.session_state['transcripts_fetched'] = True
-    else:
-        st.write("Please enter a YouTube channel name.")
+sync_only = st.checkbox("Only fetch videos that are new or changed since the last run", value=True)
 
-if 'transcripts_fetched' in st.session_state and st.session_state['transcripts_fetched']:
-    if st.button("Upsert into Vector DB"):
-        folder_path = st.session_state['folder_path']
-        with st.spinner('Upserting transcripts into vector database...'):
+if st.button("Fetch and Upsert Transcripts"):
+    if channel_name:
+        with st.spinner('Fetching transcripts and upserting them into the vector database...'):
             progress_bar = st.progress(0)
-            total_files = len(os.listdir(folder_path))
-            for i, filename in enumerate(os.listdir(folder_path)):
-                if "transcript" in filename and filename.endswith(".json"):
-                    with open(os.path.join(folder_path, filename), 'r') as file:
-                        transcript_data = json.load(file)
-                        vector_db.upsert_data(transcript_data, filename)
-                        st.write(f"Data of video: {filename} uploaded successfully")
-                        progress_bar.progress((i + 1) / total_files)
+
+            def on_progress(video, upserted_videos):
+                st.write(f"Data of video: {video['title']} uploaded successfully")
+                progress_bar.progress(min(upserted_videos / num_videos, 1.0))
+
+            from ingest_pipeline import run_ingest_pipeline
+            run_ingest_pipeline(channel_name, num_videos, get_vector_db(), on_progress=on_progress, sync=sync_only,
+                                max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS)
             st.write("Transcripts upserted into Qdrant Vector Store.")
             st.session_state['upserted'] = True
+    else:
+        st.write("Please enter a YouTube channel name.")
 
 if 'upserted' in st.session_state and st.session_state['upserted']:
     search_query = st.text_input("Enter search query")
+    search_mode = st.radio("Search mode", ["hybrid", "vector", "lexical"], horizontal=True,
+                           help="Lexical (BM25) search matches exact names and phrases and skips the embedding call.")
 
     if st.button("Search"):
         if search_query:
-            results = vector_db.search(search_query)
+            results = get_vector_db().search(search_query, mode=search_mode)
             st.write('<div style="display: grid; grid-template-columns: repeat(auto-fill, minmax(300px, 1fr)); gap: 20px;">', unsafe_allow_html=True)
             for result in results:
                 start_time = str(datetime.timedelta(seconds=result['start'])).split('.')[0]
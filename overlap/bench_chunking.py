@@ -0,0 +1,58 @@
+"""Compare fixed-interval and token-budget chunking on long synthetic transcripts.
+
+    python bench_chunking.py --hours 3 --max-tokens 256 --overlap-tokens 32
+
+The synthetic transcript alternates fast talking, normal conversation and quiet
+stretches, so fixed 45 second windows produce very uneven chunks.
+"""
+import argparse
+import random
+import statistics
+import time
+from youtube_fetcher import count_tokens, split_transcript
+
+WORDS = "so the thing about scaling is that you really need to think about the data and the compute".split()
+
+def synthetic_transcript(hours: float, seed: int = 0):
+    rng = random.Random(seed)
+    transcript = []
+    t = 0.0
+    words_per_second = 2.5
+    while t < hours * 3600:
+        if rng.random() < 0.02:
+            words_per_second = rng.choice([0.3, 2.5, 4.5])
+        duration = rng.uniform(2.0, 5.0)
+        count = max(1, int(duration * words_per_second * rng.uniform(0.7, 1.3)))
+        transcript.append({"start": t, "duration": duration, "text": " ".join(rng.choice(WORDS) for _ in range(count))})
+        t += duration
+    return transcript
+
+def describe(name, chunks, elapsed):
+    sizes = [count_tokens(chunk["content"]) for chunk in chunks]
+    print(f"{name:<34} {len(chunks):>6} chunks  tokens min {min(sizes):>4} mean {statistics.mean(sizes):>6.1f} "
+          f"max {max(sizes):>5} stdev {statistics.pstdev(sizes):>6.1f}  {elapsed * 1000:>7.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, default=3.0)
+    parser.add_argument("--interval", type=float, default=45)
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--overlap-tokens", type=int, default=32)
+    parser.add_argument("--min-tokens", type=int, default=64)
+    args = parser.parse_args()
+
+    transcript = synthetic_transcript(args.hours)
+    print(f"{len(transcript)} transcript entries, {args.hours:g} hours")
+    video_url = "https://www.youtube.com/watch?v=synthetic"
+
+    started = time.perf_counter()
+    chunks = split_transcript(transcript, video_url, "synthetic", interval=args.interval)
+    describe(f"interval {args.interval:g}s", chunks, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    chunks = split_transcript(transcript, video_url, "synthetic", max_tokens=args.max_tokens,
+                              overlap_tokens=args.overlap_tokens, min_tokens=args.min_tokens)
+    describe(f"tokens {args.max_tokens} (overlap {args.overlap_tokens})", chunks, time.perf_counter() - started)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Measure embedding throughput (chunks/sec) against a local fake embeddings server.
+
+    python bench_embeddings.py --chunks 2000 --batch-size 64 --concurrency 4
+"""
+import argparse
+import os
+import time
+from fake_openai_server import FakeOpenAIServer
+
+def synthetic_chunks(count: int):
+    return [f"chunk {i}: so what we were talking about earlier is how the model scales {i % 97}" for i in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake server latency per request (s)")
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(request_latency=args.latency) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "fake"
+        from qdrant_vector_store import EMBEDDING_MODEL, embed_batched, get_embedding
+
+        texts = synthetic_chunks(args.chunks)
+
+        if not args.skip_sequential:
+            started = time.perf_counter()
+            for text in texts:
+                get_embedding(text, engine=EMBEDDING_MODEL)
+            elapsed = time.perf_counter() - started
+            print(f"sequential: {len(texts)} chunks in {elapsed:.2f}s -> {len(texts) / elapsed:.1f} chunks/sec")
+
+        requests_before = server.requests
+        started = time.perf_counter()
+        embedded = 0
+        for _, vectors in embed_batched(texts, EMBEDDING_MODEL, batch_size=args.batch_size, max_workers=args.concurrency):
+            embedded += len(vectors)
+        elapsed = time.perf_counter() - started
+        print(f"batched (batch={args.batch_size}, concurrency={args.concurrency}): "
+              f"{embedded} chunks in {elapsed:.2f}s -> {embedded / elapsed:.1f} chunks/sec "
+              f"over {server.requests - requests_before} requests")
+
+if __name__ == "__main__":
+    main()
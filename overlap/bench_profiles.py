@@ -0,0 +1,76 @@
+"""Compare collection storage profiles: memory per million chunks, search latency and recall@k.
+
+    python bench_profiles.py --vectors 50000 --qdrant-url localhost
+
+Each profile gets a temporary Qdrant collection filled with the same synthetic
+vectors. Their variance decays across dimensions, like text-embedding-3 output,
+so truncating to fewer dimensions (and renormalizing) behaves like requesting a
+smaller `dimensions` from the embeddings API. Recall@k is measured against exact
+full-precision search over the full 1536-dimensional vectors.
+"""
+import argparse
+import uuid
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+from bench_vector_backends import recall_at_k, timed_search
+from collection_profiles import FULL_DIMENSIONS, PROFILES, create_payload_indexes
+
+def synthetic_embeddings(count: int, clusters: int, rng) -> np.ndarray:
+    scale = 1.0 / np.sqrt(1.0 + np.arange(FULL_DIMENSIONS) / 64.0)
+    centers = rng.normal(size=(clusters, FULL_DIMENSIONS)).astype(np.float32) * scale
+    vectors = centers[rng.integers(0, clusters, size=count)]
+    vectors = vectors + 0.5 * rng.normal(size=(count, FULL_DIMENSIONS)).astype(np.float32) * scale
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def truncate(vectors: np.ndarray, dimensions: int) -> np.ndarray:
+    vectors = vectors[:, :dimensions]
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--profiles", nargs="*", default=list(PROFILES))
+    parser.add_argument("--qdrant-url", default="localhost", help="Qdrant host (or :memory: for local mode)")
+    parser.add_argument("--qdrant-port", type=int, default=6333)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = synthetic_embeddings(args.vectors, args.clusters, rng)
+    queries = synthetic_embeddings(args.queries, args.clusters, rng)
+    ids = [str(uuid.UUID(int=i)) for i in range(args.vectors)]
+    truth = [[ids[i] for i in np.argsort(-(vectors @ q))[:args.k]] for q in queries]
+    client = QdrantClient(location=args.qdrant_url, port=args.qdrant_port)
+
+    print(f"{'profile':<26} {'RAM/1M':>9} {'disk/1M':>9} {'p50 ms':>8} {'p99 ms':>8} {'recall@' + str(args.k):>10}")
+    for name in args.profiles:
+        profile = PROFILES[name]
+        collection_name = f"bench_{name}_{uuid.uuid4().hex[:6]}"
+        client.recreate_collection(collection_name=collection_name,
+                                   vectors_config=VectorParams(size=profile.dimensions, distance=Distance.COSINE,
+                                                                 on_disk=profile.on_disk),
+                                   quantization_config=profile.quantization_config())
+        create_payload_indexes(client, collection_name)
+        try:
+            stored = truncate(vectors, profile.dimensions)
+            for start in range(0, args.vectors, 1000):
+                client.upsert(collection_name=collection_name, wait=True, points=[
+                    PointStruct(id=ids[i], vector=stored[i].tolist(), payload={})
+                    for i in range(start, min(start + 1000, args.vectors))
+                ])
+            profile_queries = truncate(queries, profile.dimensions)
+            results, p50, p99 = timed_search(
+                lambda q: [str(r.id) for r in client.search(collection_name=collection_name, query_vector=q.tolist(),
+                                                            limit=args.k, search_params=profile.search_params())],
+                profile_queries)
+            memory = profile.memory_per_million()
+            print(f"{name:<26} {memory['ram_bytes'] / 2**30:>7.2f}GB {memory['disk_bytes'] / 2**30:>7.2f}GB "
+                  f"{p50:>8.2f} {p99:>8.2f} {recall_at_k(results, truth):>10.3f}")
+        finally:
+            client.delete_collection(collection_name=collection_name)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Replay a channel's transcript store after re-chunking some of its videos, and check nothing comes back.
+
+    python bench_store_replay.py --videos 20 --rechunked 5
+
+Ingests synthetic videos through the real pipeline into a LocalVectorStore
+(embeddings from the fake OpenAI server), with 45 second chunks. It then syncs
+part of the channel again with token-budget chunks, which deletes those
+videos' old points, and replays the store with upsert_transcript_store. The
+point count and the manifest must match before and after the replay. Finally
+the lexical index is rebuilt from the stored points, which must skip the
+deleted ones.
+"""
+import argparse
+import os
+import tempfile
+import time
+from bench_chunking import synthetic_transcript
+from fake_openai_server import FakeOpenAIServer
+
+def synthetic_channel(videos: int, minutes: float, edited: set):
+    channel = []
+    for i in range(videos):
+        link = f"https://www.youtube.com/watch?v=synthetic{i}"
+        title = f"Episode {i}" + (" (re-upload)" if i in edited else "")
+        video = {"id": f"synthetic{i}", "link": link, "title": title, "duration": f"{int(minutes)}:00"}
+        channel.append((video, f"description {i}", synthetic_transcript(minutes / 60, seed=i)))
+    return channel
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=20)
+    parser.add_argument("--rechunked", type=int, default=5)
+    parser.add_argument("--minutes", type=float, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir, FakeOpenAIServer(request_latency=0.0) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "fake"
+        import ingest_pipeline
+        from local_vector_store import LocalVectorStore
+
+        store_path = os.path.join(workdir, "synthetic.tlog")
+        ingest_pipeline.channel_store_path = lambda channel_name: store_path
+        vector_db = LocalVectorStore(db_path=os.path.join(workdir, "local_index"), embedding_cache_path=None)
+
+        def ingest(channel, **kwargs):
+            def fake_videos(channel_name, num_videos, max_workers, requests_per_second, skip_video):
+                for video, descr, transcript in channel[:num_videos]:
+                    if skip_video is None or not skip_video(video):
+                        yield video, descr, transcript
+            ingest_pipeline.iter_youtube_videos = fake_videos
+            ingest_pipeline.run_ingest_pipeline("synthetic", len(channel), vector_db, **kwargs)
+
+        ingest(synthetic_channel(args.videos, args.minutes, set()))
+        first = len(vector_db.index.rows)
+        ingest(synthetic_channel(args.videos, args.minutes, set(range(args.rechunked))), sync=True, max_tokens=256)
+        live = len(vector_db.index.rows)
+        manifest_ids = {point_id for entry in vector_db.manifest.videos.values() for point_id in entry["point_ids"]}
+
+        started = time.perf_counter()
+        replayed = ingest_pipeline.upsert_transcript_store(store_path, vector_db)
+        elapsed = time.perf_counter() - started
+        after = len(vector_db.index.rows)
+        stored_ids = set(vector_db.index.rows)
+
+        print(f"first ingest: {first} points; after re-chunking {args.rechunked} videos: {live} points")
+        print(f"replayed {replayed} chunks in {elapsed:.2f}s; live points after replay: {after}")
+        print(f"points match manifest: {stored_ids == manifest_ids}")
+        if after != live or stored_ids != manifest_ids:
+            raise SystemExit("replaying the store changed the index")
+
+        vector_db.rebuild_lexical_index()
+        print(f"lexical index rebuilt: {len(vector_db.lexical_index)} documents")
+        if len(vector_db.lexical_index) != after:
+            raise SystemExit("the rebuilt lexical index does not match the live points")
+
+if __name__ == "__main__":
+    main()
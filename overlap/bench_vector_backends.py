@@ -0,0 +1,95 @@
+"""Compare search latency and recall@k of the local NumPy index and Qdrant.
+
+    python bench_vector_backends.py --vectors 100000 --dimensions 1536 --qdrant-url localhost
+
+Vectors are synthetic (clustered Gaussian noise, like topic-heavy transcripts).
+Recall is measured against exact brute-force search over the same vectors.
+"""
+import argparse
+import shutil
+import tempfile
+import time
+import uuid
+import numpy as np
+from numpy_index import NumpyVectorIndex
+
+def synthetic_vectors(count: int, dimensions: int, clusters: int, rng) -> np.ndarray:
+    centers = rng.normal(size=(clusters, dimensions)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size=count)] + 0.5 * rng.normal(size=(count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def recall_at_k(results, truth) -> float:
+    return float(np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)]))
+
+def timed_search(search, queries):
+    latencies = []
+    results = []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(search(query))
+        latencies.append(time.perf_counter() - started)
+    latencies = np.array(latencies) * 1000
+    return results, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+def report(name, results, truth, p50, p99, k):
+    print(f"{name:<28} p50 {p50:8.2f} ms   p99 {p99:8.2f} ms   recall@{k} {recall_at_k(results, truth):.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-probe", type=int, default=8)
+    parser.add_argument("--qdrant-url", default=None, help="also benchmark Qdrant, e.g. localhost (or :memory: for local mode)")
+    parser.add_argument("--qdrant-port", type=int, default=6333)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = synthetic_vectors(args.vectors, args.dimensions, args.clusters, rng)
+    queries = synthetic_vectors(args.queries, args.dimensions, args.clusters, rng)
+    ids = [str(uuid.UUID(int=i)) for i in range(args.vectors)]
+    truth = [[ids[i] for i in np.argsort(-(vectors @ q))[:args.k]] for q in queries]
+
+    workdir = tempfile.mkdtemp(prefix="bench_index_")
+    try:
+        for dtype in ("float32", "float16"):
+            index = NumpyVectorIndex(f"{workdir}/{dtype}", args.dimensions, dtype)
+            for start in range(0, args.vectors, 10000):
+                end = start + 10000
+                index.upsert(ids[start:end], vectors[start:end], [{}] * len(ids[start:end]))
+            results, p50, p99 = timed_search(lambda q: [r[0] for r in index.search(q, args.k)], queries)
+            report(f"local exact {dtype}", results, truth, p50, p99, args.k)
+
+            started = time.perf_counter()
+            index.build_ivf()
+            print(f"{'':<28} IVF build with {len(index.centroids)} lists took {time.perf_counter() - started:.2f}s")
+            results, p50, p99 = timed_search(
+                lambda q: [r[0] for r in index.search(q, args.k, approximate=True, n_probe=args.n_probe)], queries)
+            report(f"local IVF {dtype} (probe {args.n_probe})", results, truth, p50, p99, args.k)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.qdrant_url:
+        from qdrant_client import QdrantClient
+        from qdrant_client.http.models import Distance, PointStruct, VectorParams
+        client = QdrantClient(location=args.qdrant_url, port=args.qdrant_port)
+        collection_name = f"bench_{uuid.uuid4().hex[:8]}"
+        client.recreate_collection(collection_name=collection_name,
+                                   vectors_config=VectorParams(size=args.dimensions, distance=Distance.COSINE))
+        try:
+            for start in range(0, args.vectors, 1000):
+                client.upsert(collection_name=collection_name, wait=True, points=[
+                    PointStruct(id=ids[i], vector=vectors[i].tolist(), payload={})
+                    for i in range(start, min(start + 1000, args.vectors))
+                ])
+            results, p50, p99 = timed_search(
+                lambda q: [str(r.id) for r in client.search(collection_name=collection_name,
+                                                            query_vector=q.tolist(), limit=args.k)], queries)
+            report("qdrant (HNSW)", results, truth, p50, p99, args.k)
+        finally:
+            client.delete_collection(collection_name=collection_name)
+
+if __name__ == "__main__":
+    main()
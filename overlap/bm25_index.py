@@ -0,0 +1,140 @@
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+class BM25Index:
+    """Incremental inverted index with Okapi BM25 scoring over chunk content.
+
+    Documents are added or replaced as points are upserted. If `path`
+    is given, every change is appended to a JSONL log that is replayed on load.
+    Once the log holds more than `compact_ratio` times as many records as there
+    are live documents (and at least `compact_min` dead ones), it is rewritten
+    from memory, so repeated syncs do not grow it without bound.
+    """
+
+    def __init__(self, path: str = None, k1: float = 1.5, b: float = 0.75, compact_ratio: float = 2.0,
+                 compact_min: int = 10000):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self.compact_min = compact_min
+        self.log_records = 0
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.doc_terms: Dict[str, List[str]] = {}
+        self.total_length = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._replay(path)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def _replay(self, path: str):
+        with open(path) as f:
+            for line in f:
+                record = json.loads(line)
+                self.log_records += 1
+                self._remove(record["id"])
+                if "terms" in record:
+                    self._add(record["id"], record["terms"])
+
+    def _add(self, doc_id: str, terms: Dict[str, int]):
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        length = sum(terms.values())
+        self.doc_lengths[doc_id] = length
+        self.doc_terms[doc_id] = list(terms)
+        self.total_length += length
+
+    def _remove(self, doc_id: str):
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in self.doc_terms.pop(doc_id):
+            docs = self.postings[term]
+            del docs[doc_id]
+            if not docs:
+                del self.postings[term]
+
+    def add_many(self, docs: List[Tuple[str, str]]):
+        """Index (doc_id, text) pairs, replacing any earlier version of the same doc_id."""
+        records = []
+        with self._lock:
+            for doc_id, text in docs:
+                doc_id = str(doc_id)
+                terms = dict(Counter(tokenize(text or "")))
+                self._remove(doc_id)
+                self._add(doc_id, terms)
+                records.append({"id": doc_id, "terms": terms})
+            self._append(records)
+
+    def remove_many(self, doc_ids: List[str]):
+        with self._lock:
+            for doc_id in doc_ids:
+                self._remove(str(doc_id))
+            self._append([{"id": str(doc_id)} for doc_id in doc_ids])
+
+    def _append(self, records: List[dict]):
+        if not self.path or not records:
+            return
+        with open(self.path, "a") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+        self.log_records += len(records)
+        dead = self.log_records - len(self.doc_lengths)
+        if dead >= self.compact_min and self.log_records > self.compact_ratio * len(self.doc_lengths):
+            self._compact()
+
+    def compact(self):
+        """Rewrite the log with one record per live document."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for doc_id, terms in self.doc_terms.items():
+                record = {"id": doc_id, "terms": {term: self.postings[term][doc_id] for term in terms}}
+                f.write(json.dumps(record) + "\n")
+        os.replace(tmp_path, self.path)
+        self.log_records = len(self.doc_terms)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """Return the `limit` best (doc_id, score) pairs for the query terms."""
+        with self._lock:
+            doc_count = len(self.doc_lengths)
+            if not doc_count:
+                return []
+            average_length = self.total_length / doc_count
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse several ranked id lists; each id scores sum(1 / (k + rank)) over the lists it appears in."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
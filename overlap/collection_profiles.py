@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from typing import Optional
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    PayloadSchemaType,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+)
+
+FULL_DIMENSIONS = 1536
+PAYLOAD_INDEX_FIELDS = ("url", "title")
+# Rough size of one HNSW graph entry with the default m=16 (two layers of int links)
+HNSW_BYTES_PER_VECTOR = 16 * 2 * 4 * 2
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    """Storage layout for a transcripts collection: embedding size, quantization and placement."""
+    name: str
+    dimensions: int = FULL_DIMENSIONS
+    quantization: Optional[str] = None  # None, "scalar" or "binary"
+    oversampling: float = 1.0
+    on_disk: bool = False
+
+    def quantization_config(self):
+        if self.quantization == "scalar":
+            return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True))
+        if self.quantization == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def search_params(self) -> Optional[SearchParams]:
+        if not self.quantization:
+            return None
+        return SearchParams(quantization=QuantizationSearchParams(rescore=True, oversampling=self.oversampling))
+
+    def memory_per_million(self) -> dict:
+        """Estimated RAM and disk bytes for one million chunks (vectors + quantized copy + HNSW graph)."""
+        original = self.dimensions * 4 * 1_000_000
+        if self.quantization == "scalar":
+            quantized = self.dimensions * 1_000_000
+        elif self.quantization == "binary":
+            quantized = self.dimensions // 8 * 1_000_000
+        else:
+            quantized = 0
+        graph = HNSW_BYTES_PER_VECTOR * 1_000_000
+        ram = quantized + graph + (0 if self.on_disk else original)
+        return {"ram_bytes": ram, "disk_bytes": original + quantized + graph}
+
+PROFILES = {profile.name: profile for profile in [
+    CollectionProfile("full"),
+    CollectionProfile("reduced-512", dimensions=512),
+    CollectionProfile("scalar-int8", quantization="scalar", oversampling=2.0),
+    CollectionProfile("scalar-int8-on-disk", quantization="scalar", oversampling=2.0, on_disk=True),
+    CollectionProfile("binary-on-disk", quantization="binary", oversampling=3.0, on_disk=True),
+    CollectionProfile("reduced-512-int8-on-disk", dimensions=512, quantization="scalar", oversampling=2.0, on_disk=True),
+]}
+
+def get_profile(profile) -> CollectionProfile:
+    if isinstance(profile, CollectionProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown collection profile '{profile}', expected one of {sorted(PROFILES)}")
+
+def create_payload_indexes(client, collection_name: str):
+    for field_name in PAYLOAD_INDEX_FIELDS:
+        client.create_payload_index(collection_name=collection_name, field_name=field_name,
+                                    field_schema=PayloadSchemaType.KEYWORD)
@@ -0,0 +1,146 @@
+import hashlib
+import re
+import sqlite3
+import struct
+import threading
+import time
+import unicodedata
+from typing import List, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+_FORMATS = {"float32": "f", "float16": "e"}
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+class EmbeddingCache:
+    """Disk-backed embedding cache keyed by (model, dimensions, normalized text hash).
+
+    Vectors are stored as packed float32/float16 blobs in a SQLite file. When the
+    stored vectors exceed `max_bytes`, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = "embedding_cache.sqlite3", max_bytes: int = 512 * 1024 * 1024,
+                 dtype: str = "float32"):
+        if dtype not in _FORMATS:
+            raise ValueError(f"Unsupported dtype '{dtype}', expected one of {sorted(_FORMATS)}")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dtype = dtype
+        self.hits = 0
+        self.misses = 0
+        self.hit_chars = 0
+        self.embedded = 0
+        self.embed_seconds = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, dtype TEXT NOT NULL, vector BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def key(model: str, dimensions: Optional[int], text: str) -> str:
+        raw = f"{model}\0{dimensions or ''}\0{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _pack(self, vector: List[float]) -> bytes:
+        return struct.pack(f"<{len(vector)}{_FORMATS[self.dtype]}", *vector)
+
+    @staticmethod
+    def _unpack(dtype: str, blob: bytes) -> List[float]:
+        fmt = _FORMATS[dtype]
+        return list(struct.unpack(f"<{len(blob) // struct.calcsize(fmt)}{fmt}", blob))
+
+    def get_many(self, model: str, dimensions: Optional[int], texts: List[str]) -> List[Optional[List[float]]]:
+        """Return the cached vector for each text, or None where it is not cached."""
+        keys = [self.key(model, dimensions, text) for text in texts]
+        found = {}
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((key, self._unpack(dtype, blob)) for key, dtype, blob in rows)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+                self._conn.commit()
+            vectors = [found.get(key) for key in keys]
+            for text, vector in zip(texts, vectors):
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self.hit_chars += len(text)
+        return vectors
+
+    def get(self, model: str, dimensions: Optional[int], text: str) -> Optional[List[float]]:
+        return self.get_many(model, dimensions, [text])[0]
+
+    def put_many(self, model: str, dimensions: Optional[int], texts: List[str], vectors: List[List[float]]):
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            blob = self._pack(vector)
+            rows.append((self.key(model, dimensions, text), self.dtype, blob, len(blob), now))
+        with self._lock:
+            for key, _, _, _, _ in rows:
+                previous = self._conn.execute("SELECT size FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if previous:
+                    self._total_bytes -= previous[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dtype, vector, size, last_used) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._total_bytes += sum(row[3] for row in rows)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def put(self, model: str, dimensions: Optional[int], text: str, vector: List[float]):
+        self.put_many(model, dimensions, [text], [vector])
+
+    def _evict(self):
+        target = int(self.max_bytes * 0.9)
+        cursor = self._conn.execute("SELECT key, size FROM embeddings ORDER BY last_used ASC")
+        evicted = []
+        while self._total_bytes > target:
+            row = cursor.fetchone()
+            if row is None:
+                break
+            evicted.append((row[0],))
+            self._total_bytes -= row[1]
+        cursor.close()
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+
+    def record_embedding(self, count: int, seconds: float):
+        """Record that `count` texts missed the cache and took `seconds` to embed."""
+        with self._lock:
+            self.embedded += count
+            self.embed_seconds += seconds
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        seconds_per_text = self.embed_seconds / self.embedded if self.embedded else 0.0
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_tokens_estimate": self.hit_chars // 4,
+            "saved_seconds_estimate": self.hits * seconds_per_text,
+            "entries": entries,
+            "bytes": self._total_bytes,
+        }
+
+    def close(self):
+        self._conn.close()
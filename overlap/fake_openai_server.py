@@ -0,0 +1,96 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeOpenAIServer:
+    """A local stand-in for the OpenAI embeddings endpoint, used by the benchmarks.
+
+    Every request sleeps `request_latency` seconds plus `per_input_latency` per
+    input text, then returns deterministic vectors derived from the text hash.
+    """
+
+    def __init__(self, dimensions: int = 1536, request_latency: float = 0.05,
+                 per_input_latency: float = 0.0005, host: str = "127.0.0.1", port: int = 0):
+        self.dimensions = dimensions
+        self.request_latency = request_latency
+        self.per_input_latency = per_input_latency
+        self.requests = 0
+        self.inputs = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def vector(self, text: str, dimensions: int) -> list:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        rng = random.Random(seed)
+        vector = [rng.gauss(0, 1) for _ in range(dimensions)]
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def embeddings(self, body: dict) -> dict:
+        inputs = body["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dimensions = body.get("dimensions") or self.dimensions
+        with self._lock:
+            self.requests += 1
+            self.inputs += len(inputs)
+        time.sleep(self.request_latency + self.per_input_latency * len(inputs))
+        tokens = sum(len(text.split()) for text in inputs)
+        return {
+            "object": "list",
+            "model": body.get("model"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": self.vector(text, dimensions)}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path.rstrip("/").endswith("/embeddings"):
+                    self._reply(200, fake.embeddings(body))
+                else:
+                    self._reply(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,52 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import List
+
+def video_fingerprint(video: dict) -> str:
+    """Fingerprint of the search-result fields that change when a video is re-uploaded or edited."""
+    raw = f"{video.get('title')}\0{video.get('duration')}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+class IndexManifest:
+    """Per-collection record of which videos are indexed, and with which point ids.
+
+    Saved atomically after every change, so an interrupted ingest resumes where it stopped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.videos = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                self.videos = json.load(f).get("videos", {})
+
+    def needs_sync(self, video: dict) -> bool:
+        entry = self.videos.get(video['link'])
+        return entry is None or entry.get("fingerprint") != video_fingerprint(video)
+
+    def point_ids(self, video_url: str) -> List[str]:
+        return self.videos.get(video_url, {}).get("point_ids", [])
+
+    def record(self, video: dict, point_ids: List[str]):
+        with self._lock:
+            self.videos[video['link']] = {
+                "title": video.get('title'),
+                "duration": video.get('duration'),
+                "fingerprint": video_fingerprint(video),
+                "point_ids": point_ids,
+                "indexed_at": time.time(),
+            }
+            self._save()
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"videos": self.videos}, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,162 @@
+import queue
+import threading
+import metrics
+from typing import Optional
+from transcript_store import TranscriptStore
+from youtube_fetcher import channel_store_path, iter_youtube_videos, split_transcript
+
+_DONE = object()
+
+class _StageFailed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+def _run_stage(name, work, inbox, outbox, stop):
+    """Run one pipeline stage in its own thread, forwarding end-of-stream and failures downstream."""
+    def target():
+        try:
+            for item in work(inbox):
+                if not _put(outbox, item, stop):
+                    return
+            _put(outbox, _DONE, stop)
+        except BaseException as e:
+            _put(outbox, _StageFailed(e), stop)
+
+    thread = threading.Thread(target=target, name=f"ingest-{name}", daemon=True)
+    thread.start()
+    return thread
+
+def _iter_inbox(inbox, stop):
+    while True:
+        item = _get(inbox, stop)
+        if item is _DONE:
+            return
+        if isinstance(item, _StageFailed):
+            raise item.error
+        yield item
+
+def run_ingest_pipeline(channel_name, num_videos, vector_db, on_progress=None, sync: bool = False,
+                        queue_size: int = 4, max_workers: int = 8, requests_per_second: float = 5.0,
+                        max_tokens: Optional[int] = None, overlap_tokens: int = 32, archive: bool = True):
+    """Fetch, split, embed and upsert a channel's transcripts as one streaming pipeline.
+
+    Fetching, splitting and embedding each run in their own thread and hand work to
+    the next stage through bounded queues, so a slow stage applies backpressure
+    instead of letting transcripts pile up in memory. Upserts run in the calling
+    thread, which also calls `on_progress(video, upserted_videos)` after each video
+    is fully stored (Streamlit calls must stay on the script thread). Returns the
+    list of video summaries in the same shape as `fetch_youtube_videos`.
+
+    Every stored video is recorded in the collection's manifest, and chunks left
+    over from an earlier version of the video are deleted. With `sync=True`,
+    videos the manifest already holds unchanged are not fetched or embedded.
+    `max_tokens` switches `split_transcript` from 45 second windows to token-budget chunks.
+    With `archive`, chunks are also appended to the channel's transcript store.
+    """
+    manifest = vector_db.manifest
+    stop = threading.Event()
+    fetched = queue.Queue(maxsize=queue_size)
+    split = queue.Queue(maxsize=queue_size)
+    embedded = queue.Queue(maxsize=queue_size)
+    store = TranscriptStore(channel_store_path(channel_name)) if archive else None
+
+    def fetch_stage(_):
+        skip_video = (lambda video: not manifest.needs_sync(video)) if sync else None
+        yield from iter_youtube_videos(channel_name, num_videos, max_workers, requests_per_second, skip_video)
+
+    def split_stage(inbox):
+        for video, video_descr, transcript in _iter_inbox(inbox, stop):
+            chunks = split_transcript(transcript, video['link'], video['title'],
+                                      max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+            if store is not None:
+                with metrics.timer("archive", chunks=len(chunks)):
+                    store.append(video['id'], chunks)
+            yield video, video_descr, chunks
+
+    def embed_stage(inbox):
+        for video, video_descr, chunks in _iter_inbox(inbox, stop):
+            summary = {
+                'url': video['link'],
+                'title': video['title'],
+                'descr': video_descr,
+                'duration': video['duration'],
+                'lengthOfTranscript': sum(len(chunk['content']) for chunk in chunks)
+            }
+            batches = vector_db.iter_point_batches(chunks)
+            batch = next(batches, None)
+            while batch is not None:
+                next_batch = next(batches, None)
+                yield video, summary, batch, next_batch is None
+                batch = next_batch
+
+    with metrics.run(f"ingest '{channel_name}'"):
+        threads = [
+            _run_stage("fetch", fetch_stage, None, fetched, stop),
+            _run_stage("split", split_stage, fetched, split, stop),
+            _run_stage("embed", embed_stage, split, embedded, stop),
+        ]
+        videos = []
+        point_ids = []
+        failed = False
+        try:
+            for video, summary, points, last_batch in _iter_inbox(embedded, stop):
+                point_ids.extend(str(point.id) for point in points)
+                if not vector_db.upsert_points(points):
+                    failed = True
+                    print(f"Failed to insert data for video titled: {summary['title']}")
+                if last_batch:
+                    if not failed:
+                        stale = set(manifest.point_ids(video['link'])) - set(point_ids)
+                        vector_db.delete_points(sorted(stale))
+                        manifest.record(video, point_ids)
+                    point_ids = []
+                    failed = False
+                    videos.append(summary)
+                    if on_progress is not None:
+                        on_progress(summary, len(videos))
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join(timeout=5)
+    vector_db.print_cache_stats()
+    return videos
+
+def sync_channel(channel_name, num_videos, vector_db, on_progress=None, **kwargs):
+    """Index only the videos among the channel's latest `num_videos` that are new or changed since the last run."""
+    return run_ingest_pipeline(channel_name, num_videos, vector_db, on_progress=on_progress, sync=True, **kwargs)
+
+def upsert_transcript_store(store_path, vector_db, batch_size: int = 256, on_progress=None):
+    """Embed and upsert every chunk of a transcript store, `batch_size` chunks at a time.
+
+    Only each video's latest chunk set is read and point ids are deterministic, so this
+    restores the points the last ingest left live and re-running it is idempotent.
+    """
+    store = TranscriptStore(store_path)
+    upserted = 0
+    with metrics.run(f"upsert '{store_path}'"):
+        for batch in store.iter_batches(batch_size):
+            for points in vector_db.iter_point_batches(batch):
+                if not vector_db.upsert_points(points):
+                    print(f"Failed to insert data from '{store_path}'")
+            upserted += len(batch)
+            if on_progress is not None:
+                on_progress(upserted)
+    vector_db.print_cache_stats()
+    return upserted
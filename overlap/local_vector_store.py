@@ -0,0 +1,61 @@
+import os
+from typing import List, Optional
+from qdrant_client.http.models import PointStruct
+from numpy_index import NumpyVectorIndex
+from qdrant_vector_store import QdrantVectorStore
+
+class LocalVectorStore(QdrantVectorStore):
+    """In-process drop-in for QdrantVectorStore backed by a memory-mapped NumPy index.
+
+    Same `upsert_data`/`search` API, no Qdrant server needed. Searches are exact
+    unless `approximate=True`, in which case an IVF index is built on the first
+    search and only the `n_probe` nearest clusters are scanned.
+    """
+
+    def __init__(self,
+                 db_path: str = "local_index",
+                 collection_name: str = "transcripts_collection",
+                 vector_size: Optional[int] = None,
+                 dtype: str = "float32",
+                 approximate: bool = False,
+                 n_lists: Optional[int] = None,
+                 n_probe: int = 8,
+                 **kwargs):
+        self.dtype = dtype
+        self.approximate = approximate
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        # Keep the manifest and BM25 log next to the vectors; shared with Qdrant, sync would skip every video
+        kwargs.setdefault("manifest_dir", os.path.join(db_path, "manifests"))
+        kwargs.setdefault("lexical_index_dir", os.path.join(db_path, "bm25_index"))
+        super().__init__(db_path=db_path, collection_name=collection_name, vector_size=vector_size, **kwargs)
+
+    def _open_collection(self, host: str, port: int, db_path: str, vector_size: int, vector_distance):
+        # Quantization and on-disk placement are Qdrant settings; locally only the profile's dimensions apply
+        self.index = NumpyVectorIndex(os.path.join(db_path, self.collection_name), vector_size, self.dtype)
+        print(f"Local collection '{self.collection_name}' opened with {self.index.count} vectors.")
+
+    def _upsert_points(self, points: List[PointStruct]) -> bool:
+        self.index.upsert([point.id for point in points],
+                          [point.vector for point in points],
+                          [point.payload for point in points])
+        return True
+
+    def _delete_points(self, ids: List[str]):
+        self.index.delete(ids)
+
+    def _fetch_payloads(self, ids: List[str]) -> List[Optional[dict]]:
+        return self.index.payloads_for(ids)
+
+    def _iter_stored_points(self, batch_size: int = 1000):
+        return iter(self.index.live_items())
+
+    def _search_points(self, vector: List[float], limit: int):
+        if self.approximate and self.index.centroids is None:
+            self.index.build_ivf(self.n_lists)
+        return self.index.search(vector, limit, approximate=self.approximate, n_probe=self.n_probe)
+
+    def _search_points_many(self, vectors: List[List[float]], limit: int):
+        if self.approximate and self.index.centroids is None:
+            self.index.build_ivf(self.n_lists)
+        return self.index.search_many(vectors, limit, approximate=self.approximate, n_probe=self.n_probe)
@@ -0,0 +1,291 @@
+"""Stage timings and counters for the ingest and search paths.
+
+Instrumented code calls `timer(stage, **fields)` and `count(name)`. Events go to
+every registered sink; with no sink registered (the default) both return
+immediately, so instrumentation costs one list check per call.
+
+Sinks: `InMemorySink` (keeps every sample, summarizes per stage), `JsonLogSink`
+(one JSON line per event) and `PrometheusSink` (text exposition on /metrics).
+`sink_from_spec` builds one from a string such as "memory", "jsonl:metrics.jsonl"
+or "prometheus:9108", which is how app.py reads the OVERLAP_METRICS variable.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+_sinks: List["MetricsSink"] = []
+_env_sink = None
+
+class MetricsSink:
+    def record(self, stage: str, seconds: float, fields: dict):
+        pass
+
+    def count(self, name: str, value: float):
+        pass
+
+class InMemorySink(MetricsSink):
+    """Keeps every sample, for per-run summaries and benchmarks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[tuple]] = {}
+        self.counters: Dict[str, float] = {}
+        self.result = None
+
+    def record(self, stage, seconds, fields):
+        with self._lock:
+            self.samples.setdefault(stage, []).append((seconds, fields))
+
+    def count(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self) -> dict:
+        """Per stage: calls, total/p50/p99 seconds and the sum of every numeric field; plus counters."""
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self.samples.items()}
+            counters = dict(self.counters)
+        stages = {}
+        for stage, values in samples.items():
+            durations = sorted(seconds for seconds, _ in values)
+            entry = {
+                "calls": len(durations),
+                "total_s": sum(durations),
+                "p50_ms": _percentile(durations, 0.50) * 1000,
+                "p99_ms": _percentile(durations, 0.99) * 1000,
+            }
+            for _, fields in values:
+                for key, value in fields.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        entry[key] = entry.get(key, 0) + value
+            stages[stage] = entry
+        return {"stages": stages, "counters": counters}
+
+class JsonLogSink(MetricsSink):
+    """Appends one JSON object per event to `path`."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._file = open(path, "a", buffering=1)
+
+    def _write(self, event: dict):
+        line = json.dumps(event, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def record(self, stage, seconds, fields):
+        self._write({"ts": time.time(), "stage": stage, "seconds": seconds, **fields})
+
+    def count(self, name, value):
+        self._write({"ts": time.time(), "counter": name, "value": value})
+
+    def close(self):
+        self._file.close()
+
+class PrometheusSink(MetricsSink):
+    """Aggregates stage latencies into histograms and serves them in Prometheus text format.
+
+    Only aggregates are kept, so memory stays constant in a long-running app.
+    With `port`, a daemon thread serves GET /metrics on that port.
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, port: Optional[int] = None, host: str = "0.0.0.0", prefix: str = "overlap"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stages: Dict[str, dict] = {}
+        self._counters: Dict[str, float] = {}
+        self.server = None
+        if port is not None:
+            self.server = ThreadingHTTPServer((host, port), self._handler())
+            threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+
+    def record(self, stage, seconds, fields):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = {"count": 0, "sum": 0.0, "buckets": [0] * len(self.BUCKETS), "fields": {}}
+            entry["count"] += 1
+            entry["sum"] += seconds
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    entry["buckets"][i] += 1
+            for key, value in fields.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    entry["fields"][key] = entry["fields"].get(key, 0) + value
+
+    def count(self, name, value):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def render(self) -> str:
+        prefix = self.prefix
+        with self._lock:
+            stages = {stage: {**entry, "buckets": list(entry["buckets"]), "fields": dict(entry["fields"])}
+                      for stage, entry in self._stages.items()}
+            counters = dict(self._counters)
+        lines = [f"# TYPE {prefix}_stage_seconds histogram"]
+        for stage, entry in sorted(stages.items()):
+            for bound, cumulative in zip(self.BUCKETS, entry["buckets"]):
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {entry["count"]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {entry["sum"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {entry["count"]}')
+        field_names = sorted({key for entry in stages.values() for key in entry["fields"]})
+        for key in field_names:
+            lines.append(f"# TYPE {prefix}_stage_{key}_total counter")
+            for stage, entry in sorted(stages.items()):
+                if key in entry["fields"]:
+                    lines.append(f'{prefix}_stage_{key}_total{{stage="{stage}"}} {entry["fields"][key]}')
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def _handler(self):
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                data = sink.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+class _Timer:
+    __slots__ = ("stage", "fields", "started")
+
+    def __init__(self, stage: str, fields: dict):
+        self.stage = stage
+        self.fields = fields
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        if exc_type is not None:
+            self.fields["errors"] = 1
+        for sink in list(_sinks):
+            sink.record(self.stage, seconds, self.fields)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def set(self, **fields):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+def timer(stage: str, **fields):
+    """Time a block as one `stage` event; `.set(**fields)` adds fields such as token counts."""
+    if not _sinks:
+        return _NULL_TIMER
+    return _Timer(stage, fields)
+
+def count(name: str, value: float = 1):
+    if _sinks:
+        for sink in list(_sinks):
+            sink.count(name, value)
+
+def enabled() -> bool:
+    return bool(_sinks)
+
+def add_sink(sink: MetricsSink) -> MetricsSink:
+    _sinks.append(sink)
+    return sink
+
+def remove_sink(sink: MetricsSink):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+def sink_from_spec(spec: Optional[str]) -> Optional[MetricsSink]:
+    """Build a sink from "memory", "jsonl:<path>" or "prometheus:<port>"; None or "" means disabled."""
+    if not spec:
+        return None
+    kind, _, arg = spec.partition(":")
+    if kind == "memory":
+        return InMemorySink()
+    if kind == "jsonl":
+        return JsonLogSink(arg or "metrics.jsonl")
+    if kind == "prometheus":
+        return PrometheusSink(port=int(arg or 9108))
+    raise ValueError(f"Unknown metrics sink '{spec}', expected 'memory', 'jsonl:<path>' or 'prometheus:<port>'")
+
+def configure_from_env(variable: str = "OVERLAP_METRICS") -> Optional[MetricsSink]:
+    """Register the sink named by `variable` once per process (Streamlit re-runs the app script on every interaction)."""
+    global _env_sink
+    if _env_sink is None:
+        _env_sink = sink_from_spec(os.getenv(variable))
+        if _env_sink is not None:
+            add_sink(_env_sink)
+    return _env_sink
+
+def format_summary(summary: dict) -> str:
+    lines = [f"{'stage':<14} {'calls':>6} {'total s':>9} {'p50 ms':>9} {'p99 ms':>9}  totals"]
+    for stage, entry in sorted(summary["stages"].items(), key=lambda item: -item[1]["total_s"]):
+        extra = ", ".join(f"{key}={value:g}" for key, value in entry.items()
+                          if key not in ("calls", "total_s", "p50_ms", "p99_ms"))
+        lines.append(f"{stage:<14} {entry['calls']:>6} {entry['total_s']:>9.2f} "
+                     f"{entry['p50_ms']:>9.1f} {entry['p99_ms']:>9.1f}  {extra}")
+    for name, value in sorted(summary["counters"].items()):
+        lines.append(f"{name}: {value:g}")
+    return "\n".join(lines)
+
+@contextmanager
+def run(name: str):
+    """Collect the events of one run and print their summary when it ends.
+
+    Does nothing unless a sink is registered. The yielded object's `result`
+    holds the summary dict once the block exits.
+    """
+    if not _sinks:
+        yield _NullRun()
+        return
+    collector = add_sink(InMemorySink())
+    started = time.perf_counter()
+    try:
+        yield collector
+    finally:
+        remove_sink(collector)
+        collector.result = {**collector.summary(), "name": name, "wall_s": time.perf_counter() - started}
+        print(f"Run '{name}' finished in {collector.result['wall_s']:.2f}s\n{format_summary(collector.result)}")
+
+class _NullRun:
+    result = None
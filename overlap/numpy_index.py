@@ -0,0 +1,277 @@
+import json
+import os
+import threading
+from typing import List, Optional
+import numpy as np
+
+class NumpyVectorIndex:
+    """Cosine-similarity vector index kept in a memory-mapped float32/float16 matrix.
+
+    Vectors are L2-normalized on insert so exact search is a single matrix-vector
+    product over the used rows. Payloads live in an append-only JSONL side file,
+    where a later line for the same id replaces the earlier one. Optionally an
+    IVF (inverted file) layout over k-means centroids restricts approximate
+    searches to the `n_probe` closest clusters.
+    """
+
+    def __init__(self, path: str, dimensions: int, dtype: str = "float32"):
+        self.path = path
+        # Streamlit shares one index across sessions; a search must not see a half-grown matrix.
+        # Reentrant because approximate search_many calls search.
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        meta = self._read_meta()
+        if meta.get("dimensions", dimensions) != dimensions:
+            raise ValueError(f"Index at {path} holds {meta['dimensions']}-dim vectors, not {dimensions}; "
+                             f"use another path for this profile or delete it to re-index")
+        self.dimensions = dimensions
+        self.dtype = np.dtype(meta.get("dtype", dtype))
+        self.count = meta.get("count", 0)
+        self.capacity = meta.get("capacity", 0)
+        self.matrix = self._open_matrix(self.capacity, mode="r+") if self.capacity else None
+        self.ids = []
+        self.rows = {}
+        self.payloads = []
+        self.deleted_rows = set()
+        self._load_payloads()
+        self.centroids = None
+        self.assignments = None
+        self._load_ivf()
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.path, "meta.json")
+
+    @property
+    def _matrix_path(self):
+        return os.path.join(self.path, "vectors.bin")
+
+    @property
+    def _payloads_path(self):
+        return os.path.join(self.path, "payloads.jsonl")
+
+    @property
+    def _ivf_path(self):
+        return os.path.join(self.path, "ivf.npz")
+
+    def _read_meta(self) -> dict:
+        if not os.path.exists(self._meta_path):
+            return {}
+        with open(self._meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self):
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dimensions": self.dimensions, "dtype": self.dtype.name,
+                       "count": self.count, "capacity": self.capacity}, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _open_matrix(self, capacity: int, mode: str, path: Optional[str] = None):
+        return np.memmap(path or self._matrix_path, dtype=self.dtype, mode=mode, shape=(capacity, self.dimensions))
+
+    def _load_payloads(self):
+        if not os.path.exists(self._payloads_path):
+            return
+        with open(self._payloads_path) as f:
+            for line in f:
+                record = json.loads(line)
+                row = record["row"]
+                if row >= self.count:
+                    continue
+                if row == len(self.ids):
+                    self.ids.append(record["id"])
+                    self.payloads.append(record["payload"])
+                else:
+                    self.payloads[row] = record["payload"]
+                if record.get("deleted"):
+                    self.rows.pop(record["id"], None)
+                    self.deleted_rows.add(row)
+                else:
+                    self.rows[record["id"]] = row
+                    self.deleted_rows.discard(row)
+
+    def _load_ivf(self):
+        if os.path.exists(self._ivf_path):
+            ivf = np.load(self._ivf_path)
+            self.centroids = ivf["centroids"]
+            self.assignments = np.full(self.capacity, -1, dtype=np.int32)
+            self.assignments[:len(ivf["assignments"])] = ivf["assignments"][:self.capacity]
+            missing = np.flatnonzero(self.assignments[:self.count] < 0)
+            if len(missing):
+                self.assignments[missing] = self._nearest_centroids(self.matrix[missing])
+
+    def _grow(self, needed: int):
+        capacity = max(1024, self.capacity)
+        while capacity < needed:
+            capacity *= 2
+        tmp_path = self._matrix_path + ".tmp"
+        matrix = self._open_matrix(capacity, mode="w+", path=tmp_path)
+        if self.count:
+            matrix[:self.count] = self.matrix[:self.count]
+        matrix.flush()
+        del self.matrix
+        os.replace(tmp_path, self._matrix_path)
+        self.matrix = self._open_matrix(capacity, mode="r+")
+        if self.assignments is not None:
+            assignments = np.full(capacity, -1, dtype=np.int32)
+            assignments[:self.capacity] = self.assignments
+            self.assignments = assignments
+        self.capacity = capacity
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def upsert(self, ids: List, vectors, payloads: List[dict]):
+        with self._lock:
+            vectors = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dimensions))
+            new_ids = [point_id for point_id in dict.fromkeys(ids) if point_id not in self.rows]
+            if self.count + len(new_ids) > self.capacity:
+                self._grow(self.count + len(new_ids))
+            rows = []
+            for point_id in ids:
+                row = self.rows.get(point_id)
+                if row is None:
+                    row = self.count
+                    self.count += 1
+                    self.rows[point_id] = row
+                    self.ids.append(point_id)
+                    self.payloads.append(None)
+                rows.append(row)
+            rows = np.asarray(rows)
+            self.matrix[rows] = vectors.astype(self.dtype)
+            if self.centroids is not None:
+                self.assignments[rows] = self._nearest_centroids(vectors)
+            with open(self._payloads_path, "a") as f:
+                for point_id, row, payload in zip(ids, rows.tolist(), payloads):
+                    self.payloads[row] = payload
+                    f.write(json.dumps({"row": row, "id": point_id, "payload": payload}) + "\n")
+            self.matrix.flush()
+            self._write_meta()
+
+    def delete(self, ids: List):
+        """Tombstone the given ids; their rows are skipped by search and never reused."""
+        with self._lock:
+            deleted = [(point_id, self.rows.pop(point_id)) for point_id in ids if point_id in self.rows]
+            with open(self._payloads_path, "a") as f:
+                for point_id, row in deleted:
+                    self.payloads[row] = None
+                    self.deleted_rows.add(row)
+                    f.write(json.dumps({"row": row, "id": point_id, "payload": None, "deleted": True}) + "\n")
+
+    def _nearest_centroids(self, vectors) -> np.ndarray:
+        return np.argmax(np.asarray(vectors, dtype=np.float32) @ self.centroids.T, axis=1).astype(np.int32)
+
+    def build_ivf(self, n_lists: Optional[int] = None, iterations: int = 10, sample_size: int = 65536, seed: int = 0):
+        """Cluster the stored vectors with spherical k-means for approximate search."""
+        with self._lock:
+            if not self.count:
+                return
+            n_lists = n_lists or max(1, int(np.sqrt(self.count)))
+            n_lists = min(n_lists, self.count)
+            rng = np.random.default_rng(seed)
+            sample_rows = rng.choice(self.count, size=min(sample_size, self.count), replace=False)
+            sample = np.asarray(self.matrix[np.sort(sample_rows)], dtype=np.float32)
+            centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)]
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                empty = np.bincount(labels, minlength=n_lists) == 0
+                sums[empty] = centroids[empty]
+                centroids = self._normalize(sums)
+            self.centroids = centroids
+            self.assignments = np.full(self.capacity, -1, dtype=np.int32)
+            for start in range(0, self.count, 65536):
+                end = min(start + 65536, self.count)
+                self.assignments[start:end] = self._nearest_centroids(self.matrix[start:end])
+            np.savez(self._ivf_path, centroids=self.centroids, assignments=self.assignments[:self.count])
+
+    def _scores(self, matrix, query: np.ndarray, block: int = 65536) -> np.ndarray:
+        if self.dtype == np.float32:
+            return np.asarray(matrix @ query)
+        # float16 has no BLAS kernels, so upcast one block at a time
+        scores = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), block):
+            scores[start:start + block] = np.asarray(matrix[start:start + block], dtype=np.float32) @ query
+        return scores
+
+    def search(self, vector, limit: int = 3, approximate: bool = False, n_probe: int = 8):
+        """Return (id, score, payload) tuples for the `limit` most similar vectors."""
+        with self._lock:
+            if not self.count:
+                return []
+            query = self._normalize(np.asarray(vector, dtype=np.float32).reshape(self.dimensions))
+            if approximate and self.centroids is not None:
+                probes = np.argsort(-(self.centroids @ query))[:n_probe]
+                rows = np.flatnonzero(np.isin(self.assignments[:self.count], probes))
+                scores = self._scores(self.matrix[rows], query)
+            else:
+                rows = None
+                scores = self._scores(self.matrix[:self.count], query)
+            return self._top_hits(scores, rows, limit)
+
+    def search_many(self, vectors, limit: int = 3, approximate: bool = False, n_probe: int = 8, block: int = 65536):
+        """Search several query vectors at once.
+
+        Exact search scores all queries against one block of rows per matrix
+        product and keeps a running top-k, so memory stays at queries x block.
+        """
+        with self._lock:
+            if approximate and self.centroids is not None:
+                return [self.search(vector, limit, approximate=True, n_probe=n_probe) for vector in vectors]
+            if not self.count or not len(vectors):
+                return [[] for _ in vectors]
+            queries = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(len(vectors), self.dimensions))
+            deleted = np.fromiter(self.deleted_rows, dtype=np.int64) if self.deleted_rows else None
+            best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+            best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+            for start in range(0, self.count, block):
+                end = min(start + block, self.count)
+                scores = queries @ np.asarray(self.matrix[start:end], dtype=np.float32).T
+                if deleted is not None:
+                    scores[:, np.isin(np.arange(start, end), deleted)] = -np.inf
+                scores = np.concatenate([best_scores, scores], axis=1)
+                block_rows = np.broadcast_to(np.arange(start, end), (len(queries), end - start))
+                rows = np.concatenate([best_rows, block_rows], axis=1)
+                keep = min(limit, scores.shape[1])
+                top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+                best_scores = np.take_along_axis(scores, top, axis=1)
+                best_rows = np.take_along_axis(rows, top, axis=1)
+            results = []
+            for scores, rows in zip(best_scores, best_rows):
+                order = np.argsort(-scores)
+                results.append([(self.ids[row], float(score), self.payloads[row])
+                                for score, row in zip(scores[order].tolist(), rows[order].tolist())
+                                if score != -np.inf])
+            return results
+
+    def _top_hits(self, scores: np.ndarray, rows: Optional[np.ndarray], limit: int):
+        live = len(scores)
+        if self.deleted_rows:
+            deleted = np.isin(rows if rows is not None else np.arange(len(scores)),
+                              np.fromiter(self.deleted_rows, dtype=np.int64))
+            scores[deleted] = -np.inf
+            live -= int(deleted.sum())
+        limit = min(limit, live)
+        if not limit:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        result = []
+        for i in top:
+            row = int(rows[i]) if rows is not None else int(i)
+            result.append((self.ids[row], float(scores[i]), self.payloads[row]))
+        return result
+
+    def live_items(self) -> List[tuple]:
+        """(id, payload) for every stored point that has not been deleted."""
+        with self._lock:
+            return [(point_id, self.payloads[row]) for point_id, row in self.rows.items()]
+
+    def payloads_for(self, ids: List) -> List[Optional[dict]]:
+        with self._lock:
+            return [self.payloads[self.rows[point_id]] if point_id in self.rows else None for point_id in ids]
@@ -1,86 +1,346 @@
+import time
 import uuid
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct, UpdateStatus
-from typing import List
+from qdrant_client.http.models import Distance, VectorParams, PointStruct, PointIdsList, SearchRequest, UpdateStatus
+from typing import List, Optional
 import json
-from openai import OpenAI
 import os
 from dotenv import load_dotenv
+from embedding_cache import EmbeddingCache
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from index_manifest import IndexManifest
+from collection_profiles import FULL_DIMENSIONS, create_payload_indexes, get_profile
+import metrics
 load_dotenv()
 
 openai_api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=openai_api_key)
+
+@lru_cache(maxsize=None)
+def get_openai_client():
+    """Shared OpenAI client, created (and the SDK imported) on first use."""
+    from openai import OpenAI
+    return OpenAI(api_key=openai_api_key)
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+MAX_EMBEDDING_INPUTS = 2048
 
 def get_embedding(text, engine):
-    response = client.embeddings.create(
-        input=text,
-        model=engine
-    )
+    with metrics.timer("embed", batch_size=1):
+        response = get_openai_client().embeddings.create(
+            input=text,
+            model=engine
+        )
     embedding = response.data[0].embedding
     return embedding
 
+def get_embeddings(texts: List[str], engine, dimensions: Optional[int] = None) -> List[List[float]]:
+    extra = {"dimensions": dimensions} if dimensions else {}
+    with metrics.timer("embed", batch_size=len(texts)) as t:
+        response = get_openai_client().embeddings.create(
+            input=texts,
+            model=engine,
+            **extra
+        )
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            t.set(tokens=usage.prompt_tokens)
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+def embed_batched(texts: List[str], engine, batch_size: int = 64, max_workers: int = 4, embed_fn=None):
+    """Yield (offset, vectors) per batch of texts, as soon as each batch is embedded.
+
+    At most `max_workers` embedding requests are in flight at once, so batches
+    may complete out of order; `offset` is the index of the batch's first text.
+    `embed_fn(batch)` replaces the plain `get_embeddings(batch, engine)` call.
+    """
+    if embed_fn is None:
+        embed_fn = lambda batch: get_embeddings(batch, engine)
+    batches = [(offset, texts[offset:offset + batch_size]) for offset in range(0, len(texts), batch_size)]
+    if max_workers <= 1 or len(batches) <= 1:
+        for offset, batch in batches:
+            yield offset, embed_fn(batch)
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(embed_fn, batch): offset for offset, batch in batches}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+def video_url_of(chunk_url: str) -> str:
+    return chunk_url.split("&start=")[0]
+
+def chunk_point_id(item: dict) -> str:
+    """Deterministic point id for a transcript chunk, derived from (video url, chunk start)."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{video_url_of(item.get('url') or '')}#{item.get('start')}"))
+
 class QdrantVectorStore:
     def __init__(self,
                  host: str = "localhost",
                  port: int = 6333,
                  db_path: str = "qdrant_storage",
                  collection_name: str = "transcripts_collection",
-                 vector_size: int = 1536,
-                 vector_distance=Distance.COSINE):
+                 vector_size: Optional[int] = None,
+                 vector_distance=Distance.COSINE,
+                 profile="full",
+                 embed_batch_size: int = 64,
+                 embed_concurrency: int = 4,
+                 upsert_batch_size: int = 256,
+                 embedding_cache_path: Optional[str] = "embedding_cache.sqlite3",
+                 embedding_cache_bytes: int = 512 * 1024 * 1024,
+                 lexical_index_dir: Optional[str] = "bm25_index",
+                 manifest_dir: str = "manifests"):
+        self.collection_name = collection_name
+        self.embed_batch_size = embed_batch_size
+        self.embed_concurrency = embed_concurrency
+        self.upsert_batch_size = upsert_batch_size
+        self.profile = get_profile(profile)
+        vector_size = vector_size or self.profile.dimensions
+        self.embedding_dimensions = vector_size if vector_size != FULL_DIMENSIONS else None
+        self.embedding_cache = (EmbeddingCache(embedding_cache_path, max_bytes=embedding_cache_bytes)
+                                if embedding_cache_path else None)
+        self.lexical_index = None
+        if lexical_index_dir:
+            os.makedirs(lexical_index_dir, exist_ok=True)
+            self.lexical_index = BM25Index(os.path.join(lexical_index_dir, f"{collection_name}.jsonl"))
+        self.manifest = IndexManifest(os.path.join(manifest_dir, f"{collection_name}.json"))
+        self._open_collection(host, port, db_path, vector_size, vector_distance)
+
+    def _open_collection(self, host: str, port: int, db_path: str, vector_size: int, vector_distance):
         self.client = QdrantClient(
             url=host,
             port=port,
         )
-        self.collection_name = collection_name
+        collection_name = self.collection_name
         try:
             collection_info = self.client.get_collection(collection_name=collection_name)
             print(f"Collection '{collection_name}' already exists.")
         except Exception as e:
             print(f"Collection '{collection_name}' does not exist. Creating collection now.")
             self.set_up_collection(collection_name, vector_size, vector_distance)
+            return
+        vectors = collection_info.config.params.vectors
+        if vectors.size != vector_size or vectors.distance != vector_distance:
+            raise ValueError(
+                f"Collection '{collection_name}' stores {vectors.size}-dim {vectors.distance} vectors, but profile "
+                f"'{self.profile.name}' needs {vector_size}-dim {vector_distance}. Use another collection_name "
+                f"for this profile or delete the collection to re-index."
+            )
 
     def set_up_collection(self, collection_name: str, vector_size: int, vector_distance: str):
         self.client.recreate_collection(
             collection_name=collection_name,
-            vectors_config=VectorParams(size=vector_size, distance=vector_distance)
+            vectors_config=VectorParams(size=vector_size, distance=vector_distance, on_disk=self.profile.on_disk),
+            quantization_config=self.profile.quantization_config()
+        )
+        create_payload_indexes(self.client, collection_name)
+        print(f"Collection '{collection_name}' created with vector size {vector_size}, distance {vector_distance} "
+              f"and storage profile '{self.profile.name}'.")
+
+    def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        vectors = get_embeddings(texts, EMBEDDING_MODEL, self.embedding_dimensions)
+        if self.embedding_cache is not None:
+            self.embedding_cache.record_embedding(len(texts), time.perf_counter() - started)
+            self.embedding_cache.put_many(EMBEDDING_MODEL, self.embedding_dimensions, texts, vectors)
+        return vectors
+
+    def embed_texts(self, texts: List[str], batch_size: Optional[int] = None):
+        """Yield (indices, vectors) for texts: cache hits first, then freshly embedded batches."""
+        if self.embedding_cache is not None:
+            cached = self.embedding_cache.get_many(EMBEDDING_MODEL, self.embedding_dimensions, texts)
+        else:
+            cached = [None] * len(texts)
+        hits = [i for i, vector in enumerate(cached) if vector is not None]
+        metrics.count("embedding_cache_hits", len(hits))
+        metrics.count("embedding_cache_misses", len(texts) - len(hits))
+        if hits:
+            yield hits, [cached[i] for i in hits]
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        for offset, vectors in embed_batched([texts[i] for i in missing], EMBEDDING_MODEL,
+                                             batch_size=batch_size or self.embed_batch_size,
+                                             max_workers=self.embed_concurrency,
+                                             embed_fn=self._get_embeddings):
+            yield missing[offset:offset + len(vectors)], vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        for _, vectors in self.embed_texts([text]):
+            return vectors[0]
+
+    def _upsert_points(self, points: List[PointStruct]) -> bool:
+        operation_info = self.client.upsert(
+            collection_name=self.collection_name,
+            wait=True,
+            points=points
+        )
+        return operation_info.status == UpdateStatus.COMPLETED
+
+    def _search_points(self, vector: List[float], limit: int):
+        search_result = self.client.search(
+            collection_name=self.collection_name,
+            query_vector=vector,
+            limit=limit,
+            search_params=self.profile.search_params()
         )
-        print(f"Collection '{collection_name}' created with vector size {vector_size} and distance {vector_distance}.")
+        return [(item.id, item.score, item.payload) for item in search_result]
+
+    def _search_points_many(self, vectors: List[List[float]], limit: int):
+        search_results = self.client.search_batch(
+            collection_name=self.collection_name,
+            requests=[
+                SearchRequest(vector=vector, limit=limit, with_payload=True, params=self.profile.search_params())
+                for vector in vectors
+            ]
+        )
+        return [[(item.id, item.score, item.payload) for item in search_result] for search_result in search_results]
+
+    def _delete_points(self, ids: List[str]):
+        self.client.delete(collection_name=self.collection_name, points_selector=PointIdsList(points=ids), wait=True)
+
+    def _fetch_payloads(self, ids: List[str]) -> List[Optional[dict]]:
+        records = self.client.retrieve(collection_name=self.collection_name, ids=ids, with_payload=True)
+        payloads = {str(record.id): record.payload for record in records}
+        return [payloads.get(str(point_id)) for point_id in ids]
+
+    def _iter_stored_points(self, batch_size: int = 1000):
+        offset = None
+        while True:
+            records, offset = self.client.scroll(collection_name=self.collection_name, limit=batch_size,
+                                                 offset=offset, with_payload=True, with_vectors=False)
+            for record in records:
+                yield record.id, record.payload
+            if offset is None:
+                break
+
+    def rebuild_lexical_index(self):
+        """Re-index every stored chunk, e.g. for a collection filled before the lexical index existed."""
+        batch = []
+        for point_id, payload in self._iter_stored_points():
+            if payload is None:
+                continue
+            batch.append((point_id, payload.get("content")))
+            if len(batch) >= 1000:
+                self.lexical_index.add_many(batch)
+                batch = []
+        if batch:
+            self.lexical_index.add_many(batch)
+        self.lexical_index.compact()
+
+    def upsert_points(self, points: List[PointStruct]) -> bool:
+        with metrics.timer("upsert", points=len(points)):
+            succeeded = self._upsert_points(points)
+        if succeeded and self.lexical_index is not None:
+            with metrics.timer("lexical_index", points=len(points)):
+                self.lexical_index.add_many([(point.id, point.payload.get("content")) for point in points])
+        return succeeded
+
+    def delete_points(self, ids: List[str]):
+        if not ids:
+            return
+        self._delete_points(ids)
+        if self.lexical_index is not None:
+            self.lexical_index.remove_many(ids)
+
+    def iter_point_batches(self, data: List[dict]):
+        """Embed transcript chunks and yield them as upsert-sized lists of points."""
+        texts = [item.get("content") for item in data]
+        pending = []
+        for indices, vectors in self.embed_texts(texts):
+            for index, text_vector in zip(indices, vectors):
+                item = data[index]
+                text_id = chunk_point_id(item)
+                payload = {
+                    "content": item.get("content"),
+                    "start": item.get("start"),
+                    "end": item.get("end"),
+                    "url": item.get("url"),
+                    "title": item.get("title")
+                }
+                pending.append(PointStruct(id=text_id, vector=text_vector, payload=payload))
+            while len(pending) >= self.upsert_batch_size:
+                yield pending[:self.upsert_batch_size]
+                pending = pending[self.upsert_batch_size:]
+        if pending:
+            yield pending
+
+    def print_cache_stats(self):
+        if self.embedding_cache is not None:
+            stats = self.embedding_cache.stats()
+            print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+                  f"(~{stats['saved_tokens_estimate']} tokens, ~{stats['saved_seconds_estimate']:.1f}s saved).")
 
     def upsert_data(self, data: List[dict], filename):
-            points = []
-            for item in data:
-                content = item.get("content")
-                start = item.get("start")
-                end = item.get("end")
-                url = item.get("url")
-                title = item.get("title")
-                text_vector = get_embedding(content, engine="text-embedding-3-small")
-                text_id = str(uuid.uuid4())
-                payload = {"content": content, "start": start, "end": end, "url": url, "title": title}
-                point = PointStruct(id=text_id, vector=text_vector, payload=payload)
-                points.append(point)
-            operation_info = self.client.upsert(
-                collection_name=self.collection_name,
-                wait=True,
-                points=points
-            )
-            if operation_info.status == UpdateStatus.COMPLETED:
+            succeeded = True
+            for points in self.iter_point_batches(data):
+                succeeded &= self.upsert_points(points)
+            if succeeded:
                 print(f"Data from file '{filename}' has been uploaded successfully.")
             else:
                 print("Failed to insert data")
-    def search(self, input_query: str, limit: int = 3):
-        input_vector = get_embedding(input_query, engine="text-embedding-3-small")
-        search_result = self.client.search(
-            collection_name=self.collection_name,
-            query_vector=input_vector,
-            limit=limit
-        )
+            self.print_cache_stats()
+    def _lexical_search(self, input_query: str, limit: int):
+        hits = self.lexical_index.search(input_query, limit) if self.lexical_index is not None else []
+        payloads = self._fetch_payloads([point_id for point_id, _ in hits]) if hits else []
+        return [(point_id, score, payload) for (point_id, score), payload in zip(hits, payloads) if payload is not None]
+
+    def _hybrid_search(self, input_query: str, limit: int, candidates: int):
+        vector_hits = self._search_points(self.embed_query(input_query), candidates)
+        lexical_hits = self.lexical_index.search(input_query, candidates) if self.lexical_index is not None else []
+        payloads = {str(point_id): payload for point_id, _, payload in vector_hits}
+        fused = reciprocal_rank_fusion([
+            [str(point_id) for point_id, _, _ in vector_hits],
+            [point_id for point_id, _ in lexical_hits],
+        ])[:limit]
+        missing = [point_id for point_id, _ in fused if point_id not in payloads]
+        if missing:
+            payloads.update(zip(missing, self._fetch_payloads(missing)))
+        return [(point_id, score, payloads[point_id]) for point_id, score in fused if payloads.get(point_id) is not None]
+
+    def search(self, input_query: str, limit: int = 3, mode: str = "vector", candidates: int = 50):
+        """Search transcript chunks.
+
+        `mode` is "vector" (dense embeddings), "lexical" (BM25 only, no embedding
+        call) or "hybrid" (reciprocal rank fusion of the top `candidates` of both).
+        """
+        if mode not in ("vector", "lexical", "hybrid"):
+            raise ValueError(f"Unknown search mode '{mode}', expected 'vector', 'lexical' or 'hybrid'")
+        with metrics.timer(f"search_{mode}") as t:
+            if mode == "lexical":
+                hits = self._lexical_search(input_query, limit)
+            elif mode == "hybrid":
+                hits = self._hybrid_search(input_query, limit, max(candidates, limit))
+            else:
+                hits = self._search_points(self.embed_query(input_query), limit)
+            t.set(hits=len(hits))
+        result = self._format_hits(hits)
+        print(json.dumps(result, indent=4))
+        return result
+
+    def search_many(self, queries: List[str], limit: int = 3, batch_size: int = 256) -> List[List[dict]]:
+        """Vector-search many queries at once, returning one result list per query.
+
+        Uncached queries are embedded in a single request per 2048 queries (the
+        embeddings API limit) and sent to the backend `batch_size` at a time in
+        one batch-search call each; nothing is printed.
+        """
+        vectors = [None] * len(queries)
+        for indices, batch_vectors in self.embed_texts(queries, batch_size=MAX_EMBEDDING_INPUTS):
+            for index, vector in zip(indices, batch_vectors):
+                vectors[index] = vector
+        results = []
+        for start in range(0, len(vectors), batch_size):
+            with metrics.timer("search_batch", queries=len(vectors[start:start + batch_size])):
+                batch_hits = self._search_points_many(vectors[start:start + batch_size], limit)
+            for hits in batch_hits:
+                results.append(self._format_hits(hits))
+        return results
+
+    @staticmethod
+    def _format_hits(hits) -> List[dict]:
         result = []
-        for item in search_result:
-            similarity_score = item.score
-            payload = item.payload
+        for point_id, similarity_score, payload in hits:
             data = {
-                "id": item.id,
+                "id": point_id,
                 "similarity_score": similarity_score,
                 "start": payload.get("start"),
                 "end": payload.get("end"),
@@ -89,5 +349,4 @@ class QdrantVectorStore:
                 "title": payload.get("title")
             }
             result.append(data)
-        print(json.dumps(result, indent=4))
         return result
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""Append-only binary log of transcript chunks, one file per channel.
+
+Layout: an 8-byte magic header, then one record per chunk:
+
+    u32 body length | f64 start | f64 end | (u32 length, utf-8 bytes) x 4: video id, url, title, content
+
+Every append of a video starts with a reset record (start -1, only the video
+id set). Iteration skips a video's records from before its latest reset, so
+re-archiving a re-chunked video replaces its old chunks instead of adding to
+them. Reads go through mmap, so iterating the raw records does not copy the file.
+Convert an old per-video JSON folder with:
+
+    python transcript_store.py convert transcripts/<channel>_<timestamp> transcripts/<channel>.tlog
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from typing import Dict, Iterator, List
+
+MAGIC = b"OVTLOG1\n"
+_LENGTH = struct.Struct("<I")
+_TIMES = struct.Struct("<dd")
+_FIELDS = ("video_id", "url", "title", "content")
+_RESET = -1.0
+
+def _encode(video_id: str, chunk: dict) -> bytes:
+    parts = [_TIMES.pack(float(chunk.get("start") or 0), float(chunk.get("end") or 0))]
+    for value in (video_id, chunk.get("url"), chunk.get("title"), chunk.get("content")):
+        data = (value or "").encode("utf-8")
+        parts.append(_LENGTH.pack(len(data)))
+        parts.append(data)
+    body = b"".join(parts)
+    return _LENGTH.pack(len(body)) + body
+
+def _peek(data, offset: int):
+    """(start, video id) of the record body at `offset`, without decoding the rest."""
+    start, _ = _TIMES.unpack_from(data, offset)
+    (length,) = _LENGTH.unpack_from(data, offset + _TIMES.size)
+    begin = offset + _TIMES.size + _LENGTH.size
+    return start, bytes(data[begin:begin + length])
+
+def _decode(body: memoryview) -> dict:
+    start, end = _TIMES.unpack_from(body, 0)
+    record = {"start": start, "end": end}
+    offset = _TIMES.size
+    for field in _FIELDS:
+        (length,) = _LENGTH.unpack_from(body, offset)
+        offset += _LENGTH.size
+        record[field] = str(body[offset:offset + length], "utf-8")
+        offset += length
+    return record
+
+class TranscriptStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "wb") as f:
+                f.write(MAGIC)
+        else:
+            self._recover()
+
+    def _recover(self):
+        """Drop a partially written trailing record left by an interrupted append."""
+        valid_end = len(MAGIC)
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{self.path} is not a transcript store")
+            for offset, length in self._offsets(data):
+                valid_end = offset + length
+            size = len(data)
+        if valid_end < size:
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_end)
+
+    @staticmethod
+    def _offsets(data):
+        offset = len(MAGIC)
+        size = len(data)
+        while offset + _LENGTH.size <= size:
+            (length,) = _LENGTH.unpack_from(data, offset)
+            if offset + _LENGTH.size + length > size:
+                break
+            yield offset + _LENGTH.size, length
+            offset += _LENGTH.size + length
+
+    def _live_offsets(self, data):
+        """Offsets of the records in each video's latest chunk set, in file order."""
+        records = []
+        latest_reset = {}
+        for offset, length in self._offsets(data):
+            start, video_id = _peek(data, offset)
+            if start == _RESET:
+                latest_reset[video_id] = len(records)
+            records.append((offset, length, video_id, start == _RESET))
+        for index, (offset, length, video_id, reset) in enumerate(records):
+            if not reset and index > latest_reset.get(video_id, -1):
+                yield offset, length
+
+    def append(self, video_id: str, chunks: List[dict]):
+        """Store `chunks` as the video's current chunk set, replacing any earlier one."""
+        reset = _encode(video_id, {"start": _RESET, "end": _RESET})
+        payload = reset + b"".join(_encode(video_id, chunk) for chunk in chunks)
+        with self._lock, open(self.path, "ab") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def iter_raw(self) -> Iterator[memoryview]:
+        """Yield each record body as a zero-copy view into the memory-mapped file.
+
+        A view is only valid until the next one is requested.
+        """
+        if os.path.getsize(self.path) <= len(MAGIC):
+            return
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            view = memoryview(data)
+            body = None
+            try:
+                for offset, length in self._live_offsets(data):
+                    body = view[offset:offset + length]
+                    yield body
+                    body.release()
+            finally:
+                if body is not None:
+                    body.release()
+                view.release()
+
+    def __iter__(self) -> Iterator[dict]:
+        for body in self.iter_raw():
+            yield _decode(body)
+
+    def iter_batches(self, batch_size: int = 256) -> Iterator[List[dict]]:
+        batch = []
+        for record in self:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def video_ids(self) -> Dict[str, int]:
+        """Map each stored video id to its number of chunks."""
+        counts: Dict[str, int] = {}
+        for body in self.iter_raw():
+            (length,) = _LENGTH.unpack_from(body, _TIMES.size)
+            offset = _TIMES.size + _LENGTH.size
+            video_id = str(body[offset:offset + length], "utf-8")
+            counts[video_id] = counts.get(video_id, 0) + 1
+        return counts
+
+def convert_folder(folder_path: str, store_path: str) -> int:
+    """Append every transcript_<video id>.json file in `folder_path` to the store; returns the chunk count."""
+    store = TranscriptStore(store_path)
+    converted = 0
+    for filename in sorted(os.listdir(folder_path)):
+        if filename.startswith("transcript_") and filename.endswith(".json"):
+            with open(os.path.join(folder_path, filename)) as f:
+                chunks = json.load(f)
+            store.append(filename[len("transcript_"):-len(".json")], chunks)
+            converted += len(chunks)
+    return converted
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "convert":
+        print("usage: python transcript_store.py convert <transcripts folder> <store path>")
+        sys.exit(1)
+    count = convert_folder(sys.argv[2], sys.argv[3])
+    print(f"Converted {count} chunks into {sys.argv[3]}")
@@ -1,18 +1,134 @@
-import json
 import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 import requests
-from datetime import datetime
+from requests.adapters import HTTPAdapter
 from youtubesearchpython import VideosSearch
 from youtube_transcript_api import YouTubeTranscriptApi
 from bs4 import BeautifulSoup
+import metrics
+from transcript_store import TranscriptStore
 
-def fetch_full_description(video_url):
-    response = requests.get(video_url)
+YOUTUBE_HOST = "www.youtube.com"
+
+class HostRateLimiter:
+    """Spaces out requests so that each host gets at most `rate` requests per second."""
+
+    def __init__(self, rate: float = 5.0):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def create_session(pool_size: int = 10) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def fetch_full_description(video_url, session=None, rate_limiter=None):
+    if rate_limiter is not None:
+        rate_limiter.wait(urlparse(video_url).netloc)
+    with metrics.timer("description") as t:
+        response = (session or requests).get(video_url)
+        t.set(bytes=len(response.content))
     soup = BeautifulSoup(response.content, 'html.parser')
     description = soup.find('meta', {'name': 'description'})
     return description['content'] if description else ''
 
-def split_transcript(transcript, video_url, video_title, interval=45):
+def fetch_transcript(video_id, rate_limiter=None):
+    if rate_limiter is not None:
+        rate_limiter.wait(YOUTUBE_HOST)
+    with metrics.timer("transcript") as t:
+        transcript = YouTubeTranscriptApi.get_transcript(video_id)
+        t.set(entries=len(transcript))
+    return transcript
+
+def count_tokens(text: str) -> int:
+    """Approximate token count for speech transcripts (about 4 tokens per 3 words)."""
+    return (len(text.split()) * 4 + 2) // 3
+
+def _chunk(window, video_url, video_title):
+    first, last = window[0][0], window[-1][0]
+    start = first['start']
+    end = last['start'] + last.get('duration', 0)
+    return {
+        "start": start,
+        "end": end,
+        "content": ' '.join(entry['text'] for entry, _ in window),
+        "url": f"{video_url}&start={int(start)}&end={int(end)}",
+        "title": video_title
+    }
+
+def split_transcript_by_tokens(transcript, video_url, video_title, max_tokens=256, overlap_tokens=32, min_tokens=64):
+    """Split a transcript into chunks of at most `max_tokens` tokens, in one pass.
+
+    Each chunk repeats up to `overlap_tokens` tokens from the end of the previous
+    chunk; the repeated tokens count towards the limit. A trailing chunk with fewer
+    than `min_tokens` new tokens is merged into the previous one if it fits. A
+    single entry longer than `max_tokens` becomes its own chunk.
+    """
+    split_transcripts = []
+    window = deque()
+    window_tokens = 0
+    new_entries = 0
+    new_tokens = 0
+    last_tokens = 0
+    for entry in transcript:
+        tokens = count_tokens(entry['text'])
+        if new_entries and window_tokens + tokens > max_tokens:
+            split_transcripts.append(_chunk(window, video_url, video_title))
+            last_tokens = window_tokens
+            # always drop at least one entry so consecutive chunks never share a start,
+            # and never carry more overlap than leaves room for the next entry
+            window_tokens -= window.popleft()[1]
+            while window and (window_tokens > overlap_tokens or window_tokens + tokens > max_tokens):
+                window_tokens -= window.popleft()[1]
+            new_entries = 0
+            new_tokens = 0
+        window.append((entry, tokens))
+        window_tokens += tokens
+        new_entries += 1
+        new_tokens += tokens
+
+    if new_entries:
+        if split_transcripts and new_tokens < min_tokens and last_tokens + new_tokens <= max_tokens:
+            tail = [entry for entry, _ in list(window)[-new_entries:]]
+            previous = split_transcripts[-1]
+            previous["content"] = ' '.join([previous["content"]] + [entry['text'] for entry in tail])
+            previous["end"] = tail[-1]['start'] + tail[-1].get('duration', 0)
+            previous["url"] = f"{video_url}&start={int(previous['start'])}&end={int(previous['end'])}"
+        else:
+            split_transcripts.append(_chunk(window, video_url, video_title))
+
+    return split_transcripts
+
+def split_transcript(transcript, video_url, video_title, interval=45, max_tokens: Optional[int] = None,
+                     overlap_tokens: int = 32, min_tokens: int = 64):
+    with metrics.timer("split", entries=len(transcript)) as t:
+        if max_tokens:
+            chunks = split_transcript_by_tokens(transcript, video_url, video_title, max_tokens, overlap_tokens, min_tokens)
+        else:
+            chunks = split_transcript_by_interval(transcript, video_url, video_title, interval)
+        t.set(chunks=len(chunks))
+    return chunks
+
+def split_transcript_by_interval(transcript, video_url, video_title, interval=45):
     split_transcripts = []
     current_content = []
     current_start = transcript[0]['start']
@@ -51,51 +167,102 @@ def split_transcript(transcript, video_url, video_title, interval=45):
 
     return split_transcripts
 
-def fetch_youtube_videos(channel_name, num_videos, st):
-    unique_id = f"{channel_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    folder_path = os.path.join('transcripts', unique_id)
-    os.makedirs(folder_path, exist_ok=True)
+def iter_search_results(videos_search):
+    while True:
+        for video in videos_search.result()['result']:
+            yield video
+        if 'next' in videos_search.result():
+            with metrics.timer("search_page"):
+                videos_search.next()
+        else:
+            break
+
+def _fetch_video(video, session, rate_limiter):
+    video_descr = fetch_full_description(video['link'], session, rate_limiter)
+    transcript = fetch_transcript(video['id'], rate_limiter)
+    if not transcript:
+        raise ValueError("Transcript is empty")
+    return video_descr, transcript
+
+def iter_youtube_videos(channel_name, num_videos, max_workers=8, requests_per_second=5.0, skip_video=None):
+    """Yield (video, description, transcript) for the first `num_videos` search results with a transcript.
+
+    Up to `max_workers` videos are fetched concurrently, but results are yielded in
+    search order and at most as many videos as are still needed are in flight.
+    Videos for which `skip_video(video)` is true are not fetched but still count
+    towards `num_videos`, so a sync looks at the same window of latest videos.
+    """
+    with metrics.timer("search_page"):
+        videos_search = VideosSearch(channel_name, limit=50)
+    candidates = iter_search_results(videos_search)
+    session = create_session(pool_size=max_workers)
+    rate_limiter = HostRateLimiter(requests_per_second)
+    fetched_videos = 0
+    pending = deque()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                while fetched_videos < num_videos:
+                    while len(pending) < min(max_workers, num_videos - fetched_videos):
+                        video = next(candidates, None)
+                        if video is None:
+                            break
+                        if skip_video is not None and skip_video(video):
+                            metrics.count("videos_skipped")
+                            fetched_videos += 1
+                            continue
+                        pending.append((video, executor.submit(_fetch_video, video, session, rate_limiter)))
+                    if not pending:
+                        break
+                    video, future = pending.popleft()
+                    try:
+                        video_descr, transcript = future.result()
+                    except Exception as e:
+                        print(f"Failed to fetch transcript for video titled: {video['title']}. Error: {str(e)}")
+                        metrics.count("videos_failed")
+                        continue
+                    metrics.count("videos_fetched")
+                    fetched_videos += 1
+                    yield video, video_descr, transcript
+            finally:
+                for _, future in pending:
+                    future.cancel()
+    finally:
+        session.close()
+
+def channel_store_path(channel_name: str) -> str:
+    safe_name = re.sub(r'[^\w.-]+', '_', channel_name)
+    return os.path.join('transcripts', f"{safe_name}.tlog")
+
+def fetch_youtube_videos(channel_name, num_videos, st, max_workers=8, requests_per_second=5.0):
+    store_path = channel_store_path(channel_name)
+    store = TranscriptStore(store_path)
 
-    videos_search = VideosSearch(channel_name, limit=50)
     videos = []
     total_transcript_length = 0
     total_videos = 0
-    fetched_videos = 0
 
-    while fetched_videos < num_videos:
-        results = videos_search.result()['result']
-        for i, video in enumerate(results):
-            if fetched_videos >= num_videos:
-                break
-            video_url = video['link']
-            video_title = video['title']
-            video_descr = fetch_full_description(video_url)
-            try:
-                transcript = YouTubeTranscriptApi.get_transcript(video['id'])
-                split_transcripts = split_transcript(transcript, video_url, video_title)
-                transcript_length = sum(len(t['content']) for t in split_transcripts)
-                total_transcript_length += transcript_length
-                total_videos += 1
-                fetched_videos += 1
-
-                videos.append({
-                    'url': video_url,
-                    'title': video_title,
-                    'descr': video_descr,
-                    'duration': video['duration'],
-                    'lengthOfTranscript': transcript_length
-                })
-
-                transcript_filename = os.path.join(folder_path, f"transcript_{video['id']}.json")
-                with open(transcript_filename, 'w') as transcript_file:
-                    json.dump(split_transcripts, transcript_file, indent=4)
-                
-                st.write(f"Fetched transcript for video titled: {video_title}")
-            except Exception as e:
-                print(f"Failed to fetch transcript for video titled: {video_title}. Error: {str(e)}")
-        if fetched_videos < num_videos and 'next' in videos_search.result():
-            videos_search.next()
-        else:
-            break
+    for video, video_descr, transcript in iter_youtube_videos(channel_name, num_videos, max_workers, requests_per_second):
+        video_url = video['link']
+        video_title = video['title']
+        try:
+            split_transcripts = split_transcript(transcript, video_url, video_title)
+            transcript_length = sum(len(t['content']) for t in split_transcripts)
+            total_transcript_length += transcript_length
+            total_videos += 1
+
+            videos.append({
+                'url': video_url,
+                'title': video_title,
+                'descr': video_descr,
+                'duration': video['duration'],
+                'lengthOfTranscript': transcript_length
+            })
+
+            store.append(video['id'], split_transcripts)
+
+            st.write(f"Fetched transcript for video titled: {video_title}")
+        except Exception as e:
+            print(f"Failed to fetch transcript for video titled: {video_title}. Error: {str(e)}")
 
-    return folder_path, videos
\ No newline at end of file
+    return store_path, videos